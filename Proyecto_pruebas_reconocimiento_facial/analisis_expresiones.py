@@ -0,0 +1,186 @@
+"""
+analisis_expresiones.py
+Análisis de expresiones sin interfaz: lo usan el detector en vivo y el procesamiento por lotes
+"""
+import cv2
+import numpy as np
+
+from estadisticas_regiones import EstadisticasRegiones
+from pipeline_rostros import BANDA_BOCA, BANDA_OJOS, caja_banda
+
+EXPRESIONES = ['feliz', 'triste', 'sorpresa', 'neutral', 'enojado']
+
+# Umbrales de la cadena de decisión. Un perfil de calibración (calibracion.py)
+# puede sustituirlos por los de cada usuario
+UMBRALES = {
+    'sorpresa_boca': 40.0,   # intensidad_boca >
+    'feliz_boca': 20.0,      # intensidad_boca >
+    'feliz_ojos': 80.0,      # brillo_ojos >
+    'enojado_ojos': 70.0,    # brillo_ojos <
+    'enojado_boca': 15.0,    # intensidad_boca <
+    'triste_boca': 80.0,     # brillo_boca <
+    'triste_ojos': 80.0,     # brillo_ojos <
+}
+
+
+def caracteristicas_rostro(rostro_gris, regiones=None, pool=None):
+    """
+    (intensidad_boca, brillo_boca, brillo_ojos) de un recorte de rostro; None si no hay boca.
+    Los brillos salen de las integrales del recorte (regiones, si ya están calculadas).
+    Con pool (PoolBuffers) las integrales y los bordes van a buffers reutilizados
+    """
+    regiones = regiones or EstadisticasRegiones(rostro_gris, pool=pool)
+
+    # 1. Analizar región de la boca
+    bx1, by1, bx2, by2 = regiones.caja(BANDA_BOCA)
+    if by2 <= by1 or bx2 <= bx1:
+        return None
+
+    # Calcular brillo promedio de la boca
+    brillo_boca = regiones.media(bx1, by1, bx2, by2)
+
+    # Detectar bordes en la boca
+    bordes_boca = None if pool is None else pool.obtener((by2 - by1, bx2 - bx1), nombre="bordes_boca")
+    bordes_boca = cv2.Canny(rostro_gris[by1:by2, bx1:bx2], 50, 150, edges=bordes_boca)
+    intensidad_boca = np.mean(bordes_boca)
+
+    # 2. Analizar región de ojos
+    brillo_ojos = regiones.media_banda(BANDA_OJOS)
+
+    return intensidad_boca, brillo_boca, brillo_ojos
+
+
+def clasificar_valores(intensidad_boca, brillo_boca, brillo_ojos, umbrales=None):
+    """Cadena de umbrales de un solo rostro: devuelve (expresion, confianza)"""
+    u = umbrales or UMBRALES
+
+    # SORPRESA: Boca muy activa (muchos bordes)
+    if intensidad_boca > u['sorpresa_boca']:
+        return "sorpresa", min(0.9, intensidad_boca / 100)
+
+    # FELIZ: Boca moderadamente activa, ojos normales
+    elif intensidad_boca > u['feliz_boca'] and brillo_ojos > u['feliz_ojos']:
+        return "feliz", min(0.8, intensidad_boca / 80)
+
+    # ENOJADO: Ojos oscuros (entrecerrados), boca inactiva
+    elif brillo_ojos < u['enojado_ojos'] and intensidad_boca < u['enojado_boca']:
+        return "enojado", 0.7
+
+    # TRISTE: Todo muy oscuro/inactivo
+    elif brillo_boca < u['triste_boca'] and brillo_ojos < u['triste_ojos']:
+        return "triste", 0.6
+
+    # NEUTRAL: Por defecto
+    else:
+        return "neutral", 0.5
+
+
+def analizar_expresion(rostro_gris, debug=False, umbrales=None):
+    """Analiza expresión facial de manera simple pero efectiva"""
+    expresion, confianza, _ = analizar_con_caracteristicas(rostro_gris, debug, umbrales)
+    return expresion, confianza
+
+
+def analizar_con_caracteristicas(rostro_gris, debug=False, umbrales=None, pool=None):
+    """Como analizar_expresion, pero devuelve también las características (o None)"""
+    h, w = rostro_gris.shape
+
+    if h < 50 or w < 50:
+        return "neutral", 0.5, None
+
+    try:
+        caracteristicas = caracteristicas_rostro(rostro_gris, pool=pool)
+        if caracteristicas is None:
+            return "neutral", 0.3, None
+
+        # 3. Lógica mejorada de detección
+        return (*clasificar_valores(*caracteristicas, umbrales=umbrales), caracteristicas)
+
+    except Exception as e:
+        if debug:
+            print(f"Error en análisis: {e}")
+        return "neutral", 0.1, None
+
+
+# ============================================
+# ANÁLISIS EN LOTE (VARIOS ROSTROS A LA VEZ)
+# ============================================
+# Los umbrales están ajustados a la densidad de bordes del recorte a su tamaño
+# original, que cambia al redimensionar: cada rostro se mide a su tamaño (con
+# los mismos buffers para todo el lote) y luego se clasifican todos de una vez.
+
+# Índices en EXPRESIONES
+_FELIZ, _TRISTE, _SORPRESA, _NEUTRAL, _ENOJADO = range(5)
+
+# Estado de cada rostro del lote: los casos especiales de analizar_con_caracteristicas
+VALIDO, PEQUENO, SIN_BOCA, ERROR = range(4)
+
+
+def clasificar_caracteristicas(intensidad_boca, brillo_boca, brillo_ojos, umbrales=None):
+    """
+    Misma cadena de umbrales que clasificar_valores, aplicada a arrays.
+    Devuelve (índices en EXPRESIONES, confianzas).
+    """
+    u = umbrales or UMBRALES
+    condiciones = [
+        intensidad_boca > u['sorpresa_boca'],                                      # SORPRESA
+        (intensidad_boca > u['feliz_boca']) & (brillo_ojos > u['feliz_ojos']),     # FELIZ
+        (brillo_ojos < u['enojado_ojos']) & (intensidad_boca < u['enojado_boca']), # ENOJADO
+        (brillo_boca < u['triste_boca']) & (brillo_ojos < u['triste_ojos']),       # TRISTE
+    ]
+    indices = np.select(condiciones, [_SORPRESA, _FELIZ, _ENOJADO, _TRISTE], default=_NEUTRAL)
+    confianzas = np.select(
+        condiciones,
+        [np.minimum(0.9, intensidad_boca / 100), np.minimum(0.8, intensidad_boca / 80), 0.7, 0.6],
+        default=0.5
+    )
+    return indices, confianzas
+
+
+def medir_rostro(rostro_gris, pool=None):
+    """
+    (características o None, estado) de un recorte, con los mismos casos
+    especiales que analizar_con_caracteristicas (pequeño, sin boca, error)
+    """
+    h, w = rostro_gris.shape[:2]
+    if h < 50 or w < 50:
+        return None, PEQUENO
+    try:
+        caracteristicas = caracteristicas_rostro(rostro_gris, pool=pool)
+    except Exception:
+        return None, ERROR
+    if caracteristicas is None:
+        return None, SIN_BOCA
+    return caracteristicas, VALIDO
+
+
+def clasificar_lote(caracteristicas, estados, umbrales=None):
+    """
+    Clasifica de una vez N rostros medidos con medir_rostro.
+    caracteristicas (N, 3) (lo que sea en los no VALIDO), estados (N,).
+    Devuelve (expresiones, confianzas) iguales a las de analizar_expresion
+    """
+    caracteristicas = np.asarray(caracteristicas, dtype=np.float64).reshape(-1, 3)
+    estados = np.asarray(estados)
+    indices, confianzas = clasificar_caracteristicas(*caracteristicas.T, umbrales=umbrales)
+    indices = np.where(estados == VALIDO, indices, _NEUTRAL)
+    confianzas = np.select([estados == PEQUENO, estados == SIN_BOCA, estados == ERROR],
+                           [0.5, 0.3, 0.1], confianzas)
+    return [EXPRESIONES[i] for i in indices], confianzas
+
+
+def analizar_expresiones_lote(rostros_gris, umbrales=None, pool=None):
+    """
+    Versión en lote de analizar_expresion para muchos rostros (o frames) a la vez,
+    con las mismas etiquetas. Con pool (PoolBuffers) los bordes y las integrales
+    de todos los rostros usan los mismos buffers.
+    Devuelve (lista de expresiones, array de confianzas).
+    """
+    n = len(rostros_gris)
+    caracteristicas = np.zeros((n, 3))
+    estados = np.empty(n, dtype=np.int8)
+    for i, rostro in enumerate(rostros_gris):
+        medidas, estados[i] = medir_rostro(rostro, pool)
+        if medidas is not None:
+            caracteristicas[i] = medidas
+    return clasificar_lote(caracteristicas, estados, umbrales)
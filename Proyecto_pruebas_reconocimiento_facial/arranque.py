@@ -0,0 +1,119 @@
+"""
+arranque.py
+Cachés de arranque del detector, guardadas entre ejecuciones en .cache/:
+
+- Fuentes: pygame.font.SysFont recorre todas las fuentes del sistema (fc-list)
+  cada vez que se lanza el programa. Aquí se resuelve la ruta de cada fuente
+  una sola vez, se guarda en fuentes.json y las siguientes ejecuciones abren el
+  fichero directamente. En el mismo proceso cada (fuente, tamaño) se crea una vez.
+- Imágenes de expresión: decodificar los JPEG y escalarlos a 280x280 en cada
+  arranque es lo más lento de la interfaz. Se guardan ya escaladas como píxeles
+  en bruto (.npy); el nombre lleva el mtime del original, así que al cambiar la
+  imagen la entrada vieja deja de usarse y se borra.
+"""
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pygame
+
+CARPETA_CACHE = Path(__file__).parent / ".cache"
+ARCHIVO_FUENTES = "fuentes.json"
+
+# Instante de importación: referencia para el tiempo hasta el primer frame
+INICIO_PROCESO = time.perf_counter()
+
+
+# ============================================
+# FUENTES
+# ============================================
+_rutas_fuentes = None
+
+
+def _cargar_rutas(carpeta):
+    global _rutas_fuentes
+    if _rutas_fuentes is None:
+        try:
+            _rutas_fuentes = json.loads((carpeta / ARCHIVO_FUENTES).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            _rutas_fuentes = {}
+    return _rutas_fuentes
+
+
+def ruta_fuente(nombres, negrita=False, carpeta=CARPETA_CACHE):
+    """Fichero de la fuente (o None: fuente por defecto de pygame), resuelto una vez entre ejecuciones"""
+    rutas = _cargar_rutas(carpeta)
+    clave = f"{nombres}|{'negrita' if negrita else 'normal'}"
+
+    ruta = rutas.get(clave, False)
+    if ruta is False or (ruta and not Path(ruta).is_file()):
+        # Sin caché (o la fuente ya no está): búsqueda lenta en las fuentes del sistema
+        ruta = pygame.font.match_font(nombres, bold=negrita)
+        rutas[clave] = ruta
+        try:
+            carpeta.mkdir(parents=True, exist_ok=True)
+            (carpeta / ARCHIVO_FUENTES).write_text(json.dumps(rutas, indent=2), encoding='utf-8')
+        except OSError:
+            pass   # Sin caché en disco: sólo se pierde la mejora en el próximo arranque
+    return ruta
+
+
+@lru_cache(maxsize=None)
+def fuente(nombres, tamano, negrita=False):
+    """Equivalente a pygame.font.SysFont sin recorrer las fuentes del sistema"""
+    ruta = ruta_fuente(nombres, negrita)
+    font = pygame.font.Font(ruta, tamano)
+    # Como SysFont: negrita simulada sólo si la búsqueda en negrita no encontró
+    # un fichero propio (devuelve el mismo que la normal), sea cual sea su nombre
+    if negrita and (ruta is None or ruta == ruta_fuente(nombres, False)):
+        font.set_bold(True)
+    return font
+
+
+# ============================================
+# IMÁGENES ESCALADAS
+# ============================================
+def _ruta_imagen(clave, version, tamano, carpeta):
+    return carpeta / "imagenes" / f"{clave}.{tamano[0]}x{tamano[1]}.{version}.npy"
+
+
+def superficie_cacheada(clave, version, tamano, crear, carpeta=CARPETA_CACHE):
+    """
+    Surface de tamano para clave, ya convertida al formato de la pantalla.
+    Si hay una copia guardada con la misma versión (p. ej. el mtime del
+    original) se lee directamente; si no, se llama a crear() y se guarda.
+    Se guarda en RGBA para no perder la transparencia de los PNG.
+    """
+    ruta = _ruta_imagen(clave, version, tamano, carpeta)
+    if ruta.is_file():
+        try:
+            pixeles = np.load(ruta)
+            if pixeles.shape == (tamano[1], tamano[0], 4):
+                return pygame.image.frombuffer(pixeles, tamano, 'RGBA').convert_alpha()
+        except (OSError, ValueError):
+            pass
+
+    img = crear()
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Versiones anteriores de la misma imagen ya no sirven
+        for vieja in ruta.parent.glob(f"{clave}.{tamano[0]}x{tamano[1]}.*.npy"):
+            vieja.unlink()
+        pixeles = np.frombuffer(pygame.image.tobytes(img, 'RGBA'), np.uint8)
+        np.save(ruta, pixeles.reshape(tamano[1], tamano[0], 4))
+    except OSError:
+        pass
+    return img.convert_alpha()
+
+
+def imagen_escalada(ruta, tamano, carpeta=CARPETA_CACHE):
+    """Imagen del disco escalada a tamano; desde la caché mientras el original no cambie"""
+    ruta = Path(ruta)
+    version = ruta.stat().st_mtime_ns
+    return superficie_cacheada(
+        ruta.name, version, tamano,
+        lambda: pygame.transform.scale(pygame.image.load(str(ruta)), tamano),
+        carpeta
+    )
@@ -0,0 +1,289 @@
+"""
+benchmark.py
+Mide por separado cada etapa del detector SIN cámara ni ventana real:
+detección Haar a varias resoluciones, analizar_expresion, medir_pupila_exacta,
+el panel de resultados de prueba_deteccion y composición de la interfaz
+(driver de vídeo 'dummy' de SDL).
+
+Entradas: imágenes de imagenes/, frames sintéticos y, opcionalmente, clips grabados.
+Los resultados se guardan en JSON para comparar ejecuciones; con --comparar, una
+etapa que empeore más del umbral hace fallar la ejecución (código de salida 1).
+
+Uso:
+    python benchmark.py -o base.json
+    python benchmark.py --clips sesion.mp4 --comparar base.json --umbral 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+# Interfaz sin ventana: tiene que fijarse antes de importar pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import cv2
+import numpy as np
+
+import analisis_expresiones
+from benchmark_pupila import regiones_sinteticas
+from capas_overlay import CapaEstatica
+from pipeline_rostros import BANDA_PUPILA, detectar_rostros, obtener_clasificador, recortar_banda
+from pool_buffers import PoolBuffers
+from prueba_deteccion import dibujar_panel_estatico, dibujar_resultados, medir_pupila_exacta
+from pupila import medir_pupila_lote
+
+RUTA_BASE = Path(__file__).parent
+RESOLUCIONES = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+
+
+# ============================================
+# ENTRADAS
+# ============================================
+def imagenes_muestra():
+    """Imágenes de imagenes/ en escala de grises"""
+    imagenes = []
+    for ruta in sorted((RUTA_BASE / "imagenes").iterdir()):
+        img = cv2.imread(str(ruta))
+        if img is not None:
+            imagenes.append(img)
+    return imagenes
+
+
+def frames_sinteticos(ancho, alto, muestras, cantidad=8, semilla=0):
+    """Frames BGR de ancho x alto: fondo con ruido y una imagen de muestra pegada"""
+    rng = np.random.default_rng(semilla)
+    frames = []
+    for i in range(cantidad):
+        frame = rng.integers(40, 140, size=(alto, ancho, 3), dtype=np.uint8)
+        muestra = muestras[i % len(muestras)]
+        lado = min(alto, ancho) // 2
+        pegada = cv2.resize(muestra, (lado, lado))
+        y = rng.integers(0, alto - lado + 1)
+        x = rng.integers(0, ancho - lado + 1)
+        frame[y:y+lado, x:x+lado] = pegada
+        frames.append(frame)
+    return frames
+
+
+def frames_clip(ruta, maximo=120):
+    """Primeros frames de un clip grabado"""
+    cap = cv2.VideoCapture(str(ruta))
+    frames = []
+    while len(frames) < maximo:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def rostros_de_prueba(muestras, clips):
+    """Recortes de rostro en gris: detectados en los clips o, si no hay, las muestras enteras"""
+    rostros = []
+    for frames in clips.values():
+        for frame in frames:
+            gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            for x, y, w, h in detectar_rostros(gris):
+                rostros.append(gris[y:y+h, x:x+w])
+
+    for muestra in muestras:
+        gris = cv2.cvtColor(muestra, cv2.COLOR_BGR2GRAY)
+        for lado in (120, 200, 320):
+            rostros.append(cv2.resize(gris, (lado, lado)))
+    return rostros
+
+
+# ============================================
+# MEDICIÓN
+# ============================================
+def medir(funcion, entradas, repeticiones=3, calentamiento=2):
+    """Llama a funcion(entrada) para cada entrada varias veces; devuelve estadísticas en ms"""
+    for entrada in entradas[:calentamiento]:
+        funcion(entrada)
+
+    tiempos = []
+    for _ in range(repeticiones):
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            funcion(entrada)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tiempos = np.array(tiempos)
+    return {
+        'n': int(len(tiempos)),
+        'ms_media': float(tiempos.mean()),
+        'ms_p50': float(np.percentile(tiempos, 50)),
+        'ms_p95': float(np.percentile(tiempos, 95)),
+    }
+
+
+def etapas_deteccion(muestras, clips):
+    """detectMultiScale sobre frames completos a varias resoluciones"""
+    clasificador = obtener_clasificador()
+    resultados = {}
+
+    for ancho, alto in RESOLUCIONES:
+        grises = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames_sinteticos(ancho, alto, muestras)]
+        resultados[f'deteccion_haar_{ancho}x{alto}'] = medir(
+            lambda g: detectar_rostros(g, clasificador), grises, repeticiones=2
+        )
+
+    for nombre, frames in clips.items():
+        grises = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+        if grises:
+            alto, ancho = grises[0].shape
+            resultados[f'deteccion_haar_clip_{nombre}_{ancho}x{alto}'] = medir(
+                lambda g: detectar_rostros(g, clasificador), grises, repeticiones=1
+            )
+    return resultados
+
+
+def etapas_analisis(rostros):
+    """analizar_expresion rostro a rostro y en lote"""
+    pool = PoolBuffers()
+    return {
+        'analizar_expresion': medir(analisis_expresiones.analizar_expresion, rostros),
+        # Tiempo por lote completo; dividir entre n_rostros para comparar con el anterior
+        'analizar_expresiones_lote': {
+            **medir(lambda lote: analisis_expresiones.analizar_expresiones_lote(lote, pool=pool), [rostros]),
+            'n_rostros': len(rostros),
+        },
+    }
+
+
+def etapas_pupila(rostros):
+    """medir_pupila_exacta (bucle original) y versión vectorizada"""
+    regiones = [r for r in (recortar_banda(rostro, BANDA_PUPILA) for rostro in rostros) if r is not None]
+    pila = regiones_sinteticas(256)
+    return {
+        'medir_pupila_exacta': medir(medir_pupila_exacta, regiones + list(pila[:64])),
+        'medir_pupila_vectorizada': medir(medir_pupila_lote, regiones + list(pila[:64])),
+        'medir_pupila_lote_256': medir(medir_pupila_lote, [pila]),
+    }
+
+
+def etapas_overlay(frames):
+    """Panel de resultados de prueba_deteccion: todas las llamadas de dibujo frente a la capa estática"""
+    capa = CapaEstatica(dibujar_panel_estatico)
+    lienzos = [f.copy() for f in frames[:8]]
+
+    def panel(i, capa):
+        dibujar_resultados(lienzos[i % len(lienzos)], i % 101, 12.5, capa)
+
+    return {
+        'overlay_panel_llamadas': medir(lambda i: panel(i, None), list(range(200))),
+        'overlay_panel_capa_estatica': medir(lambda i: panel(i, capa), list(range(200))),
+    }
+
+
+def etapas_interfaz(frames):
+    """Composición de la interfaz con el driver dummy: por zonas y repintado completo"""
+    import pygame
+    from detector import DetectorExpresiones
+
+    detector = DetectorExpresiones(camara=None)
+    resultados = {}
+
+    for modo, completo in (('interfaz_por_zonas', False), ('interfaz_repintado_completo', True)):
+        detector.repintado_completo = completo
+        detector.redibujar_todo = True
+        expresiones = analisis_expresiones.EXPRESIONES
+
+        def componer(i):
+            frame = frames[i % len(frames)]
+            detector.presentador.convertir(frame)
+            superficie = detector.presentador.presentar()
+            # Cambiar la expresión de vez en cuando, como en uso real
+            detector.expresion_actual = expresiones[(i // 15) % len(expresiones)]
+            rects = detector.dibujar_interfaz(superficie)
+            if rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+
+        resultados[modo] = medir(componer, list(range(90)), repeticiones=1)
+
+    pygame.quit()
+    return resultados
+
+
+# ============================================
+# COMPARACIÓN CON UNA EJECUCIÓN ANTERIOR
+# ============================================
+def comparar(actual, base, umbral):
+    """Devuelve la lista de etapas que han empeorado más del umbral (fracción)"""
+    regresiones = []
+    print(f"\n📊 Comparación con ejecución anterior (umbral {umbral*100:.0f}%):")
+    for etapa, datos in actual['etapas'].items():
+        anterior = base.get('etapas', {}).get(etapa)
+        if anterior is None:
+            print(f"   {etapa:40s} (nueva)")
+            continue
+        cambio = datos['ms_media'] / anterior['ms_media'] - 1 if anterior['ms_media'] > 0 else 0.0
+        marca = "❌" if cambio > umbral else "✅"
+        print(f"   {marca} {etapa:38s} {anterior['ms_media']:8.3f} -> {datos['ms_media']:8.3f} ms "
+              f"({cambio*100:+.0f}%)")
+        if cambio > umbral:
+            regresiones.append(etapa)
+    return regresiones
+
+
+# ============================================
+# PUNTO DE ENTRADA
+# ============================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del detector de expresiones")
+    parser.add_argument('--clips', nargs='*', default=[], help="Clips grabados para usar como entrada")
+    parser.add_argument('-o', '--salida', default='benchmark_resultados.json', help="JSON de resultados")
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior")
+    parser.add_argument('--umbral', type=float, default=0.15,
+                        help="Empeoramiento máximo permitido por etapa (0.15 = 15%%)")
+    parser.add_argument('--sin-interfaz', action='store_true', help="No medir la composición de la interfaz")
+    args = parser.parse_args()
+
+    print("⏱️  BENCHMARK DEL DETECTOR DE EXPRESIONES")
+    print("=" * 60)
+
+    muestras = imagenes_muestra()
+    clips = {Path(ruta).stem: frames_clip(ruta) for ruta in args.clips}
+    rostros = rostros_de_prueba(muestras, clips)
+
+    etapas = {}
+    etapas.update(etapas_deteccion(muestras, clips))
+    etapas.update(etapas_analisis(rostros))
+    etapas.update(etapas_pupila(rostros))
+    frames_640 = frames_sinteticos(640, 480, muestras)
+    etapas.update(etapas_overlay(frames_640))
+    if not args.sin_interfaz:
+        frames_ui = next((f for f in clips.values() if f), None) or frames_640
+        etapas.update(etapas_interfaz([cv2.resize(f, (640, 480)) for f in frames_ui]))
+
+    for etapa, datos in etapas.items():
+        print(f"   {etapa:40s} media {datos['ms_media']:8.3f} ms | p95 {datos['ms_p95']:8.3f} ms")
+
+    resultado = {
+        'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'plataforma': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'nucleos': os.cpu_count(),
+        'clips': [str(c) for c in args.clips],
+        'etapas': etapas,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\n📄 Resultados en: {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        regresiones = comparar(resultado, base, args.umbral)
+        if regresiones:
+            print(f"\n❌ {len(regresiones)} etapas han empeorado: {', '.join(regresiones)}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
@@ -0,0 +1,66 @@
+"""
+benchmark_pupila.py
+Compara medir_pupila_exacta (bucle píxel a píxel) con la versión vectorizada
+de pupila.py: comprueba que dan los mismos porcentajes y mide el tiempo.
+
+Uso:
+    python benchmark_pupila.py [num_regiones]
+"""
+import sys
+import time
+
+import numpy as np
+
+from prueba_deteccion import medir_pupila_exacta
+from pupila import medir_pupila_lote
+
+TOLERANCIA = 1e-6
+
+
+def regiones_sinteticas(n, alto=40, ancho=130, semilla=0):
+    """Bandas de ojos falsas: fondo claro con ruido y una 'pupila' oscura de tamaño variable"""
+    rng = np.random.default_rng(semilla)
+    yy, xx = np.mgrid[0:alto, 0:ancho]
+    regiones = rng.integers(120, 200, size=(n, alto, ancho)).astype(np.uint8)
+
+    for i in range(n):
+        cy = rng.integers(0, alto)
+        cx = rng.integers(0, ancho)
+        radio = rng.integers(1, alto)
+        pupila = (yy - cy) ** 2 + (xx - cx) ** 2 <= radio ** 2
+        regiones[i][pupila] = rng.integers(0, 60, size=pupila.sum())
+
+    return regiones
+
+
+def cronometrar(funcion, repeticiones=3):
+    """Mejor tiempo de varias repeticiones (segundos)"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    regiones = regiones_sinteticas(n)
+
+    print(f"👁️  {n} regiones de ojos de {regiones.shape[1]}x{regiones.shape[2]}")
+
+    t_bucle, ref = cronometrar(lambda: np.array([medir_pupila_exacta(r) for r in regiones], dtype=float))
+    t_una, una = cronometrar(lambda: np.array([medir_pupila_lote(r) for r in regiones]))
+    t_lote, lote = cronometrar(lambda: medir_pupila_lote(regiones))
+
+    diferencia = max(np.abs(ref - una).max(), np.abs(ref - lote).max())
+    print(f"   Diferencia máxima con el original: {diferencia:.2e}")
+
+    print(f"   Bucle original:      {t_bucle / n * 1e6:8.1f} µs/región")
+    print(f"   Vectorizada (1 a 1): {t_una / n * 1e6:8.1f} µs/región  (x{t_bucle / t_una:.1f})")
+    print(f"   Vectorizada (lote):  {t_lote / n * 1e6:8.1f} µs/región  (x{t_bucle / t_lote:.1f})")
+
+    if diferencia > TOLERANCIA:
+        print("❌ Los resultados NO coinciden")
+        sys.exit(1)
+    print("✅ Resultados idénticos")
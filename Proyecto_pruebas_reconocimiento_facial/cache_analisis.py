@@ -0,0 +1,146 @@
+"""
+cache_analisis.py
+Caché de resultados por cambio de imagen: si el recorte (rostro, ojos...) casi
+no ha cambiado desde el último análisis, se reutiliza el resultado en vez de
+volver a calcular Canny, medias o la pupila.
+
+La clave del cambio es una huella: el recorte reducido a 16x16. Si la
+diferencia media con la huella guardada no llega al umbral y el resultado no
+es demasiado viejo, se da por bueno el resultado anterior.
+
+El detector mueve la caja uno o dos píxeles entre frames aunque el rostro esté
+quieto, y eso cambia la huella más que el ruido de la cámara: estabilizar()
+conserva la caja anterior mientras la nueva no se aleje más de una tolerancia.
+
+Desactivada (activa=False) no calcula huellas ni estabiliza cajas: no cuesta nada.
+"""
+import time
+
+import cv2
+
+
+class _Entrada:
+    __slots__ = ('huella', 'resultado', 'edad')
+
+    def __init__(self, huella, resultado):
+        self.huella = huella
+        self.resultado = resultado
+        self.edad = 0
+
+
+class CacheAnalisis:
+    def __init__(self, umbral=3.0, edad_maxima=15, tamano_huella=16, activa=True):
+        self.umbral = umbral              # Diferencia media (niveles de gris) para recalcular
+        self.edad_maxima = edad_maxima    # Frames seguidos reutilizando antes de recalcular igualmente
+        self.tamano = (tamano_huella, tamano_huella)
+        self.activa = activa
+        self.entradas = {}
+        self.cajas = {}
+
+        # Estadísticas
+        self.aciertos = 0
+        self.fallos = 0
+        self.ms_calculo = 0.0    # Tiempo total de los cálculos hechos
+        self.ms_huella = 0.0     # Tiempo total gastado en huellas y comparaciones
+
+    def estabilizar(self, clave, caja, tolerancia=0.05):
+        """La caja anterior si la nueva sólo se ha movido/cambiado < tolerancia de su tamaño"""
+        if not self.activa:
+            return caja
+        anterior = self.cajas.get(clave)
+        if anterior is not None:
+            limite = max(2, int(max(anterior[2], anterior[3]) * tolerancia))
+            if all(abs(a - b) <= limite for a, b in zip(anterior, caja)):
+                return anterior
+        self.cajas[clave] = caja
+        return caja
+
+    def huella(self, recorte):
+        """Recorte reducido a tamano_huella (INTER_AREA promedia, así el ruido casi desaparece)"""
+        # Con un factor entero INTER_AREA es varias veces más rápido: se recorta al múltiplo
+        fy = max(1, recorte.shape[0] // self.tamano[1])
+        fx = max(1, recorte.shape[1] // self.tamano[0])
+        recorte = recorte[:fy * self.tamano[1], :fx * self.tamano[0]]
+        return cv2.resize(recorte, self.tamano, interpolation=cv2.INTER_AREA)
+
+    def consultar(self, clave, recorte):
+        """
+        Devuelve (resultado guardado o None, huella del recorte). Con None hay
+        que calcular y llamar a guardar() con la huella.
+        Desactivada devuelve (None, None) sin calcular nada.
+        """
+        if not self.activa:
+            return None, None
+
+        inicio = time.perf_counter()
+        huella = self.huella(recorte)
+        entrada = self.entradas.get(clave)
+        resultado = None
+
+        if (entrada is not None and entrada.edad < self.edad_maxima and
+                cv2.norm(huella, entrada.huella, cv2.NORM_L1) / huella.size < self.umbral):
+            entrada.edad += 1
+            self.aciertos += 1
+            resultado = entrada.resultado
+        else:
+            self.fallos += 1
+
+        self.ms_huella += (time.perf_counter() - inicio) * 1000
+        return resultado, huella
+
+    def guardar(self, clave, huella, resultado, ms_calculo=0.0):
+        if huella is None:  # Caché desactivada
+            return
+        self.entradas[clave] = _Entrada(huella, resultado)
+        self.ms_calculo += ms_calculo
+
+    def analizar(self, clave, recorte, funcion):
+        """funcion(recorte), o el resultado anterior si el recorte apenas ha cambiado"""
+        resultado, huella = self.consultar(clave, recorte)
+        if resultado is None:
+            inicio = time.perf_counter()
+            resultado = funcion(recorte)
+            self.guardar(clave, huella, resultado, (time.perf_counter() - inicio) * 1000)
+        return resultado
+
+    def olvidar(self, clave=None):
+        """Descarta una entrada (o todas), p. ej. al perder el rostro"""
+        if clave is None:
+            self.entradas.clear()
+            self.cajas.clear()
+        else:
+            self.entradas.pop(clave, None)
+            self.cajas.pop(clave, None)
+
+    def conservar(self, claves):
+        """Descarta las entradas cuyas claves ya no existen (pistas olvidadas)"""
+        claves = set(claves)
+        for clave in set(self.entradas) - claves:
+            del self.entradas[clave]
+        for clave in set(self.cajas) - claves:
+            del self.cajas[clave]
+
+    def estadisticas(self):
+        total = self.aciertos + self.fallos
+        coste_medio = self.ms_calculo / self.fallos if self.fallos else 0.0
+        # Lo que habría costado calcular siempre, menos lo que ha costado de verdad
+        # (negativo si las huellas cuestan más de lo que ahorran los aciertos)
+        sin_cache = coste_medio * total
+        con_cache = self.ms_calculo + self.ms_huella
+        return {
+            'consultas': total,
+            'porcentaje_aciertos': 100.0 * self.aciertos / total if total else 0.0,
+            'ms_ahorrados': sin_cache - con_cache,
+            'porcentaje_ahorrado': 100.0 * (sin_cache - con_cache) / sin_cache if sin_cache else 0.0,
+        }
+
+    def resumen(self):
+        """Texto corto para consola o pantalla de debug"""
+        if not self.activa:
+            return "Caché: desactivada"
+        e = self.estadisticas()
+        if e['ms_ahorrados'] < 0:
+            return (f"Caché: {e['porcentaje_aciertos']:.0f}% aciertos | "
+                    f"sin ahorro: cuesta {-e['ms_ahorrados']:.0f} ms más de CPU ({-e['porcentaje_ahorrado']:.0f}%)")
+        return (f"Caché: {e['porcentaje_aciertos']:.0f}% aciertos | "
+                f"CPU ahorrada {e['ms_ahorrados']:.0f} ms ({e['porcentaje_ahorrado']:.0f}%)")
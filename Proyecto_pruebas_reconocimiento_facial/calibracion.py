@@ -0,0 +1,274 @@
+"""
+calibracion.py
+Calibración por usuario: se graba una sesión corta (cara neutral, feliz,
+sorpresa, triste, enojado, ojos cerrados y muy abiertos), se calculan las
+distribuciones de cada característica por fase y, de ellas, los umbrales de
+la cadena de decisión y los extremos de la pupila de ese usuario.
+
+Los perfiles se guardan en perfiles/<usuario>.npz (binario, sin pickle) y se
+cargan en milisegundos al arrancar; el último calibrado queda como activo.
+
+Uso:
+    python calibracion.py --usuario ana            # grabar y guardar el perfil
+    python calibracion.py --usuario ana --mostrar  # ver umbrales de un perfil
+"""
+import argparse
+import time
+import warnings
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import analisis_expresiones
+from flujo_rostros import calcular_caracteristicas, detectar, extraer_regiones, fuente_frames
+
+CARPETA_PERFILES = Path(__file__).parent / "perfiles"
+ARCHIVO_ACTIVO = "activo.txt"
+
+# Fases de la sesión: (etiqueta, instrucción en pantalla)
+FASES = [
+    ('neutral', "Pon cara NEUTRAL"),
+    ('feliz', "SONRIE"),
+    ('sorpresa', "Cara de SORPRESA (boca abierta)"),
+    ('triste', "Cara TRISTE"),
+    ('enojado', "Cara de ENOJO (ojos entrecerrados)"),
+    ('ojos_cerrados', "CIERRA los ojos"),
+    ('ojos_abiertos', "ABRE los ojos al MAXIMO"),
+]
+NOMBRES_FASES = [nombre for nombre, _ in FASES]
+
+# Columnas de las muestras grabadas
+CARACTERISTICAS = ['intensidad_boca', 'brillo_boca', 'brillo_ojos', 'pupila']
+_BOCA, _BRILLO_BOCA, _OJOS, _PUPILA = range(4)
+
+MIN_MUESTRAS = 5   # Por debajo, la fase no cuenta y se usa el umbral por defecto
+
+
+# ============================================
+# PERFIL
+# ============================================
+class Perfil:
+    def __init__(self, nombre, umbrales, pupila_cerrado=0.0, pupila_abierto=100.0):
+        self.nombre = nombre
+        self.umbrales = umbrales
+        self.pupila_cerrado = pupila_cerrado
+        self.pupila_abierto = pupila_abierto
+
+    def pupila_calibrada(self, porcentaje):
+        """Reescala la medida de pupila: 0% = ojos cerrados, 100% = muy abiertos para este usuario"""
+        rango = self.pupila_abierto - self.pupila_cerrado
+        if rango <= 0:
+            return porcentaje
+        return float(np.clip((porcentaje - self.pupila_cerrado) / rango * 100, 0, 100))
+
+
+def ruta_perfil(nombre, carpeta=CARPETA_PERFILES):
+    return Path(carpeta) / f"{nombre}.npz"
+
+
+def guardar_perfil(perfil, muestras=None, etiquetas=None, carpeta=CARPETA_PERFILES, activar=True):
+    """Guarda umbrales, pupila y (opcional) las muestras de la sesión en un .npz"""
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    nombres = list(perfil.umbrales)
+
+    ruta = ruta_perfil(perfil.nombre, carpeta)
+    # Sin comprimir: se lee directamente, sin descomprimir al arrancar
+    np.savez(
+        ruta,
+        nombres_umbrales=np.array(nombres),
+        umbrales=np.array([perfil.umbrales[n] for n in nombres], dtype=np.float32),
+        pupila=np.array([perfil.pupila_cerrado, perfil.pupila_abierto], dtype=np.float32),
+        fases=np.array(NOMBRES_FASES),
+        muestras=np.zeros((0, len(CARACTERISTICAS)), np.float32) if muestras is None else muestras.astype(np.float32),
+        etiquetas=np.zeros(0, np.int8) if etiquetas is None else etiquetas.astype(np.int8),
+        creado=np.float64(time.time()),
+    )
+    if activar:
+        (carpeta / ARCHIVO_ACTIVO).write_text(perfil.nombre, encoding='utf-8')
+    return ruta
+
+
+def cargar_perfil(nombre=None, carpeta=CARPETA_PERFILES):
+    """
+    Carga el perfil indicado (o el activo si no se indica). Sólo se leen los
+    umbrales y la pupila, no las muestras. Devuelve None si no hay perfil.
+    """
+    carpeta = Path(carpeta)
+    if nombre is None:
+        activo = carpeta / ARCHIVO_ACTIVO
+        if not activo.is_file():
+            return None
+        nombre = activo.read_text(encoding='utf-8').strip()
+
+    ruta = ruta_perfil(nombre, carpeta)
+    if not ruta.is_file():
+        return None
+
+    with np.load(ruta) as datos:
+        umbrales = dict(analisis_expresiones.UMBRALES)
+        umbrales.update(zip(datos['nombres_umbrales'].tolist(), datos['umbrales'].tolist()))
+        cerrado, abierto = datos['pupila'].tolist()
+    return Perfil(nombre, umbrales, cerrado, abierto)
+
+
+# ============================================
+# CÁLCULO DE UMBRALES
+# ============================================
+def estadisticas_fases(muestras, etiquetas, percentiles=(10, 50, 90)):
+    """
+    Percentiles de cada característica en cada fase, todo de una vez:
+    devuelve (len(percentiles), fases, características) y las cuentas por fase.
+    """
+    n_fases = len(FASES)
+    cuentas = np.bincount(etiquetas, minlength=n_fases)
+
+    # (fases, N, características) con NaN fuera de la fase de cada muestra
+    mascara = etiquetas[None, :, None] == np.arange(n_fases)[:, None, None]
+    por_fase = np.where(mascara, muestras[None, :, :], np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)   # Fases sin muestras -> NaN
+        estadisticas = np.nanpercentile(por_fase, percentiles, axis=1)
+    return estadisticas, cuentas
+
+
+def calcular_umbrales(muestras, etiquetas):
+    """Umbrales (dict) y extremos de pupila (cerrado, abierto) a partir de una sesión"""
+    p10, p50, p90 = estadisticas_fases(muestras, etiquetas)[0]
+    cuentas = np.bincount(etiquetas, minlength=len(FASES))
+    fase = {nombre: i for i, nombre in enumerate(NOMBRES_FASES)}
+
+    def hay(*nombres):
+        return all(cuentas[fase[n]] >= MIN_MUESTRAS for n in nombres)
+
+    def entre(a, b, columna):
+        """Punto medio entre las medianas de dos fases"""
+        return (p50[fase[a], columna] + p50[fase[b], columna]) / 2
+
+    candidatos = {}
+    if hay('feliz', 'sorpresa'):
+        candidatos['sorpresa_boca'] = entre('feliz', 'sorpresa', _BOCA)
+    if hay('neutral', 'feliz'):
+        candidatos['feliz_boca'] = entre('neutral', 'feliz', _BOCA)
+    if hay('feliz'):
+        candidatos['feliz_ojos'] = p10[fase['feliz'], _OJOS]
+    if hay('neutral', 'enojado'):
+        candidatos['enojado_ojos'] = entre('enojado', 'neutral', _OJOS)
+    if hay('enojado'):
+        candidatos['enojado_boca'] = p90[fase['enojado'], _BOCA]
+    if hay('neutral', 'triste'):
+        candidatos['triste_boca'] = entre('triste', 'neutral', _BRILLO_BOCA)
+        candidatos['triste_ojos'] = entre('triste', 'neutral', _OJOS)
+
+    umbrales = dict(analisis_expresiones.UMBRALES)
+    umbrales.update({n: float(v) for n, v in candidatos.items() if np.isfinite(v)})
+
+    cerrado, abierto = 0.0, 100.0
+    if hay('ojos_cerrados', 'ojos_abiertos'):
+        cerrado = float(p50[fase['ojos_cerrados'], _PUPILA])
+        abierto = float(p50[fase['ojos_abiertos'], _PUPILA])
+    return umbrales, (cerrado, abierto)
+
+
+# ============================================
+# SESIÓN DE CALIBRACIÓN
+# ============================================
+def grabar_sesion(camara=0, segundos_fase=3.0, preparacion=1.5):
+    """
+    Guía al usuario por las fases (ventana de OpenCV) y devuelve
+    (muestras (N, 4) float32, etiquetas (N,) int8), o None si se cancela.
+    """
+    capacidad = 1024
+    muestras = np.empty((capacidad, len(CARACTERISTICAS)), dtype=np.float32)
+    etiquetas = np.empty(capacidad, dtype=np.int8)
+    n = 0
+
+    flujo = calcular_caracteristicas(extraer_regiones(detectar(fuente_frames(camara))))
+    fase_actual = 0
+    inicio_fase = time.perf_counter()
+
+    for muestra in flujo:
+        transcurrido = time.perf_counter() - inicio_fase
+        if transcurrido >= preparacion + segundos_fase:
+            fase_actual += 1
+            inicio_fase = time.perf_counter()
+            transcurrido = 0.0
+            if fase_actual == len(FASES):
+                break
+
+        grabando = transcurrido >= preparacion
+        c = muestra.caracteristicas
+        if grabando and len(c) == len(CARACTERISTICAS):
+            if n == capacidad:
+                capacidad *= 2
+                muestras = np.resize(muestras, (capacidad, len(CARACTERISTICAS)))
+                etiquetas = np.resize(etiquetas, capacidad)
+            muestras[n] = [c[nombre] for nombre in CARACTERISTICAS]
+            etiquetas[n] = fase_actual
+            n += 1
+
+        # Instrucciones
+        frame = muestra.frame
+        _, instruccion = FASES[fase_actual]
+        color = (0, 0, 255) if grabando else (0, 255, 255)
+        cv2.putText(frame, f"{fase_actual + 1}/{len(FASES)}: {instruccion}", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+        estado = "GRABANDO" if grabando else "Preparate..."
+        if muestra.caja is None:
+            estado += " (no se ve el rostro)"
+        cv2.putText(frame, estado, (20, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 1)
+        if muestra.caja is not None:
+            x, y, w, h = muestra.caja
+            cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+
+        cv2.imshow("CALIBRACION", frame)
+        if cv2.waitKey(1) & 0xFF == 27:   # ESC
+            cv2.destroyAllWindows()
+            return None
+
+    flujo.close()
+    cv2.destroyAllWindows()
+    return muestras[:n], etiquetas[:n]
+
+
+def mostrar_perfil(perfil):
+    print(f"👤 Perfil: {perfil.nombre}")
+    for nombre, valor in perfil.umbrales.items():
+        defecto = analisis_expresiones.UMBRALES[nombre]
+        print(f"   {nombre:15s} {valor:7.1f}  (por defecto {defecto:.0f})")
+    print(f"   pupila: cerrado {perfil.pupila_cerrado:.0f}% | abierto {perfil.pupila_abierto:.0f}%")
+
+
+# ============================================
+# PUNTO DE ENTRADA
+# ============================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibración de expresiones por usuario")
+    parser.add_argument('--usuario', required=True, help="Nombre del perfil")
+    parser.add_argument('--camara', default=0, help="Índice de cámara o vídeo")
+    parser.add_argument('--segundos', type=float, default=3.0, help="Segundos de grabación por fase")
+    parser.add_argument('--mostrar', action='store_true', help="Sólo mostrar un perfil ya guardado")
+    args = parser.parse_args()
+
+    if args.mostrar:
+        inicio = time.perf_counter()
+        perfil = cargar_perfil(args.usuario)
+        if perfil is None:
+            print(f"❌ No existe el perfil: {args.usuario}")
+        else:
+            print(f"⏱️  Cargado en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+            mostrar_perfil(perfil)
+    else:
+        print("🎯 CALIBRACIÓN - sigue las instrucciones de la ventana (ESC para cancelar)")
+        sesion = grabar_sesion(args.camara, args.segundos)
+        if sesion is None:
+            print("\n⚠️  Calibración cancelada")
+        else:
+            muestras, etiquetas = sesion
+            umbrales, (cerrado, abierto) = calcular_umbrales(muestras, etiquetas)
+            perfil = Perfil(args.usuario, umbrales, cerrado, abierto)
+            ruta = guardar_perfil(perfil, muestras, etiquetas)
+            print(f"\n✅ {len(muestras)} muestras -> perfil guardado en {ruta} (activo)")
+            mostrar_perfil(perfil)
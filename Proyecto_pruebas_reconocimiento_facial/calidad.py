@@ -0,0 +1,85 @@
+"""
+calidad.py
+Planificador de calidad adaptativa: mantiene el tiempo por frame del análisis
+dentro de un objetivo. Si el equipo no llega, baja de nivel (detección a menor
+resolución, scaleFactor mayor, detectar o analizar sólo algunos frames); si
+sobra margen, vuelve a subir. Así funciona igual en todos los dispositivos,
+también con webcams de 400p en equipos lentos.
+"""
+
+# Niveles de mejor a peor calidad. El nivel 0 es el comportamiento original
+NIVELES = [
+    {'escala': 1.0,  'scaleFactor': 1.1,  'detectar_cada': 1, 'analizar_cada': 1},
+    {'escala': 0.75, 'scaleFactor': 1.1,  'detectar_cada': 1, 'analizar_cada': 1},
+    {'escala': 0.5,  'scaleFactor': 1.15, 'detectar_cada': 1, 'analizar_cada': 1},
+    {'escala': 0.5,  'scaleFactor': 1.2,  'detectar_cada': 2, 'analizar_cada': 1},
+    {'escala': 0.5,  'scaleFactor': 1.2,  'detectar_cada': 3, 'analizar_cada': 2},
+]
+
+
+class PlanificadorCalidad:
+    def __init__(self, objetivo_ms=33.0, niveles=NIVELES, margen_subida=0.6,
+                 frames_para_cambiar=10, suavizado=0.2, activo=True):
+        self.objetivo_ms = objetivo_ms
+        self.niveles = niveles
+        self.margen_subida = margen_subida            # Subir sólo si el frame cuesta < 60% del objetivo
+        self.frames_para_cambiar = frames_para_cambiar  # Frames seguidos fuera de rango antes de cambiar
+        self.suavizado = suavizado                    # Peso de cada frame en la media móvil
+        self.activo = activo
+
+        self.nivel = 0
+        self.tiempo_frame_ms = 0.0    # Media móvil del tiempo por frame
+        self.frame = 0
+        self._por_encima = 0
+        self._por_debajo = 0
+        self.cambios = 0
+
+    @property
+    def parametros(self):
+        """Parámetros del nivel actual"""
+        return self.niveles[self.nivel]
+
+    def toca_detectar(self):
+        return self.frame % self.parametros['detectar_cada'] == 0
+
+    def toca_analizar(self):
+        return self.frame % self.parametros['analizar_cada'] == 0
+
+    def registrar(self, ms):
+        """Tiempo del frame que acaba de terminar; devuelve True si ha cambiado el nivel"""
+        self.frame += 1
+        if self.tiempo_frame_ms == 0.0:
+            self.tiempo_frame_ms = ms
+        else:
+            self.tiempo_frame_ms += self.suavizado * (ms - self.tiempo_frame_ms)
+
+        if not self.activo:
+            return False
+
+        if self.tiempo_frame_ms > self.objetivo_ms:
+            self._por_encima += 1
+            self._por_debajo = 0
+        elif self.tiempo_frame_ms < self.objetivo_ms * self.margen_subida:
+            self._por_debajo += 1
+            self._por_encima = 0
+        else:
+            self._por_encima = self._por_debajo = 0
+
+        if self._por_encima >= self.frames_para_cambiar and self.nivel < len(self.niveles) - 1:
+            return self._cambiar(self.nivel + 1)
+        if self._por_debajo >= self.frames_para_cambiar and self.nivel > 0:
+            return self._cambiar(self.nivel - 1)
+        return False
+
+    def _cambiar(self, nivel):
+        self.nivel = nivel
+        self.cambios += 1
+        self._por_encima = self._por_debajo = 0
+        # La media del nivel anterior ya no vale: se vuelve a medir desde cero
+        self.tiempo_frame_ms = 0.0
+        return True
+
+    def resumen(self):
+        """Texto corto para consola o pantalla de debug"""
+        return (f"Calidad: nivel {self.nivel}/{len(self.niveles) - 1} | "
+                f"{self.tiempo_frame_ms:.1f} ms (objetivo {self.objetivo_ms:.0f})")
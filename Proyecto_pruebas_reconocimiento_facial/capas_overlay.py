@@ -0,0 +1,50 @@
+"""
+capas_overlay.py
+Capas estáticas del overlay: lo que se dibuja igual en todos los frames
+(paneles, leyendas, marcas de escala) se renderiza una vez como imagen BGR
+más máscara y se pega en el frame con una sola operación (cv2.copyTo).
+En cada frame sólo se dibujan los campos que cambian.
+
+La máscara sale de dibujar dos veces sobre fondos distintos (negro y blanco):
+los píxeles pintados quedan iguales en los dos, los demás no. Así vale
+cualquier color, también el negro. Con LINE_AA los bordes semitransparentes
+del antialiasing se descartan: pensado para el trazo normal (LINE_8).
+
+Uso:
+    capa = CapaEstatica(dibujar_panel_estatico)
+    capa.componer(frame)     # Equivale a dibujar_panel_estatico(frame)
+"""
+import cv2
+import numpy as np
+
+
+class CapaEstatica:
+    def __init__(self, dibujar):
+        self.dibujar = dibujar   # dibujar(frame): las llamadas de cv2 de la capa
+        self.forma = None
+        self.imagen = None       # BGR de la zona ocupada
+        self.mascara = None      # 1 donde la capa tiene píxeles
+        self.zona = None         # (x, y, ancho, alto) de la zona ocupada en el frame
+
+    def renderizar(self, forma):
+        """Dibuja la capa para frames de esa forma y se queda con la zona ocupada"""
+        negro = np.zeros(forma, dtype=np.uint8)
+        blanco = np.full(forma, 255, dtype=np.uint8)
+        self.dibujar(negro)
+        self.dibujar(blanco)
+        mascara = np.all(negro == blanco, axis=2).astype(np.uint8)
+
+        x, y, ancho, alto = cv2.boundingRect(mascara)
+        self.zona = (x, y, ancho, alto)
+        self.imagen = np.ascontiguousarray(negro[y:y+alto, x:x+ancho])
+        self.mascara = np.ascontiguousarray(mascara[y:y+alto, x:x+ancho])
+        self.forma = forma
+
+    def componer(self, frame):
+        """Pega la capa sobre el frame (en su sitio) y lo devuelve"""
+        if frame.shape != self.forma:
+            self.renderizar(frame.shape)
+        x, y, ancho, alto = self.zona
+        if ancho and alto:
+            cv2.copyTo(self.imagen, self.mascara, frame[y:y+alto, x:x+ancho])
+        return frame
@@ -0,0 +1,115 @@
+"""
+captura.py
+Captura de cámara en un hilo propio con buffer circular pequeño.
+Siempre se sirve el frame más reciente; los antiguos se descartan.
+
+Los frames se leen y se voltean en buffers reservados (slots) que se reutilizan,
+sin reservar memoria por frame. El frame que devuelve ultimo() no se sobrescribe
+hasta que ese mismo hilo vuelve a llamar a ultimo(); quien lo necesite más
+tiempo debe copiarlo.
+"""
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from instrumentacion import Instrumentacion
+
+
+class CapturaEnHilo:
+    def __init__(self, cap, capacidad=2, espejo=True, instrumentacion=None):
+        self.cap = cap
+        self.espejo = espejo
+        self.instrumentacion = instrumentacion or Instrumentacion(activa=False)
+
+        # Buffer circular: (secuencia, instante de captura, frame)
+        self.buffer = deque(maxlen=capacidad)
+        self.condicion = threading.Condition()
+        self.secuencia = 0
+
+        # Slots de frames reutilizados y la secuencia que guarda cada uno
+        self.slots = []
+        self.secuencia_slot = []
+        self._retenidos = {}     # Hilo consumidor -> secuencia del frame que está usando
+        self._crudo = None       # Frame sin voltear (sólo lo toca el hilo de captura)
+
+        self.activa = False
+        self.error = False
+        self.hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo de captura"""
+        self.activa = True
+        self.hilo = threading.Thread(target=self._bucle, name="captura", daemon=True)
+        self.hilo.start()
+        return self
+
+    def _slot_libre(self):
+        """Índice de un slot que ningún consumidor está usando (se añade uno si no hay)"""
+        with self.condicion:
+            ocupados = set(self._retenidos.values())
+            if self.buffer:
+                ocupados.add(self.buffer[-1][0])   # El más reciente se puede servir en cualquier momento
+            for indice, secuencia in enumerate(self.secuencia_slot):
+                if secuencia not in ocupados:
+                    return indice
+            self.slots.append(None)
+            self.secuencia_slot.append(0)
+            return len(self.slots) - 1
+
+    def _bucle(self):
+        """Lee la cámara sin parar y guarda cada frame en el buffer"""
+        instr = self.instrumentacion
+        while self.activa:
+            indice = self._slot_libre()
+            with instr.etapa('1_captura'):
+                # Si el tamaño no coincide, OpenCV reserva un array nuevo y se adopta
+                if self.espejo:
+                    ret, self._crudo = self.cap.read(self._crudo)
+                else:
+                    ret, frame = self.cap.read(self.slots[indice])
+            instante = time.perf_counter()
+
+            if not ret:
+                with self.condicion:
+                    self.error = True
+                    self.condicion.notify_all()
+                break
+
+            # Voltear horizontalmente (como espejo)
+            if self.espejo:
+                frame = cv2.flip(self._crudo, 1, dst=self.slots[indice])
+            self.slots[indice] = frame
+
+            with self.condicion:
+                self.secuencia += 1
+                self.secuencia_slot[indice] = self.secuencia
+                self.buffer.append((self.secuencia, instante, frame))
+                self.condicion.notify_all()
+            instr.frame('captura')
+
+    def ultimo(self, despues_de=0, timeout=None):
+        """
+        Devuelve (secuencia, instante, frame) del frame más reciente con
+        secuencia mayor que despues_de. Espera hasta timeout si aún no hay
+        uno nuevo; devuelve None si se agota el tiempo o la cámara falla.
+        Cada consumidor lleva su propia secuencia, así van a su ritmo.
+        Al llamar se libera el frame que este hilo recibió la vez anterior.
+        """
+        hilo = threading.get_ident()
+        with self.condicion:
+            self._retenidos.pop(hilo, None)
+            hay_nuevo = lambda: self.error or (self.buffer and self.buffer[-1][0] > despues_de)
+            if not self.condicion.wait_for(hay_nuevo, timeout):
+                return None
+            if not self.buffer or self.buffer[-1][0] <= despues_de:
+                return None
+            self._retenidos[hilo] = self.buffer[-1][0]
+            return self.buffer[-1]
+
+    def detener(self):
+        """Para el hilo de captura (no libera la cámara)"""
+        self.activa = False
+        if self.hilo is not None:
+            self.hilo.join(timeout=1.0)
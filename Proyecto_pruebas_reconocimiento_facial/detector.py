@@ -2,6 +2,7 @@
 DETECTOR DE EXPRESIONES FACIALES - VERSIÓN FINAL FUNCIONAL
 Sin errores de orden
 """
+import argparse
 import cv2
 import pygame
 import numpy as np
@@ -9,12 +10,38 @@ import os
 import sys
 from pathlib import Path
 import time
+import threading
+from collections import deque
+
+from arranque import INICIO_PROCESO, fuente, imagen_escalada, superficie_cacheada
+from calibracion import cargar_perfil
+from detectores_rostro import REFERENCIA, elegir_backend, resolver_backend
+from captura import CapturaEnHilo
+from instrumentacion import Instrumentacion
+from multirostro import AnalizadorParalelo, SeguidorMultiple
+from pipeline_procesos import AnalisisRostro, PipelineProcesos
+from pool_buffers import MedidorMemoria
+from presentador import PresentadorFrames
+from registro import RegistroResultados, nueva_sesion
+from servidor_resultados import ServidorResultados
+
+# Zonas de la pantalla que cambian entre frames (el resto es fondo estático)
+RECT_VIDEO = pygame.Rect(50, 90, 640, 480)
+RECT_ESTADO = pygame.Rect(50, 595, 650, 40)
+RECT_DEBUG = pygame.Rect(50, 636, 660, 60)
+RECT_PANEL = pygame.Rect(720, 80, 350, 395)   # Marco + nombre + confianza + barra
 
 # ============================================
 # CONFIGURACIÓN INICIAL
 # ============================================
 class DetectorExpresiones:
-    def __init__(self):
+    def __init__(self, seguimiento=True, intervalo_deteccion=15, margen_roi=0.5, escala_completa=1.0,
+                 repintado_completo=False, camara=0, instrumentar=False, volcado_estadisticas=None,
+                 multirostro=False, presupuesto_analisis_ms=20.0, hilos_analisis=4,
+                 objetivo_frame_ms=33.0, perfil=None, usar_perfil=True,
+                 ventana_suavizado=6, histeresis=0.2, usar_cache=True, umbral_cache=3.0,
+                 registro=None, servidor=None, detector_rostro=None, medir_memoria=False,
+                 procesos=False):
         print("🔧 Inicializando detector...")
         
         # PRIMERO definir colores (esto es lo que faltaba)
@@ -30,25 +57,130 @@ class DetectorExpresiones:
         self.ruta_base = Path(__file__).parent
         print(f"📂 Carpeta del proyecto: {self.ruta_base}")
         
-        # Configurar PyGame
-        pygame.init()
+        # Configurar PyGame (sólo pantalla y fuentes: audio, joystick... no se usan)
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((1100, 700))
         pygame.display.set_caption("🎭 Detector de Expresiones - VS Code")
         
-        # Fuentes
-        self.font_grande = pygame.font.SysFont('Arial', 40, bold=True)
-        self.font_mediana = pygame.font.SysFont('Arial', 28)
-        self.font_chica = pygame.font.SysFont('Arial', 22)
+        # Fuentes (rutas resueltas una vez y guardadas en .cache/ entre ejecuciones)
+        self.font_grande = fuente('Arial', 40, negrita=True)
+        self.font_mediana = fuente('Arial', 28)
+        self.font_chica = fuente('Arial', 22)
+        
+        # Tiempos por etapa (histogramas) y FPS; desactivada no cuesta nada
+        self.instrumentacion = Instrumentacion(
+            activa=instrumentar,
+            ruta_volcado=volcado_estadisticas
+        )
         
         # Cargar imágenes
         self.imagenes_expresiones = self.cargar_imagenes_seguro()
         
-        # Iniciar cámara web
-        self.cap = cv2.VideoCapture(0)
+        # La cámara se abre en ejecutar(), con la ventana ya visible (camara=None: sin cámara, para benchmarks)
+        self.camara = camara
+        self.cap = None
+        self.captura = None
+        self.camara_lista = threading.Event()
+        
+        # Perfil de calibración (el activo si no se indica): umbrales del usuario
+        inicio_perfil = time.perf_counter()
+        self.perfil = cargar_perfil(perfil) if usar_perfil else None
+        self.umbrales = self.perfil.umbrales if self.perfil else None
+        if self.perfil:
+            print(f"👤 Perfil: {self.perfil.nombre} "
+                  f"({(time.perf_counter() - inicio_perfil) * 1000:.1f} ms)")
+        elif perfil:
+            print(f"⚠️  No existe el perfil '{perfil}': se usan los umbrales por defecto")
+        
+        # El detector de rostros se carga en el hilo de análisis, mientras se abre la cámara
+        # (detector_rostro=None: el elegido en este equipo con detectores_rostro.py, o haar_default).
+        # El nombre se comprueba ya: un error dentro del hilo lo pararía sin que se viera
+        self.detector_rostro = resolver_backend(detector_rostro)
+        
+        # Análisis: detección con seguimiento por ROI, calidad adaptativa, caché y
+        # suavizado. El mismo que el proceso de análisis del modo --procesos.
+        # La ROI sigue a un solo rostro: con varios rostros se escanea siempre todo
+        self.opciones_analisis = {
+            'detector_rostro': self.detector_rostro, 'seguimiento': seguimiento and not multirostro,
+            'intervalo_deteccion': intervalo_deteccion, 'margen_roi': margen_roi,
+            'escala_completa': escala_completa, 'objetivo_frame_ms': objetivo_frame_ms,
+            'umbrales': self.umbrales, 'ventana_suavizado': ventana_suavizado, 'histeresis': histeresis,
+            'usar_cache': usar_cache, 'umbral_cache': umbral_cache,
+        }
+        self.analisis = AnalisisRostro(**self.opciones_analisis, instrumentacion=self.instrumentacion)
+        
+        # Modo varios rostros: IDs de pista estables y análisis repartido en hilos
+        self.multirostro = multirostro
+        self.seguidor_multiple = SeguidorMultiple(
+            ventana_suavizado=ventana_suavizado, histeresis=histeresis
+        ) if multirostro else None
+        self.analizador = AnalizadorParalelo(
+            presupuesto_analisis_ms, hilos_analisis, umbrales=self.umbrales
+        ) if multirostro else None
+        self.rostros_pista = []   # (id, caja, expresion, confianza) del último frame analizado
+        
+        # Variables de estado
+        self.expresion_actual = "neutral"
+        self.ejecutando = True
+        self.mostrar_debug = False
+        
+        # Modo procesos: captura y análisis en procesos propios, frames por memoria compartida
+        # (sólo un rostro: el modo varios rostros sigue en hilos)
+        self.procesos = procesos and not multirostro
+        if procesos and multirostro:
+            print("⚠️  --procesos no admite varios rostros: se usan hilos")
+        self.pipeline = None
+        
+        # Memoria pedida por frame en el hilo de análisis (sus buffers: self.analisis.pool)
+        self.memoria = MedidorMemoria(activo=medir_memoria)
+        
+        # Registro columnar de resultados por frame analizado (registro=carpeta de la sesión)
+        self.registro = RegistroResultados(registro) if registro else None
+        self.caracteristicas = None   # (intensidad_boca, brillo_boca, brillo_ojos) del último análisis (en varios rostros, del principal)
+        
+        # Resultados por frame para otros programas (servidor=puerto en 127.0.0.1)
+        self.servidor = ServidorResultados(puerto=servidor).iniciar() if servidor is not None else None
+        if self.servidor is not None:
+            print(f"📡 Publicando resultados en http://127.0.0.1:{self.servidor.puerto}/eventos")
+        self.confianza = 0.0
+        self.rostro_detectado = False
+        self.caja_rostro = None
+        self.pausado = False
+        
+        # Latencia captura -> pantalla (últimos frames mostrados)
+        self.latencias_ms = deque(maxlen=300)
+        self.frames_descartados = 0
+        
+        # Render: fondo estático pre-renderizado y repintado sólo de lo que cambia
+        self.repintado_completo = repintado_completo
+        self.fondo = pygame.Surface(self.screen.get_size()).convert()
+        self.dibujar_estatico(self.fondo)
+        self.redibujar_todo = True
+        self.ultimo_panel = None
+        self.ultimo_estado = None
+        self.debug_visible = False
+        self.tiempos_render_ms = deque(maxlen=300)
+        
+        # Frame de cámara -> Surface sin copias ni Surfaces nuevas por frame
+        self.presentador = PresentadorFrames()
+        
+        # Tiempos de arranque (ms desde el inicio del proceso)
+        self.arranque_ms = {'interfaz': (time.perf_counter() - INICIO_PROCESO) * 1000}
+        print(f"✅ ¡Sistema listo! ({self.arranque_ms['interfaz']:.0f} ms)")
+    
+    @property
+    def font_debug(self):
+        """Fuente del modo debug: se crea la primera vez que se pulsa D"""
+        return fuente('Consolas,DejaVu Sans Mono,monospace', 16)
+    
+    def abrir_camara(self, indice=0):
+        """Abre la cámara (o la siguiente si falla) y prepara el hilo de captura"""
+        self.cap = cv2.VideoCapture(indice)
         if not self.cap.isOpened():
             print("❌ ERROR: No se encontró cámara web")
             # Intentar con índice diferente
-            self.cap = cv2.VideoCapture(1)
+            self.cap = cv2.VideoCapture(indice + 1)
             if not self.cap.isOpened():
                 print("❌ No hay cámaras disponibles")
                 sys.exit()
@@ -57,29 +189,24 @@ class DetectorExpresiones:
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         
-        # Cargar detector de rostros
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        
-        # Variables de estado
-        self.expresion_actual = "neutral"
-        self.ejecutando = True
-        self.mostrar_debug = False
-        self.ultimo_cambio = time.time()
-        self.confianza = 0.0
-        self.rostro_detectado = False
-        
-        print("✅ ¡Sistema listo!")
+        # Captura en su propio hilo (buffer circular con el frame más reciente)
+        self.captura = CapturaEnHilo(self.cap, capacidad=2, instrumentacion=self.instrumentacion)
     
     def crear_imagen_alternativa(self, expresion, tamano=(280, 280)):
-        """Crea una imagen alternativa si no se puede cargar la original"""
-        img = pygame.Surface(tamano)
+        """Crea una imagen alternativa si no se puede cargar la original (guardada en .cache/)"""
         color = self.colores.get(expresion, (100, 100, 100))
+        version = "-".join(str(c) for c in color)
+        return superficie_cacheada(
+            f"alternativa_{expresion}", version, tamano,
+            lambda: self.dibujar_imagen_alternativa(expresion, color, tamano)
+        )
+    
+    def dibujar_imagen_alternativa(self, expresion, color, tamano):
+        img = pygame.Surface(tamano)
         img.fill(color)
         
         # Añadir texto y emoji
-        font = pygame.font.SysFont('Arial', 72)
+        font = fuente('Arial', 72)
         emojis = {
             'feliz': '😊',
             'triste': '😢',
@@ -92,7 +219,7 @@ class DetectorExpresiones:
         texto_rect = texto_emoji.get_rect(center=(tamano[0]//2, tamano[1]//2 - 30))
         img.blit(texto_emoji, texto_rect)
         
-        font_nombre = pygame.font.SysFont('Arial', 36, bold=True)
+        font_nombre = fuente('Arial', 36, negrita=True)
         nombre = font_nombre.render(expresion.upper(), True, (255, 255, 255))
         nombre_rect = nombre.get_rect(center=(tamano[0]//2, tamano[1]//2 + 50))
         img.blit(nombre, nombre_rect)
@@ -101,6 +228,7 @@ class DetectorExpresiones:
     
     def cargar_imagenes_seguro(self):
         """Carga imágenes con múltiples intentos y formatos"""
+        inicio = time.perf_counter()
         imagenes = {}
         expresiones = ['feliz', 'triste', 'sorpresa', 'neutral', 'enojado']
         
@@ -113,11 +241,8 @@ class DetectorExpresiones:
                 ruta = self.ruta_base / "imagenes" / f"{expresion}{fmt}"
                 if ruta.exists():
                     try:
-                        print(f"🔄 Intentando cargar: {ruta.name}")
-                        img = pygame.image.load(str(ruta))
-                        img = pygame.transform.scale(img, (280, 280))
-                        imagenes[expresion] = img
-                        print(f"✅ Cargada: {ruta.name}")
+                        # Ya escalada y convertida desde .cache/ si el original no ha cambiado
+                        imagenes[expresion] = imagen_escalada(ruta, (280, 280))
                         cargada = True
                         break
                     except pygame.error as e:
@@ -128,90 +253,47 @@ class DetectorExpresiones:
                 print(f"📝 Creando imagen alternativa para: {expresion}")
                 imagenes[expresion] = self.crear_imagen_alternativa(expresion)
         
+        print(f"🖼️  {len(imagenes)} imágenes de expresión ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
         return imagenes
     
-    def analizar_expresion(self, rostro_gris):
-        """Analiza expresión facial de manera simple pero efectiva"""
-        h, w = rostro_gris.shape
-        
-        if h < 50 or w < 50:
-            return "neutral", 0.5
-        
-        try:
-            # 1. Analizar región de la boca
-            boca_y1, boca_y2 = int(h * 0.65), int(h * 0.9)
-            boca_x1, boca_x2 = int(w * 0.25), int(w * 0.75)
-            
-            if boca_y2 > boca_y1 and boca_x2 > boca_x1:
-                region_boca = rostro_gris[boca_y1:boca_y2, boca_x1:boca_x2]
-                
-                # Calcular brillo promedio de la boca
-                brillo_boca = np.mean(region_boca)
-                
-                # Detectar bordes en la boca
-                bordes_boca = cv2.Canny(region_boca, 50, 150)
-                intensidad_boca = np.mean(bordes_boca)
-                
-                # 2. Analizar región de ojos
-                ojos_y1, ojos_y2 = int(h * 0.2), int(h * 0.5)
-                ojos_x1, ojos_x2 = int(w * 0.15), int(w * 0.85)
-                
-                region_ojos = rostro_gris[ojos_y1:ojos_y2, ojos_x1:ojos_x2]
-                brillo_ojos = np.mean(region_ojos)
-                
-                # 3. Lógica mejorada de detección
-                # SORPRESA: Boca muy activa (muchos bordes)
-                if intensidad_boca > 40:
-                    return "sorpresa", min(0.9, intensidad_boca / 100)
-                
-                # FELIZ: Boca moderadamente activa, ojos normales
-                elif intensidad_boca > 20 and brillo_ojos > 80:
-                    return "feliz", min(0.8, intensidad_boca / 80)
-                
-                # ENOJADO: Ojos oscuros (entrecerrados), boca inactiva
-                elif brillo_ojos < 70 and intensidad_boca < 15:
-                    return "enojado", 0.7
-                
-                # TRISTE: Todo muy oscuro/inactivo
-                elif brillo_boca < 80 and brillo_ojos < 80:
-                    return "triste", 0.6
-                
-                # NEUTRAL: Por defecto
-                else:
-                    return "neutral", 0.5
-                    
-            else:
-                return "neutral", 0.3
-                
-        except Exception as e:
-            if self.mostrar_debug:
-                print(f"Error en análisis: {e}")
-            return "neutral", 0.1
-    
-    def dibujar_interfaz(self, frame_pygame):
-        """Dibuja la interfaz gráfica"""
+    def dibujar_estatico(self, superficie):
+        """Dibuja lo que nunca cambia: fondo, título, marcos e instrucciones"""
         # Fondo
-        self.screen.fill((25, 30, 40))
+        superficie.fill((25, 30, 40))
         
         # ===== TÍTULO =====
         titulo = self.font_grande.render("😊 DETECTOR DE EXPRESIONES", True, (100, 220, 255))
-        self.screen.blit(titulo, (50, 20))
+        superficie.blit(titulo, (50, 20))
         
         # ===== VIDEO EN VIVO =====
         # Marco del video
-        pygame.draw.rect(self.screen, (40, 45, 60), (40, 80, 660, 500), 0, 10)
-        pygame.draw.rect(self.screen, (80, 180, 255), (40, 80, 660, 500), 3, 10)
-        
-        # Video de la cámara
-        self.screen.blit(frame_pygame, (50, 90))
+        pygame.draw.rect(superficie, (40, 45, 60), (40, 80, 660, 500), 0, 10)
+        pygame.draw.rect(superficie, (80, 180, 255), (40, 80, 660, 500), 3, 10)
         
-        # Indicador de estado
-        estado_color = (0, 255, 0) if self.rostro_detectado else (255, 100, 100)
-        estado_texto = "✓ ROSTRO DETECTADO" if self.rostro_detectado else "BUSCANDO ROSTRO..."
-        estado = self.font_mediana.render(estado_texto, True, estado_color)
-        self.screen.blit(estado, (60, 600))
+        # ===== INSTRUCCIONES =====
+        instrucciones = [
+            "🎮 CONTROLES:",
+            "• ESPACIO: Pausar/Reanudar",
+            "• ESC: Salir del programa",
+            "",
+            "💡 PARA MEJOR DETECCIÓN:",
+            "1. Buena iluminación frontal",
+            "2. Haz expresiones exageradas",
+            "3. Mantén el rostro centrado",
+            "4. Sonríe ampliamente para FELIZ",
+            "5. Abre la boca para SORPRESA"
+        ]
         
-        # ===== EXPRESIÓN DETECTADA =====
+        y_pos = 500
+        for i, linea in enumerate(instrucciones):
+            color = (180, 220, 255) if i == 0 else (180, 200, 180)
+            fuente = self.font_chica
+            texto = fuente.render(linea, True, color)
+            superficie.blit(texto, (740, y_pos))
+            y_pos += 25
+    
+    def dibujar_panel_expresion(self):
+        """Marco, imagen, nombre, confianza y barra de la expresión actual"""
         # Marco de expresión
         pygame.draw.rect(self.screen, (35, 40, 55), (720, 80, 350, 350), 0, 15)
         color_borde = self.colores.get(self.expresion_actual, (200, 200, 200))
@@ -247,131 +329,463 @@ class DetectorExpresiones:
             100
         )
         pygame.draw.rect(self.screen, color_barra, (barra_x, barra_y, progreso, 20), 0, 10)
+    
+    def dibujar_estado(self):
+        """Indicador de rostro detectado / buscando"""
+        estado_color = (0, 255, 0) if self.rostro_detectado else (255, 100, 100)
+        estado_texto = "✓ ROSTRO DETECTADO" if self.rostro_detectado else "BUSCANDO ROSTRO..."
+        estado = self.font_mediana.render(estado_texto, True, estado_color)
+        self.screen.blit(estado, (60, 600))
+    
+    def dibujar_debug(self):
+        """Líneas de depuración bajo el video, recortadas a RECT_DEBUG"""
+        # Con repintado por zonas sólo se restaura RECT_DEBUG: el texto que se
+        # saliera de ahí dejaría píxeles viejos en pantalla
+        recorte = self.screen.get_clip()
+        self.screen.set_clip(RECT_DEBUG)
+        try:
+            self.dibujar_lineas_debug()
+        finally:
+            self.screen.set_clip(recorte)
+    
+    def dibujar_lineas_debug(self):
+        if self.latencias_ms:
+            debug = self.font_chica.render(
+                f"Latencia: {self.latencias_ms[-1]:.0f} ms "
+                f"(media {np.mean(self.latencias_ms):.0f} ms) | "
+                f"Descartados: {self.frames_descartados}",
+                True, (255, 200, 100)
+            )
+            self.screen.blit(debug, (60, 640))
+        
+        if self.multirostro:
+            # Con varios rostros no hay seguimiento por ROI: se muestran rostros e hilos
+            texto = f"Rostros: {len(self.rostros_pista)} | Hilos: {self.analizador.hilos_usados}"
+        else:
+            texto = self.analisis.seguidor.resumen()
+        seguimiento = self.font_chica.render(texto, True, (255, 200, 100))
+        self.screen.blit(seguimiento, (60, 665))
+        
+        plan = self.analisis.planificador
+        calidad = self.font_chica.render(
+            f"Nivel {plan.nivel}/{len(plan.niveles) - 1}: {plan.tiempo_frame_ms:.0f} ms | "
+            f"Caché: {self.analisis.cache.estadisticas()['porcentaje_aciertos']:.0f}%",
+            True, (255, 200, 100)
+        )
+        self.screen.blit(calidad, (470, 640))
         
-        # ===== INSTRUCCIONES =====
-        instrucciones = [
-            "🎮 CONTROLES:",
-            "• ESPACIO: Pausar/Reanudar",
-            "• ESC: Salir del programa",
-            "",
-            "💡 PARA MEJOR DETECCIÓN:",
-            "1. Buena iluminación frontal",
-            "2. Haz expresiones exageradas",
-            "3. Mantén el rostro centrado",
-            "4. Sonríe ampliamente para FELIZ",
-            "5. Abre la boca para SORPRESA"
-        ]
+        if self.tiempos_render_ms:
+            render = self.font_chica.render(
+                f"Render: {np.mean(self.tiempos_render_ms):.1f} ms", True, (255, 200, 100)
+            )
+            self.screen.blit(render, (560, 665))
+    
+    def dibujar_pistas(self, frame_rgb):
+        """Caja, ID y expresión de cada rostro (modo varios rostros)"""
+        for id_pista, (x, y, w, h), expresion, _ in self.rostros_pista:
+            color_rect = self.colores.get(expresion, (0, 255, 0))[::-1]
+            cv2.rectangle(frame_rgb, (x, y), (x+w, y+h), color_rect, 3)
+            cv2.putText(frame_rgb, f"#{id_pista} {expresion.upper()}", (x, y-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, color_rect, 2)
+    
+    def dibujar_estadisticas(self):
+        """Panel de FPS y percentiles por etapa sobre el video (se repinta con cada frame)"""
+        lineas = self.instrumentacion.lineas()
+        alto_linea = self.font_debug.get_linesize()
+        panel = pygame.Surface((330, alto_linea * len(lineas) + 10), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, linea in enumerate(lineas):
+            texto = self.font_debug.render(linea, True, (255, 220, 120))
+            panel.blit(texto, (6, 5 + i * alto_linea))
+        self.screen.blit(panel, RECT_VIDEO.topleft)
+    
+    def restaurar(self, rect):
+        """Vuelve a poner el fondo estático en un rectángulo antes de repintarlo"""
+        self.screen.blit(self.fondo, rect, rect)
+        return rect
+    
+    def dibujar_interfaz(self, frame_pygame, frame_nuevo=True):
+        """
+        Dibuja la interfaz gráfica. Lo estático sale de self.fondo (pre-renderizado
+        una vez) y sólo se repinta lo que ha cambiado. Devuelve la lista de
+        rectángulos a actualizar, o None si se ha repintado la pantalla entera.
+        """
+        panel = (self.expresion_actual, self.confianza)
+        
+        # Repintado completo: primer frame, ventana expuesta o modo comparación
+        if self.repintado_completo or self.redibujar_todo:
+            if self.repintado_completo:
+                # Como antes: todo desde cero en cada frame
+                self.dibujar_estatico(self.screen)
+            else:
+                self.screen.blit(self.fondo, (0, 0))
+            
+            self.screen.blit(frame_pygame, RECT_VIDEO)
+            if self.mostrar_debug and self.instrumentacion.activa:
+                self.dibujar_estadisticas()
+            self.dibujar_estado()
+            self.dibujar_panel_expresion()
+            if self.mostrar_debug:
+                self.dibujar_debug()
+            
+            self.redibujar_todo = False
+            self.ultimo_panel = panel
+            self.ultimo_estado = self.rostro_detectado
+            self.debug_visible = self.mostrar_debug
+            return None
         
-        y_pos = 500
-        for i, linea in enumerate(instrucciones):
-            color = (180, 220, 255) if i == 0 else (180, 200, 180)
-            fuente = self.font_chica
-            texto = fuente.render(linea, True, color)
-            self.screen.blit(texto, (740, y_pos))
-            y_pos += 25
+        rects = []
+        
+        # ===== VIDEO EN VIVO =====
+        if frame_nuevo:
+            self.screen.blit(frame_pygame, RECT_VIDEO)
+            if self.mostrar_debug and self.instrumentacion.activa:
+                self.dibujar_estadisticas()
+            rects.append(RECT_VIDEO)
+        
+        # Indicador de estado
+        if self.rostro_detectado != self.ultimo_estado:
+            rects.append(self.restaurar(RECT_ESTADO))
+            self.dibujar_estado()
+            self.ultimo_estado = self.rostro_detectado
+        
+        # ===== EXPRESIÓN DETECTADA =====
+        if panel != self.ultimo_panel:
+            rects.append(self.restaurar(RECT_PANEL))
+            self.dibujar_panel_expresion()
+            self.ultimo_panel = panel
+        
+        # ===== DEBUG =====
+        if self.mostrar_debug or self.debug_visible:
+            rects.append(self.restaurar(RECT_DEBUG))
+            if self.mostrar_debug:
+                self.dibujar_debug()
+            self.debug_visible = self.mostrar_debug
+        
+        return rects
+    
+    def analizar_rostros(self, gris, rostros):
+        """Modo varios rostros: asigna pistas, analiza todos los rostros en paralelo y filtra cada uno"""
+        analisis = self.analisis
+        cache = analisis.cache
+        pistas = self.seguidor_multiple.actualizar(rostros)
+        for pista in pistas:
+            pista.caja = cache.estabilizar(pista.id, pista.caja)
+        recortes = [gris[y:y+h, x:x+w] for x, y, w, h in (p.caja for p in pistas)]
+        
+        with self.instrumentacion.etapa('4_analisis'):
+            # Sólo se analizan los rostros que han cambiado; el resto sale de la caché
+            resultados = [None] * len(pistas)
+            pendientes = []
+            for i, (pista, recorte) in enumerate(zip(pistas, recortes)):
+                resultados[i], huella = cache.consultar(pista.id, recorte)
+                if resultados[i] is None:
+                    pendientes.append((i, huella))
+            
+            if pendientes:
+                inicio = time.perf_counter()
+                calculados = self.analizador.analizar([recortes[i] for i, _ in pendientes])
+                coste_ms = (time.perf_counter() - inicio) * 1000 / len(pendientes)
+                for (i, huella), resultado in zip(pendientes, calculados):
+                    resultados[i] = resultado
+                    cache.guardar(pistas[i].id, huella, resultado, coste_ms)
+            
+            cache.conservar(p.id for p in self.seguidor_multiple.pistas)
+        
+        for pista, (expresion, confianza, _) in zip(pistas, resultados):
+            pista.actualizar_expresion(expresion, confianza)
+        
+        # Copia para el hilo de interfaz (se reemplaza entera, nunca se modifica)
+        self.rostros_pista = [(p.id, p.caja, p.expresion, p.confianza) for p in pistas]
+        
+        # El panel (y el registro) muestran el rostro más grande
+        if pistas:
+            i = max(range(len(pistas)), key=lambda i: pistas[i].caja[2] * pistas[i].caja[3])
+            principal = pistas[i]
+            analisis.caja = principal.caja
+            analisis.expresion = principal.expresion
+            analisis.confianza = principal.confianza
+            analisis.caracteristicas = resultados[i][2]
+        else:
+            analisis.caja = None
+            analisis.expresion = "neutral"
+            analisis.confianza = 0.0
+            analisis.caracteristicas = None
+    
+    def aplicar_resultado(self, caja, expresion, confianza, caracteristicas):
+        """Resultado de un frame analizado (en el hilo o en el proceso de análisis): a la interfaz, registro y servidor"""
+        self.caja_rostro = caja
+        self.expresion_actual = expresion
+        self.confianza = confianza
+        self.caracteristicas = caracteristicas
+        self.rostro_detectado = caja is not None
+        if self.registro is not None:
+            self.registrar_resultado()
+        if self.servidor is not None:
+            self.publicar_resultado()
+    
+    def registrar_resultado(self):
+        """Añade al registro la expresión mostrada y las características del último análisis"""
+        intensidad_boca = brillo_ojos = np.nan
+        if self.caracteristicas is not None:
+            intensidad_boca, _, brillo_ojos = self.caracteristicas
+        if self.rostro_detectado:
+            expresion, confianza = self.expresion_actual, self.confianza
+        else:
+            expresion, confianza = None, np.nan   # Sin rostro no hay clasificación (NaN, como en registro.py)
+        self.registro.agregar(
+            time.time(), self.caja_rostro, expresion, confianza,
+            intensidad_boca=intensidad_boca, brillo_ojos=brillo_ojos
+        )
+    
+    def publicar_resultado(self):
+        """Envía el resultado del frame a los clientes del servidor (no espera a ninguno)"""
+        caja = self.caja_rostro
+        resultado = {
+            'instante': time.time(),
+            'expresion': self.expresion_actual if self.rostro_detectado else None,
+            'confianza': round(float(self.confianza), 3),
+            'rostro': [int(v) for v in caja] if caja is not None else None,
+            'pupila': None,   # El detector no mide la pupila (ver prueba_deteccion.py)
+        }
+        if self.multirostro:
+            resultado['rostros'] = [
+                {'id': id_pista, 'rostro': [int(v) for v in c], 'expresion': e, 'confianza': round(float(conf), 3)}
+                for id_pista, c, e, conf in self.rostros_pista
+            ]
+        self.servidor.publicar(resultado)
+    
+    def bucle_analisis(self):
+        """Hilo de análisis: consume el frame más reciente a su propio ritmo"""
+        ultima_secuencia = 0
+        analisis = self.analisis
+        analizar_rostros = self.analizar_rostros if self.multirostro else None
+        
+        # Cargar el clasificador aquí, en paralelo con la apertura de la cámara
+        try:
+            analisis.cargar()
+        except Exception as e:
+            # Modelo dañado o ilegible: parar el programa en vez de mostrar "sin rostro" para siempre
+            print(f"❌ No se pudo cargar el detector de rostros '{self.detector_rostro}': {e}")
+            self.ejecutando = False
+            return
+        self.arranque_ms['clasificador'] = analisis.ms_carga
+        self.camara_lista.wait()
+        
+        while self.ejecutando:
+            if self.pausado:
+                time.sleep(0.05)
+                continue
+            
+            dato = self.captura.ultimo(despues_de=ultima_secuencia, timeout=0.1)
+            if dato is None:
+                if self.captura.error:
+                    break
+                continue
+            ultima_secuencia, _, frame = dato
+            
+            # 2-4. DETECTAR Y ANALIZAR (con poca calidad, no en todos los frames)
+            gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY,
+                                dst=analisis.pool.obtener(frame.shape[:2], nombre="gris"))
+            analisis.debug = self.mostrar_debug
+            if analisis.analizar(gris, analizar_rostros):
+                self.aplicar_resultado(analisis.caja, analisis.expresion, analisis.confianza,
+                                       analisis.caracteristicas)
+            self.instrumentacion.frame('analisis')
+            self.memoria.frame()
+    
+    def bucle_resultados(self):
+        """Modo procesos: aplica en la interfaz los resultados del proceso de análisis"""
+        pipeline = self.pipeline
+        while self.ejecutando and not pipeline.terminado:
+            resultado = pipeline.siguiente_resultado(timeout=0.1)
+            if 'clasificador' not in self.arranque_ms and pipeline.ms_carga_detector is not None:
+                self.arranque_ms['clasificador'] = pipeline.ms_carga_detector
+                print(f"🧩 Detector de rostros: {pipeline.nombre_detector} "
+                      f"(proceso de análisis, cargado en {pipeline.ms_carga_detector:.0f} ms)")
+            if resultado is not None:
+                self.aplicar_resultado(*resultado[2:6])
+        if pipeline.error:
+            print(f"❌ {pipeline.error}")
+            self.ejecutando = False
     
     def ejecutar(self):
-        """Bucle principal del programa"""
+        """Bucle principal del programa (interfaz); captura y análisis van en sus propios hilos (o procesos)"""
         print("\n▶️  Iniciando detección...")
         print("   Haz expresiones faciales frente a la cámara")
         
-        pausado = False
+        # Ventana visible antes de abrir la cámara (lo más lento del arranque)
+        self.screen.blit(self.fondo, (0, 0))
+        pygame.display.flip()
+        
+        inicio = time.perf_counter()
+        if self.procesos:
+            self.pipeline = PipelineProcesos(camara=self.camara, **self.opciones_analisis).iniciar()
+            self.captura = self.pipeline.captura
+            self.arranque_ms['camara'] = (time.perf_counter() - inicio) * 1000
+            hilo_analisis = threading.Thread(target=self.bucle_resultados, name="resultados", daemon=True)
+            hilo_analisis.start()
+        else:
+            hilo_analisis = threading.Thread(target=self.bucle_analisis, name="analisis", daemon=True)
+            hilo_analisis.start()
+            self.abrir_camara(self.camara)
+            self.arranque_ms['camara'] = (time.perf_counter() - inicio) * 1000
+            self.captura.iniciar()
+            self.camara_lista.set()
+        
+        instr = self.instrumentacion
+        reloj = pygame.time.Clock()
+        ultima_secuencia = 0
+        frame_pygame = None
         
         while self.ejecutando:
-            if not pausado:
-                # 1. LEER CÁMARA
-                ret, frame = self.cap.read()
-                if not ret:
+            instante_captura = None
+            
+            if not self.pausado:
+                # 1. LEER CÁMARA (frame más reciente del buffer, sin bloquear la interfaz)
+                dato = self.captura.ultimo(despues_de=ultima_secuencia, timeout=0.03)
+                if dato is None and self.captura.error:
                     print("❌ Error leyendo cámara")
                     break
                 
-                # Voltear horizontalmente (como espejo)
-                frame = cv2.flip(frame, 1)
-                
-                # 2. DETECTAR ROSTROS
-                gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                rostros = self.face_cascade.detectMultiScale(
-                    gris, 
-                    scaleFactor=1.1, 
-                    minNeighbors=6, 
-                    minSize=(100, 100)
-                )
-                
-                self.rostro_detectado = len(rostros) > 0
-                
-                # 3. PROCESAR ROSTRO
-                if len(rostros) > 0:
-                    # Tomar el rostro más grande
-                    x, y, w, h = max(rostros, key=lambda r: r[2] * r[3])
-                    
-                    # Dibujar rectángulo alrededor del rostro
-                    color_rect = self.colores.get(self.expresion_actual, (0, 255, 0))
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), color_rect, 3)
-                    
-                    # Recortar rostro para análisis
-                    rostro_gris = gris[y:y+h, x:x+w]
-                    
-                    # 4. ANALIZAR EXPRESIÓN
-                    expresion, confianza = self.analizar_expresion(rostro_gris)
+                if dato is not None:
+                    secuencia, instante_captura, frame = dato
+                    if ultima_secuencia:
+                        self.frames_descartados += secuencia - ultima_secuencia - 1
+                    ultima_secuencia = secuencia
                     
-                    # Actualizar con filtro temporal (evita cambios bruscos)
-                    tiempo_actual = time.time()
-                    if tiempo_actual - self.ultimo_cambio > 0.4:  # 400ms entre cambios
-                        self.expresion_actual = expresion
-                        self.confianza = confianza
-                        self.ultimo_cambio = tiempo_actual
-                    
-                    # Mostrar expresión en video
-                    cv2.putText(
-                        frame, 
-                        f"{self.expresion_actual.upper()}", 
-                        (x, y-10), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 
-                        0.9, 
-                        color_rect, 
-                        2
-                    )
-                else:
-                    self.expresion_actual = "neutral"
-                    self.confianza = 0.0
-                
-                # 5. CONVERTIR PARA PYGAME
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame_rotado = np.rot90(frame_rgb)
-                frame_pygame = pygame.surfarray.make_surface(frame_rotado)
+                    # 5. CONVERTIR PARA PYGAME (en buffers reservados: el frame del buffer no se toca)
+                    with instr.etapa('5_conversion'):
+                        frame_rgb = self.presentador.convertir(frame)
+                        
+                        # Dibujar el último resultado del análisis sobre el video
+                        caja = self.caja_rostro
+                        if self.multirostro:
+                            self.dibujar_pistas(frame_rgb)
+                        elif caja is not None:
+                            x, y, w, h = caja
+                            # Colores pensados para BGR: se invierten al dibujar sobre RGB
+                            color_rect = self.colores.get(self.expresion_actual, (0, 255, 0))[::-1]
+                            cv2.rectangle(frame_rgb, (x, y), (x+w, y+h), color_rect, 3)
+                            cv2.putText(
+                                frame_rgb, 
+                                f"{self.expresion_actual.upper()}", 
+                                (x, y-10), 
+                                cv2.FONT_HERSHEY_SIMPLEX, 
+                                0.9, 
+                                color_rect, 
+                                2
+                            )
+                        
+                        frame_pygame = self.presentador.presentar()
             
             # 6. DIBUJAR INTERFAZ
-            self.dibujar_interfaz(frame_pygame)
-            
-            if pausado:
-                # Texto de pausa
-                pausa_text = self.font_grande.render("⏸️  PAUSADO", True, (255, 100, 100))
-                pausa_rect = pausa_text.get_rect(center=(550, 300))
-                self.screen.blit(pausa_text, pausa_rect)
+            inicio_render = time.perf_counter()
+            with instr.etapa('6_interfaz'):
+                rects = []
+                if frame_pygame is not None:
+                    rects = self.dibujar_interfaz(frame_pygame, frame_nuevo=instante_captura is not None)
+                
+                if self.pausado:
+                    # Texto de pausa
+                    pausa_text = self.font_grande.render("⏸️  PAUSADO", True, (255, 100, 100))
+                    pausa_rect = pausa_text.get_rect(center=(550, 300))
+                    self.screen.blit(pausa_text, pausa_rect)
+                    if rects is not None:
+                        rects.append(pausa_rect)
             
             # 7. MANEJAR EVENTOS
-            for evento in pygame.event.get():
-                if evento.type == pygame.QUIT:
-                    self.ejecutando = False
-                elif evento.type == pygame.KEYDOWN:
-                    if evento.key == pygame.K_ESCAPE:
+            with instr.etapa('7_eventos'):
+                for evento in pygame.event.get():
+                    if evento.type == pygame.QUIT:
                         self.ejecutando = False
-                        print("\n🛑 Programa finalizado")
-                    elif evento.key == pygame.K_SPACE:
-                        pausado = not pausado
-                        print(f"⏸️  Pausa: {'ACTIVADA' if pausado else 'DESACTIVADA'}")
+                    elif evento.type == pygame.KEYDOWN:
+                        if evento.key == pygame.K_ESCAPE:
+                            self.ejecutando = False
+                            print("\n🛑 Programa finalizado")
+                        elif evento.key == pygame.K_SPACE:
+                            self.pausado = not self.pausado
+                            print(f"⏸️  Pausa: {'ACTIVADA' if self.pausado else 'DESACTIVADA'}")
+                        elif evento.key == pygame.K_d:
+                            self.mostrar_debug = not self.mostrar_debug
+                    elif evento.type == pygame.VIDEOEXPOSE:
+                        self.redibujar_todo = True
+            
+            # 8. ACTUALIZAR PANTALLA (sólo las zonas que han cambiado)
+            with instr.etapa('8_pantalla'):
+                if rects is None:
+                    pygame.display.flip()
+                elif rects:
+                    pygame.display.update(rects)
+            self.tiempos_render_ms.append((time.perf_counter() - inicio_render) * 1000)
             
-            # 8. ACTUALIZAR PANTALLA
-            pygame.display.flip()
-            pygame.time.Clock().tick(30)  # 30 FPS
+            # Latencia captura -> pantalla del frame que se acaba de mostrar
+            if instante_captura is not None:
+                if 'primer_frame' not in self.arranque_ms:
+                    self.informar_arranque()
+                self.latencias_ms.append((time.perf_counter() - instante_captura) * 1000)
+                instr.registrar('latencia_total', self.latencias_ms[-1])
+            
+            instr.frame('ui')
+            reloj.tick(30)  # 30 FPS
         
         # 9. LIMPIAR RECURSOS
+        self.ejecutando = False
+        hilo_analisis.join(timeout=1.0)
         self.finalizar()
     
+    def informar_arranque(self):
+        """Tiempo hasta el primer frame en pantalla, con el desglose de lo que se abrió por el camino"""
+        a = self.arranque_ms
+        a['primer_frame'] = (time.perf_counter() - INICIO_PROCESO) * 1000
+        # El clasificador se carga en paralelo (hilo o proceso de análisis): puede no estar aún
+        clasificador = f"{a['clasificador']:.0f} ms" if 'clasificador' in a else "aún cargando"
+        print(f"⏱️  Primer frame en {a['primer_frame']:.0f} ms (interfaz {a['interfaz']:.0f} ms, "
+              f"cámara {a.get('camara', 0):.0f} ms, clasificador {clasificador})")
+        if self.analisis.backend is not None:
+            print(f"🧩 Detector de rostros: {self.analisis.backend.nombre}")
+    
     def finalizar(self):
         """Libera todos los recursos"""
         print("\n🧹 Limpiando recursos...")
-        self.cap.release()
+        if self.latencias_ms:
+            print(f"⏱️  Latencia captura->pantalla: media {np.mean(self.latencias_ms):.1f} ms, "
+                  f"p95 {np.percentile(self.latencias_ms, 95):.1f} ms "
+                  f"({self.frames_descartados} frames descartados)")
+        if self.tiempos_render_ms:
+            modo = "completo" if self.repintado_completo else "por zonas"
+            print(f"🖼️  Render ({modo}): media {np.mean(self.tiempos_render_ms):.2f} ms/frame")
+        if self.pipeline is not None:
+            # Los contadores del análisis están en su proceso: los manda al terminar
+            self.pipeline.detener()
+            for linea in self.pipeline.resumenes:
+                print(linea)
+        else:
+            for linea in self.analisis.resumenes():
+                print(linea)
+        if self.memoria.activo:
+            print(f"🧠 {self.memoria.resumen()}")
+            print(f"   {self.analisis.pool.resumen()}")
+            self.memoria.detener()
+        if self.multirostro:
+            print(f"👥 Pistas creadas: {self.seguidor_multiple.siguiente_id - 1} | "
+                  f"coste por rostro: {self.analizador.coste_rostro_ms:.1f} ms")
+            self.analizador.cerrar()
+        if self.registro is not None:
+            self.registro.cerrar()
+            print(f"📄 Registro: {self.registro.filas} frames en {self.registro.carpeta}")
+        if self.servidor is not None:
+            print(f"📡 {self.servidor.resumen()}")
+            self.servidor.detener()
+        if self.instrumentacion.activa:
+            print("📈 Tiempos por etapa:")
+            for linea in self.instrumentacion.lineas():
+                print(f"   {linea}")
+            self.instrumentacion.volcar()
+        if self.captura is not None and self.cap is not None:
+            self.captura.detener()
+            self.cap.release()
+        fuente.cache_clear()   # Las fuentes no sobreviven a pygame.quit()
         pygame.quit()
         cv2.destroyAllWindows()
         print("✅ Programa finalizado correctamente")
@@ -384,8 +798,86 @@ if __name__ == "__main__":
     print("🎭 DETECTOR DE EXPRESIONES FACIALES")
     print("=" * 50)
     
+    parser = argparse.ArgumentParser(description="Detector de expresiones faciales")
+    parser.add_argument('--sin-seguimiento', action='store_true',
+                        help="Escanear el frame completo en cada frame")
+    parser.add_argument('--intervalo-deteccion', type=int, default=15,
+                        help="Frames entre escaneos completos en modo seguimiento")
+    parser.add_argument('--margen-roi', type=float, default=0.5,
+                        help="Margen de la ROI alrededor del rostro (fracción de su tamaño)")
+    parser.add_argument('--escala-completa', type=float, default=1.0,
+                        help="Reducción del frame en los escaneos completos (ej. 0.5)")
+    parser.add_argument('--repintado-completo', action='store_true',
+                        help="Repintar toda la ventana en cada frame (para comparar tiempos de render)")
+    parser.add_argument('--instrumentar', action='store_true',
+                        help="Medir tiempos por etapa (FPS y p50/p95/p99 en el modo debug, tecla D)")
+    parser.add_argument('--volcado-estadisticas', default=None,
+                        help="Fichero JSONL donde volcar las estadísticas cada 10 s")
+    parser.add_argument('--multirostro', action='store_true',
+                        help="Analizar todos los rostros del frame, cada uno con su ID de pista")
+    parser.add_argument('--presupuesto-analisis', type=float, default=20.0,
+                        help="Tiempo máximo (ms) para analizar todos los rostros de un frame")
+    parser.add_argument('--hilos-analisis', type=int, default=4,
+                        help="Máximo de hilos para el análisis de varios rostros")
+    parser.add_argument('--objetivo-ms', type=float, default=33.0,
+                        help="Tiempo objetivo de análisis por frame; si no se llega, baja la calidad")
+    parser.add_argument('--calidad-fija', action='store_true',
+                        help="No adaptar la calidad (siempre resolución y parámetros completos)")
+    parser.add_argument('--perfil', default=None,
+                        help="Perfil de calibración (por defecto, el último calibrado)")
+    parser.add_argument('--sin-perfil', action='store_true',
+                        help="Usar los umbrales por defecto aunque haya un perfil activo")
+    parser.add_argument('--ventana-suavizado', type=int, default=6,
+                        help="Frames analizados que se tienen en cuenta para decidir la expresión")
+    parser.add_argument('--histeresis', type=float, default=0.2,
+                        help="Ventaja (fracción de la ventana) que necesita otra expresión para cambiar")
+    parser.add_argument('--sin-cache', action='store_true',
+                        help="Analizar siempre, aunque el rostro no haya cambiado")
+    parser.add_argument('--umbral-cache', type=float, default=3.0,
+                        help="Cambio medio (niveles de gris) a partir del cual se vuelve a analizar")
+    parser.add_argument('--registro', nargs='?', const='', default=None,
+                        help="Guardar los resultados por frame (carpeta; sin valor, sesiones/<fecha>)")
+    parser.add_argument('--detector', default=None,
+                        help="Detector de rostros: haar_default, haar_alt2, haar_alt2@0.5... "
+                             "(por defecto el elegido en este equipo)")
+    parser.add_argument('--elegir-detector', nargs='+', default=None, metavar='VIDEO',
+                        help="Medir los detectores con estos vídeos y usar (y guardar) el más rápido")
+    parser.add_argument('--servidor', nargs='?', type=int, const=8765, default=None,
+                        help="Publicar los resultados en http://127.0.0.1:PUERTO (por defecto 8765)")
+    parser.add_argument('--procesos', action='store_true',
+                        help="Captura, análisis e interfaz en procesos separados (frames en memoria compartida)")
+    parser.add_argument('--medir-memoria', action='store_true',
+                        help="Memoria pedida por frame analizado (tracemalloc, más lento)")
+    args = parser.parse_args()
+    
     try:
-        detector = DetectorExpresiones()
+        if args.elegir_detector:
+            print(f"⏱️  Eligiendo detector de rostros (recall medido como acuerdo con {REFERENCIA})...")
+            args.detector = args.detector or elegir_backend(args.elegir_detector)[0]
+        detector = DetectorExpresiones(
+            seguimiento=not args.sin_seguimiento,
+            intervalo_deteccion=args.intervalo_deteccion,
+            margen_roi=args.margen_roi,
+            escala_completa=args.escala_completa,
+            repintado_completo=args.repintado_completo,
+            instrumentar=args.instrumentar or bool(args.volcado_estadisticas),
+            volcado_estadisticas=args.volcado_estadisticas,
+            multirostro=args.multirostro,
+            presupuesto_analisis_ms=args.presupuesto_analisis,
+            hilos_analisis=args.hilos_analisis,
+            objetivo_frame_ms=None if args.calidad_fija else args.objetivo_ms,
+            perfil=args.perfil,
+            usar_perfil=not args.sin_perfil,
+            ventana_suavizado=args.ventana_suavizado,
+            histeresis=args.histeresis,
+            usar_cache=not args.sin_cache,
+            umbral_cache=args.umbral_cache,
+            registro=None if args.registro is None else (args.registro or nueva_sesion()),
+            servidor=args.servidor,
+            detector_rostro=args.detector,
+            medir_memoria=args.medir_memoria,
+            procesos=args.procesos
+        )
         detector.ejecutar()
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrumpido por el usuario")
@@ -0,0 +1,319 @@
+"""
+detectores_rostro.py
+Detectores de rostros intercambiables. Todos tienen el mismo método que
+cv2.CascadeClassifier, detectMultiScale(gris, scaleFactor, minNeighbors,
+minSize, maxSize), así que sirven tal cual en SeguidorRostro, detectar_rostros
+y el resto del pipeline:
+
+    haar_default, haar_alt, haar_alt2, haar_alt_tree   cascadas de cv2.data.haarcascades
+    <nombre>@0.5                                        reduce el frame, detecta y refina cada rostro
+
+elegir_backend() mide todos en este equipo con vídeos de muestra y se queda
+con el más rápido que encuentra al menos el `recall` pedido de los rostros de
+referencia. Los vídeos no vienen etiquetados: la referencia es haar_default
+con una pirámide de escalas más fina, así que ese "recall" es el acuerdo con
+haar_default, no el recall real. La elección se guarda en .cache/ y los
+siguientes arranques la usan sin volver a medir.
+
+Uso:
+    python detectores_rostro.py muestra1.mp4 muestra2.mp4 --recall 0.8
+    python detector.py --detector haar_alt2@0.5
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from pipeline_rostros import CASCADA_ROSTRO, PARAMETROS_DETECTOR, iou_cajas, obtener_clasificador
+
+CARPETA_CACHE = Path(__file__).parent / ".cache"    # La misma que arranque.py (sin importar pygame)
+ARCHIVO_ELECCION = "detector_rostro.json"
+
+CASCADAS = {
+    'haar_default': CASCADA_ROSTRO,
+    'haar_alt': 'haarcascade_frontalface_alt.xml',
+    'haar_alt2': 'haarcascade_frontalface_alt2.xml',
+    'haar_alt_tree': 'haarcascade_frontalface_alt_tree.xml',
+}
+BACKEND_POR_DEFECTO = 'haar_default'
+ESCALAS_REDUCIDAS = (0.5,)   # Versiones "reducir y refinar" que se prueban al elegir
+REFERENCIA = f"{BACKEND_POR_DEFECTO} con scaleFactor 1.05"   # Contra qué se mide el "recall"
+IOU_DUPLICADO = 0.3          # Refinados que se solapan más que esto son el mismo rostro
+
+
+def _vacio():
+    return np.empty((0, 4), dtype=np.int32)
+
+
+def _sin_duplicados(cajas, iou_maximo=IOU_DUPLICADO):
+    """Supresión de no máximos por área: de cada grupo de cajas solapadas queda la mayor"""
+    if len(cajas) < 2:
+        return cajas
+    cajas = cajas[np.argsort(-(cajas[:, 2] * cajas[:, 3]), kind='stable')]
+    solapes = iou_cajas(cajas, cajas)
+    quedan = []
+    for i in range(len(cajas)):
+        if all(solapes[i, j] <= iou_maximo for j in quedan):
+            quedan.append(i)
+    return cajas[quedan]
+
+
+# ============================================
+# BACKENDS
+# ============================================
+class DetectorHaar:
+    """Cascada Haar (cargada una vez por proceso con obtener_clasificador)"""
+
+    def __init__(self, cascada=CASCADA_ROSTRO, nombre=None):
+        self.nombre = nombre or cascada
+        self.clasificador = obtener_clasificador(cascada)
+
+    def detectMultiScale(self, gris, scaleFactor=1.1, minNeighbors=3, minSize=(0, 0), maxSize=None):
+        return self.clasificador.detectMultiScale(
+            gris, scaleFactor=scaleFactor, minNeighbors=minNeighbors,
+            minSize=minSize, maxSize=maxSize or (0, 0)
+        )
+
+
+class DetectorReducido:
+    """
+    Reducir y refinar: una pasada gruesa sobre el frame reducido (pirámide de
+    escalas más espaciada y menos vecinos exigidos) y una fina a resolución
+    completa sólo alrededor de cada candidato. Los candidatos que no se
+    confirman se descartan, y los refinados que caen sobre el mismo rostro
+    (candidatos solapados de la pasada gruesa) se quedan en uno.
+
+    Con Haar, reducir el frame y minSize en la misma proporción apenas ahorra
+    (la cascada ya trabaja a la escala de minSize): lo que ahorra es la pasada
+    gruesa con factor_grueso, unas 3 veces menos niveles de la pirámide.
+    """
+
+    def __init__(self, base, escala=0.5, margen=0.25, factor_grueso=1.3):
+        self.base = base
+        self.escala = escala
+        self.margen = margen
+        self.factor_grueso = factor_grueso
+        self.nombre = f"{base.nombre}@{escala:g}"
+
+    def detectMultiScale(self, gris, scaleFactor=1.1, minNeighbors=3, minSize=(0, 0), maxSize=None):
+        e = self.escala
+        pequeno = cv2.resize(gris, None, fx=e, fy=e, interpolation=cv2.INTER_AREA)
+        candidatos = self.base.detectMultiScale(
+            pequeno, scaleFactor=max(scaleFactor, self.factor_grueso), minNeighbors=max(1, minNeighbors // 2),
+            minSize=(max(1, int(minSize[0] * e)), max(1, int(minSize[1] * e))),
+            maxSize=(int(maxSize[0] * e), int(maxSize[1] * e)) if maxSize else None
+        )
+
+        alto, ancho = gris.shape[:2]
+        rostros = []
+        for x, y, w, h in np.asarray(candidatos).reshape(-1, 4) / e:
+            # ROI del candidato a resolución completa, con margen para el error de escala
+            mx, my = w * self.margen, h * self.margen
+            x1, y1 = int(max(0, x - mx)), int(max(0, y - my))
+            x2, y2 = int(min(ancho, x + w + mx)), int(min(alto, y + h + my))
+            lado = max(w, h)
+            minimo = max(minSize[0], int(lado * 0.7))
+            maximo = min(x2 - x1, y2 - y1, int(lado * 1.3))
+            if maximo < minimo:
+                continue
+
+            refinados = self.base.detectMultiScale(
+                gris[y1:y2, x1:x2], scaleFactor=scaleFactor, minNeighbors=minNeighbors,
+                minSize=(minimo, minimo), maxSize=(maximo, maximo)
+            )
+            if len(refinados):
+                rx, ry, rw, rh = max(refinados, key=lambda r: r[2] * r[3])
+                rostros.append((rx + x1, ry + y1, rw, rh))
+
+        return _sin_duplicados(np.array(rostros, dtype=np.int32).reshape(-1, 4))
+
+
+# ============================================
+# CATÁLOGO
+# ============================================
+def backends_disponibles(escalas=ESCALAS_REDUCIDAS):
+    """Nombres de los backends que se pueden crear en este equipo"""
+    base = [n for n, cascada in CASCADAS.items()
+            if os.path.isfile(cv2.data.haarcascades + cascada)]
+    return base + [f"{n}@{e:g}" for n in base for e in escalas]
+
+
+def comprobar_backend(nombre):
+    """
+    Comprueba sin cargar nada que crear_backend(nombre) puede funcionar
+    (nombre conocido, escala válida, cascada presente). Lanza ValueError
+    o RuntimeError como crear_backend.
+    """
+    if '@' in nombre:
+        base, escala = nombre.rsplit('@', 1)
+        try:
+            valida = 0 < float(escala) <= 1
+        except ValueError:
+            valida = False
+        if not valida:
+            raise ValueError(f"Escala no válida en {nombre}: debe ser un número entre 0 y 1")
+        return comprobar_backend(base)
+    if nombre in CASCADAS:
+        if not os.path.isfile(cv2.data.haarcascades + CASCADAS[nombre]):
+            raise RuntimeError(f"Falta la cascada {CASCADAS[nombre]} en {cv2.data.haarcascades}")
+        return
+    raise ValueError(f"Detector desconocido: {nombre} (disponibles: {', '.join(backends_disponibles())})")
+
+
+def crear_backend(nombre):
+    """Crea un backend por nombre: 'haar_alt2', 'haar_default@0.5'..."""
+    if '@' in nombre:
+        base, escala = nombre.rsplit('@', 1)
+        return DetectorReducido(crear_backend(base), float(escala))
+    if nombre in CASCADAS:
+        return DetectorHaar(CASCADAS[nombre], nombre)
+    raise ValueError(f"Detector desconocido: {nombre} (disponibles: {', '.join(backends_disponibles())})")
+
+
+# ============================================
+# ELECCIÓN AUTOMÁTICA
+# ============================================
+def huella_equipo():
+    """Lo que tiene que coincidir para reutilizar una elección guardada"""
+    return {'equipo': platform.node(), 'cpu': os.cpu_count(), 'maquina': platform.machine(),
+            'opencv': cv2.__version__}
+
+
+def _grises(clips, max_frames, paso):
+    """Hasta max_frames grises por vídeo (uno de cada `paso`), volteados como en vivo"""
+    grises = []
+    for clip in clips:
+        cap = cv2.VideoCapture(str(clip))
+        leidos = usados = 0
+        while usados < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if leidos % paso == 0:
+                grises.append(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2GRAY))
+                usados += 1
+            leidos += 1
+        cap.release()
+    return grises
+
+
+def medir_backends(grises, nombres=None, referencia=None, parametros=None, iou_minimo=0.4):
+    """
+    Tiempo por frame (mediana) y recall de cada backend frente a los rostros de
+    referencia. Sin referencia etiquetada se usan los de haar_default con una
+    pirámide de escalas más fina (REFERENCIA): el recall es entonces el acuerdo
+    con haar_default, y ningún detector puede puntuar por encima de él.
+    """
+    parametros = {**PARAMETROS_DETECTOR, **(parametros or {})}
+    nombres = nombres or backends_disponibles()
+    if referencia is None:
+        haar = crear_backend(BACKEND_POR_DEFECTO)
+        referencia = [haar.detectMultiScale(g, **{**parametros, 'scaleFactor': 1.05}) for g in grises]
+    total_referencia = sum(len(r) for r in referencia)
+
+    resultados = {}
+    for nombre in nombres:
+        backend = crear_backend(nombre)
+        backend.detectMultiScale(grises[0], **parametros)   # Calentamiento
+        tiempos = np.empty(len(grises))
+        encontrados = 0
+        for i, (gris, esperados) in enumerate(zip(grises, referencia)):
+            inicio = time.perf_counter()
+            rostros = backend.detectMultiScale(gris, **parametros)
+            tiempos[i] = (time.perf_counter() - inicio) * 1000
+            if len(esperados) and len(rostros):
+                encontrados += int((iou_cajas(esperados, rostros).max(axis=1) >= iou_minimo).sum())
+        resultados[nombre] = {
+            'ms': float(np.median(tiempos)),
+            'recall': encontrados / total_referencia if total_referencia else 1.0,
+        }
+    return resultados, total_referencia
+
+
+def elegir_backend(clips, recall=0.8, max_frames=60, paso=3, carpeta=CARPETA_CACHE):
+    """Mide los backends con los vídeos, guarda el más rápido que llega al recall y lo devuelve"""
+    grises = _grises([str(c) for c in clips], max_frames, paso)
+    if not grises:
+        raise RuntimeError("Los vídeos de muestra no tienen frames")
+    resultados, total = medir_backends(grises, backends_disponibles())
+
+    validos = [n for n, r in resultados.items() if r['recall'] >= recall]
+    if validos:
+        elegido = min(validos, key=lambda n: resultados[n]['ms'])
+    else:
+        # Ninguno llega: el de mejor recall (y entre iguales, el más rápido)
+        elegido = max(resultados, key=lambda n: (resultados[n]['recall'], -resultados[n]['ms']))
+
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    (carpeta / ARCHIVO_ELECCION).write_text(json.dumps({
+        'backend': elegido,
+        'recall_objetivo': recall,
+        'referencia': REFERENCIA,
+        'frames': len(grises),
+        'rostros_referencia': total,
+        'clips': [str(c) for c in clips],
+        'mediciones': resultados,
+        **huella_equipo(),
+    }, indent=2), encoding='utf-8')
+    return elegido, resultados
+
+
+def backend_guardado(carpeta=CARPETA_CACHE):
+    """Nombre del backend elegido en este equipo, o None si no hay elección válida"""
+    try:
+        eleccion = json.loads((Path(carpeta) / ARCHIVO_ELECCION).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if any(eleccion.get(clave) != valor for clave, valor in huella_equipo().items()):
+        return None   # Otro equipo u otra versión de OpenCV: hay que volver a medir
+    return eleccion.get('backend')
+
+
+def resolver_backend(nombre=None):
+    """
+    Nombre del backend que usará obtener_backend(nombre), ya comprobado:
+    así los errores (nombre mal escrito, falta el modelo) salen al arrancar
+    y no dentro de un hilo
+    """
+    nombre = nombre or backend_guardado() or BACKEND_POR_DEFECTO
+    comprobar_backend(nombre)
+    return nombre
+
+
+def obtener_backend(nombre=None):
+    """El backend indicado; sin nombre, el elegido en este equipo o haar_default"""
+    return crear_backend(nombre or backend_guardado() or BACKEND_POR_DEFECTO)
+
+
+# ============================================
+# PUNTO DE ENTRADA
+# ============================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Elegir el detector de rostros más rápido para este equipo")
+    parser.add_argument('clips', nargs='*', help="Vídeos de muestra (con rostros, como en uso real)")
+    parser.add_argument('--recall', type=float, default=0.8,
+                        help=f"Fracción mínima de los rostros de la referencia ({REFERENCIA}) "
+                             "que debe encontrar")
+    parser.add_argument('--max-frames', type=int, default=60, help="Frames por vídeo")
+    parser.add_argument('--paso', type=int, default=3, help="Usar uno de cada N frames")
+    args = parser.parse_args()
+
+    if not args.clips:
+        print(f"🧩 Disponibles: {', '.join(backends_disponibles())}")
+        print(f"💾 Elegido en este equipo: {backend_guardado() or f'ninguno ({BACKEND_POR_DEFECTO})'}")
+    else:
+        print(f"⏱️  Midiendo {len(backends_disponibles())} detectores...")
+        print(f"📏 Referencia: {REFERENCIA}; el recall es el acuerdo con ella, "
+              f"no con rostros etiquetados")
+        elegido, resultados = elegir_backend(args.clips, args.recall, args.max_frames, args.paso)
+        for nombre, r in sorted(resultados.items(), key=lambda item: item[1]['ms']):
+            marca = "👉" if nombre == elegido else "  "
+            print(f"{marca} {nombre:20s} {r['ms']:7.1f} ms/frame | "
+                  f"acuerdo con la referencia {r['recall']:.0%}")
+        print(f"✅ Elegido: {elegido} (guardado en {CARPETA_CACHE / ARCHIVO_ELECCION})")
@@ -0,0 +1,106 @@
+"""
+estadisticas_regiones.py
+Media y varianza de cualquier rectángulo de un recorte en tiempo constante.
+
+Se calculan una vez por recorte (el rostro) las imágenes integrales de la
+suma y de la suma de cuadrados; después cada región cuesta 4 lecturas por
+integral, sea cual sea su tamaño y aunque se solapen. Añadir medidas nuevas
+(apertura de boca, distancia ceja-ojo...) es añadir bandas, no pasadas sobre
+la imagen.
+
+Uso:
+    regiones = EstadisticasRegiones(rostro_gris)
+    brillo_ojos = regiones.media_banda(BANDA_OJOS)
+    medias, varianzas = regiones.estadisticas_bandas([BANDA_BOCA, BANDA_OJOS, BANDA_PUPILA])
+"""
+import cv2
+import numpy as np
+
+from pipeline_rostros import caja_banda
+from pool_buffers import PoolBuffers
+
+
+class EstadisticasRegiones:
+    def __init__(self, imagen=None, pool=None):
+        # Buffers de las integrales: crecen hasta el recorte más grande y se reutilizan
+        self.pool = pool if pool is not None else PoolBuffers()
+        self._suma = None
+        self._cuadrados = None
+        self.alto = self.ancho = 0
+        if imagen is not None:
+            self.cargar(imagen)
+
+    def cargar(self, imagen):
+        """Calcula las integrales de un recorte en gris (uint8). Devuelve self"""
+        alto, ancho = imagen.shape[:2]
+        self._suma = self.pool.obtener((alto + 1, ancho + 1), np.int32, "integral")
+        self._cuadrados = self.pool.obtener((alto + 1, ancho + 1), np.float64, "integral_cuadrados")
+        # int32 es exacto hasta ~8 millones de píxeles de 255: sobra para un rostro
+        cv2.integral2(imagen, sum=self._suma, sqsum=self._cuadrados,
+                      sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+        self.alto, self.ancho = alto, ancho
+        return self
+
+    # ============================================
+    # UN RECTÁNGULO
+    # ============================================
+    def _sumas(self, x1, y1, x2, y2):
+        s, q = self._suma, self._cuadrados
+        suma = int(s[y2, x2]) - int(s[y1, x2]) - int(s[y2, x1]) + int(s[y1, x1])
+        cuadrados = q[y2, x2] - q[y1, x2] - q[y2, x1] + q[y1, x1]
+        return suma, cuadrados
+
+    def media(self, x1, y1, x2, y2):
+        """Media de [y1:y2, x1:x2] (como np.mean del mismo corte); NaN si está vacío"""
+        area = (x2 - x1) * (y2 - y1)
+        if area <= 0:
+            return float('nan')
+        return self._sumas(x1, y1, x2, y2)[0] / area
+
+    def media_varianza(self, x1, y1, x2, y2):
+        """(media, varianza) de [y1:y2, x1:x2]"""
+        area = (x2 - x1) * (y2 - y1)
+        if area <= 0:
+            return float('nan'), float('nan')
+        suma, cuadrados = self._sumas(x1, y1, x2, y2)
+        media = suma / area
+        return media, max(0.0, cuadrados / area - media * media)
+
+    # ============================================
+    # BANDAS (FRACCIONES DEL RECORTE)
+    # ============================================
+    def caja(self, banda):
+        """Banda (y1, y2, x1, x2) en fracciones -> (x1, y1, x2, y2) en píxeles del recorte"""
+        return caja_banda(self.ancho, self.alto, banda)
+
+    def media_banda(self, banda):
+        return self.media(*self.caja(banda))
+
+    def media_varianza_banda(self, banda):
+        return self.media_varianza(*self.caja(banda))
+
+    def estadisticas_bandas(self, bandas):
+        """(medias, varianzas) de muchas bandas a la vez, como arrays (N,)"""
+        # Mismo redondeo que caja_banda (int() trunca), para todas las bandas de una vez
+        y1, y2, x1, x2 = np.asarray(bandas, dtype=np.float64).reshape(-1, 4).T
+        cajas = np.column_stack([self.ancho * x1, self.alto * y1, self.ancho * x2, self.alto * y2])
+        return self.estadisticas_cajas(cajas.astype(np.intp))
+
+    def estadisticas_cajas(self, cajas):
+        """(medias, varianzas) de N cajas (x1, y1, x2, y2) con una sola indexación por esquina"""
+        x1, y1, x2, y2 = np.asarray(cajas, dtype=np.intp).reshape(-1, 4).T
+
+        # Las 4 esquinas de todas las cajas en las dos integrales, con una sola indexación
+        filas = np.concatenate([y2, y1, y2, y1])
+        columnas = np.concatenate([x2, x2, x1, x1])
+        signos = np.array([1.0, -1.0, -1.0, 1.0])
+        n = len(x1)
+        sumas = (self._suma[filas, columnas].reshape(4, n) * signos[:, None]).sum(axis=0)
+        cuadrados = (self._cuadrados[filas, columnas].reshape(4, n) * signos[:, None]).sum(axis=0)
+
+        area = ((x2 - x1) * (y2 - y1)).astype(np.float64)
+        vacias = area <= 0
+        area[vacias] = np.nan
+        medias = sumas / area
+        varianzas = np.maximum(cuadrados / area - medias * medias, 0.0)
+        return medias, varianzas
@@ -0,0 +1,211 @@
+"""
+flujo_rostros.py
+El pipeline del detector como etapas encadenables (generadores), sin ventana:
+
+    fuente de frames -> detección de rostros -> regiones (ojos, boca)
+                     -> características -> clasificación
+
+Cada etapa recibe un iterable de Muestra, completa sus campos y la deja pasar
+(el frame nunca se copia: las regiones son vistas del gris). Todo es perezoso,
+así que un vídeo o una cámara de cualquier duración se procesa con memoria
+constante. Cualquier etapa se puede cambiar por otra con la misma forma.
+
+Uso:
+    for muestra in flujo_expresiones("sesion.mp4"):
+        print(muestra.indice, muestra.expresion, muestra.confianza)
+
+    # Etapas a mano (p. ej. con el seguidor de ROI como detector)
+    muestras = detectar(fuente_frames(0), SeguidorRostro(obtener_clasificador()).detectar)
+    for muestra in clasificar(calcular_caracteristicas(extraer_regiones(muestras))):
+        ...
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import analisis_expresiones
+from pipeline_rostros import (BANDA_BOCA, BANDA_OJOS, BANDA_PUPILA, detectar_rostros,
+                              recortar_banda, rostro_principal)
+from pupila import medir_pupila_lote
+from suavizado import SuavizadorExpresiones
+
+# Bandas que extrae extraer_regiones por defecto
+BANDAS = {'boca': BANDA_BOCA, 'ojos': BANDA_OJOS, 'pupila': BANDA_PUPILA}
+
+
+class Muestra:
+    """Un frame y todo lo que las etapas van calculando sobre él"""
+    __slots__ = ('indice', 'instante', 'frame', 'gris', 'rostros', 'caja', 'rostro',
+                 'regiones', 'caracteristicas', 'expresion', 'confianza')
+
+    def __init__(self, indice, instante, frame):
+        self.indice = indice
+        self.instante = instante
+        self.frame = frame
+        self.gris = None
+        self.rostros = ()         # Todas las detecciones (x, y, w, h)
+        self.caja = None          # Rostro principal o None
+        self.rostro = None        # Vista del rostro principal en el gris
+        self.regiones = {}        # Nombre de banda -> vista
+        self.caracteristicas = {}
+        self.expresion = "neutral"
+        self.confianza = 0.0
+
+
+# ============================================
+# ETAPA 1: FUENTE DE FRAMES
+# ============================================
+def fuente_frames(fuente, espejo=True, max_frames=None):
+    """
+    Frames de una cámara (índice) o de un vídeo (ruta), uno a uno.
+    Con espejo=True se voltean como en el detector en vivo.
+    """
+    cap = cv2.VideoCapture(int(fuente) if str(fuente).isdigit() else str(fuente))
+    if not cap.isOpened():
+        raise RuntimeError(f"No se pudo abrir la fuente: {fuente}")
+
+    try:
+        yield from desde_frames(_leer(cap, max_frames), espejo)
+    finally:
+        cap.release()
+
+
+def _leer(cap, max_frames):
+    leidos = 0
+    while max_frames is None or leidos < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        leidos += 1
+        yield frame
+
+
+def desde_frames(frames, espejo=False):
+    """Convierte cualquier iterable de frames BGR en muestras"""
+    for indice, frame in enumerate(frames):
+        if espejo:
+            frame = cv2.flip(frame, 1)
+        yield Muestra(indice, time.perf_counter(), frame)
+
+
+# ============================================
+# ETAPA 2: DETECCIÓN DE ROSTROS
+# ============================================
+def detectar(muestras, detector=None):
+    """
+    Rellena gris, rostros, caja y rostro. `detector` es cualquier función
+    gris -> rostros (por defecto detectar_rostros; vale SeguidorRostro.detectar).
+    """
+    detector = detector or detectar_rostros
+    for muestra in muestras:
+        muestra.gris = cv2.cvtColor(muestra.frame, cv2.COLOR_BGR2GRAY)
+        muestra.rostros = detector(muestra.gris)
+        muestra.caja = rostro_principal(muestra.rostros)
+        if muestra.caja is not None:
+            x, y, w, h = muestra.caja
+            muestra.rostro = muestra.gris[y:y+h, x:x+w]
+        yield muestra
+
+
+# ============================================
+# ETAPA 3: REGIONES (OJOS, BOCA...)
+# ============================================
+def extraer_regiones(muestras, bandas=None):
+    """Vistas (sin copia) de cada banda dentro del rostro principal"""
+    bandas = BANDAS if bandas is None else bandas
+    for muestra in muestras:
+        if muestra.rostro is not None:
+            muestra.regiones = {nombre: recortar_banda(muestra.rostro, banda)
+                                for nombre, banda in bandas.items()}
+        yield muestra
+
+
+# ============================================
+# ETAPA 4: CARACTERÍSTICAS
+# ============================================
+def calcular_caracteristicas(muestras):
+    """
+    intensidad_boca (bordes), brillo_boca, brillo_ojos y pupila (0-100%)
+    de las regiones disponibles
+    """
+    for muestra in muestras:
+        regiones = muestra.regiones
+        caracteristicas = {}
+
+        boca = regiones.get('boca')
+        if boca is not None:
+            caracteristicas['intensidad_boca'] = float(np.mean(cv2.Canny(boca, 50, 150)))
+            caracteristicas['brillo_boca'] = float(np.mean(boca))
+
+        ojos = regiones.get('ojos')
+        if ojos is not None:
+            caracteristicas['brillo_ojos'] = float(np.mean(ojos))
+
+        pupila = regiones.get('pupila')
+        if pupila is not None:
+            caracteristicas['pupila'] = float(medir_pupila_lote(pupila))
+
+        muestra.caracteristicas = caracteristicas
+        yield muestra
+
+
+# ============================================
+# ETAPA 5: CLASIFICACIÓN
+# ============================================
+def clasificar(muestras, clasificador=None):
+    """
+    Expresión y confianza a partir de las características. `clasificador` es
+    cualquier función (intensidad_boca, brillo_boca, brillo_ojos) -> (expresion, confianza).
+    Mismos casos especiales que analizar_expresion.
+    """
+    clasificador = clasificador or analisis_expresiones.clasificar_valores
+    for muestra in muestras:
+        c = muestra.caracteristicas
+        if muestra.caja is None:
+            muestra.expresion, muestra.confianza = "neutral", 0.0
+        elif muestra.caja[2] < 50 or muestra.caja[3] < 50:
+            muestra.expresion, muestra.confianza = "neutral", 0.5
+        elif 'intensidad_boca' not in c or 'brillo_ojos' not in c:
+            muestra.expresion, muestra.confianza = "neutral", 0.3
+        else:
+            muestra.expresion, muestra.confianza = clasificador(
+                c['intensidad_boca'], c['brillo_boca'], c['brillo_ojos']
+            )
+        yield muestra
+
+
+def suavizar(muestras, ventana=6, histeresis=0.2):
+    """Filtro temporal sobre la expresión clasificada (se reinicia al perder el rostro)"""
+    suavizador = SuavizadorExpresiones(ventana, histeresis)
+    for muestra in muestras:
+        if muestra.caja is None:
+            suavizador.reiniciar()
+        else:
+            muestra.expresion, muestra.confianza = suavizador.actualizar(muestra.expresion, muestra.confianza)
+        yield muestra
+
+
+# ============================================
+# PIPELINE COMPLETO
+# ============================================
+def flujo_expresiones(fuente, detector=None, bandas=None, clasificador=None, espejo=True, max_frames=None):
+    """Fuente -> detección -> regiones -> características -> clasificación"""
+    muestras = fuente_frames(fuente, espejo, max_frames)
+    muestras = detectar(muestras, detector)
+    muestras = extraer_regiones(muestras, bandas)
+    muestras = calcular_caracteristicas(muestras)
+    return clasificar(muestras, clasificador)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expresiones frame a frame sin ventana")
+    parser.add_argument('fuente', help="Índice de cámara o vídeo")
+    parser.add_argument('--max-frames', type=int, default=None)
+    args = parser.parse_args()
+
+    for muestra in flujo_expresiones(args.fuente, max_frames=args.max_frames):
+        pupila = muestra.caracteristicas.get('pupila')
+        print(f"{muestra.indice:6d} {muestra.expresion:9s} {muestra.confianza:.2f}"
+              + (f"  pupila {pupila:.0f}%" if pupila is not None else ""))
@@ -0,0 +1,196 @@
+"""
+instrumentacion.py
+Medición ligera de tiempos por etapa del bucle en vivo.
+
+Cada etapa acumula sus tiempos en un histograma de tamaño fijo (cubetas
+logarítmicas), así registrar una muestra cuesta lo mismo tras 10 frames que
+tras 10 horas y los percentiles p50/p95/p99 se calculan al vuelo.
+Desactivada, cada medición es una llamada vacía.
+"""
+import bisect
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class Histograma:
+    """Histograma de latencias en ms con cubetas logarítmicas de tamaño fijo"""
+
+    def __init__(self, minimo_ms=0.01, maximo_ms=10000.0, cubetas=240):
+        self.bordes = np.geomspace(minimo_ms, maximo_ms, cubetas + 1)
+        self._bordes_lista = self.bordes.tolist()
+        # Cubeta 0: por debajo del mínimo; última: por encima del máximo
+        self.cuentas = np.zeros(cubetas + 2, dtype=np.int64)
+        self.total = 0
+        self.suma_ms = 0.0
+        self.maximo_visto = 0.0
+
+    def agregar(self, ms):
+        self.cuentas[bisect.bisect_right(self._bordes_lista, ms)] += 1
+        self.total += 1
+        self.suma_ms += ms
+        if ms > self.maximo_visto:
+            self.maximo_visto = ms
+
+    def percentil(self, p):
+        """Percentil aproximado (borde superior de la cubeta que lo contiene)"""
+        if self.total == 0:
+            return 0.0
+        objetivo = self.total * p / 100.0
+        cubeta = int(np.searchsorted(np.cumsum(self.cuentas), objetivo))
+        if cubeta == 0:
+            return float(self.bordes[0])
+        if cubeta > len(self.bordes) - 1:
+            return self.maximo_visto
+        return float(self.bordes[cubeta])
+
+    def media(self):
+        return self.suma_ms / self.total if self.total else 0.0
+
+    def reiniciar(self):
+        self.cuentas[:] = 0
+        self.total = 0
+        self.suma_ms = 0.0
+        self.maximo_visto = 0.0
+
+
+class _Cronometro:
+    """
+    Context manager de una medición. Uno nuevo por bloque with: el inicio va
+    en cada medición y no en la etapa, así la misma etapa se puede medir a la
+    vez desde varios hilos (o anidada) sin pisar el inicio de la otra
+    """
+    __slots__ = ('histograma', 'inicio')
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.histograma.agregar((time.perf_counter() - self.inicio) * 1000)
+        return False
+
+
+class _SinMedir:
+    """Sustituto vacío cuando la instrumentación está desactivada"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+_SIN_MEDIR = _SinMedir()
+
+
+class Instrumentacion:
+    def __init__(self, activa=True, ruta_volcado=None, intervalo_volcado=10.0):
+        self.activa = activa
+        self.histogramas = {}
+        # Sólo para crear etapas nuevas (captura, análisis y UI van en hilos distintos)
+        self._lock = threading.Lock()
+
+        # FPS por bucle (UI, análisis...): instantes de los últimos frames
+        self._frames = {}
+
+        # Volcado periódico a fichero (una línea JSON por volcado)
+        self.ruta_volcado = ruta_volcado
+        self.intervalo_volcado = intervalo_volcado
+        self._ultimo_volcado = time.time()
+
+    def etapa(self, nombre):
+        """with instr.etapa('2_deteccion'): ...  mide el bloque"""
+        if not self.activa:
+            return _SIN_MEDIR
+        histograma = self.histogramas.get(nombre)
+        if histograma is None:
+            histograma = self._histograma(nombre)
+        return _Cronometro(histograma)
+
+    def _histograma(self, nombre):
+        with self._lock:
+            if nombre not in self.histogramas:
+                self.histogramas[nombre] = Histograma()
+            return self.histogramas[nombre]
+
+    def registrar(self, nombre, ms):
+        """Añade una medida tomada fuera de un bloque with"""
+        if not self.activa:
+            return
+        self._histograma(nombre).agregar(ms)
+
+    def desde(self, nombre, inicio):
+        """
+        Registra el tiempo transcurrido desde `inicio` (perf_counter) y devuelve
+        el instante actual, para encadenar etapas sin bloques with:
+            t = instr.desde('captura', t)
+        """
+        ahora = time.perf_counter()
+        if self.activa:
+            self._histograma(nombre).agregar((ahora - inicio) * 1000)
+        return ahora
+
+    def frame(self, bucle='ui'):
+        """Marca el final de un frame del bucle indicado (para FPS) y vuelca si toca"""
+        if not self.activa:
+            return
+        instantes = self._frames.get(bucle)
+        if instantes is None:
+            with self._lock:
+                instantes = self._frames.setdefault(bucle, deque(maxlen=60))
+        instantes.append(time.perf_counter())
+
+        if self.ruta_volcado and time.time() - self._ultimo_volcado >= self.intervalo_volcado:
+            self.volcar()
+
+    def fps(self, bucle='ui'):
+        instantes = self._frames.get(bucle)
+        if not instantes or len(instantes) < 2:
+            return 0.0
+        return (len(instantes) - 1) / (instantes[-1] - instantes[0])
+
+    def resumen(self):
+        """Estadísticas por etapa: n, media, p50, p95, p99 (ms)"""
+        with self._lock:
+            histogramas = sorted(self.histogramas.items())
+        return {
+            nombre: {
+                'n': h.total,
+                'media': h.media(),
+                'p50': h.percentil(50),
+                'p95': h.percentil(95),
+                'p99': h.percentil(99),
+            }
+            for nombre, h in histogramas
+        }
+
+    def lineas(self):
+        """Texto para la pantalla de debug: FPS y percentiles de cada etapa"""
+        with self._lock:
+            bucles = sorted(self._frames)
+        fps = " | ".join(f"{bucle}: {self.fps(bucle):.1f}" for bucle in bucles)
+        lineas = [f"FPS {fps}", "etapa            p50    p95    p99 ms"]
+        for nombre, e in self.resumen().items():
+            lineas.append(f"{nombre:14s} {e['p50']:6.1f} {e['p95']:6.1f} {e['p99']:6.1f}")
+        return lineas
+
+    def volcar(self):
+        """Añade las estadísticas actuales al fichero de volcado"""
+        self._ultimo_volcado = time.time()
+        if not self.ruta_volcado:
+            return
+        registro = {
+            'instante': self._ultimo_volcado,
+            'fps': {bucle: self.fps(bucle) for bucle in list(self._frames)},
+            'etapas': self.resumen(),
+        }
+        with open(self.ruta_volcado, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registro) + "\n")
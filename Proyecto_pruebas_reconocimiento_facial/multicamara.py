@@ -0,0 +1,332 @@
+"""
+multicamara.py
+Analiza varias cámaras (o vídeos, que sirven de cámaras de prueba) a la vez.
+Los streams se reparten entre procesos trabajadores; cada proceso carga su
+detector una sola vez y atiende sus streams por turnos. Los resultados de
+todos los streams se mezclan en una única salida (una línea JSON por frame)
+y se informa de los FPS y frames descartados de cada stream.
+
+Uso:
+    python multicamara.py 0 1 pasillo.mp4 -j 3 -o resultados.jsonl
+    python multicamara.py sesion.mp4 --tiempo-real --benchmark 8 --max-frames 300
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+import cv2
+
+from captura import CapturaEnHilo
+from pipeline_rostros import obtener_clasificador
+from procesamiento_lotes import analizar_frame
+
+INTERVALO_INFORME = 2.0   # Segundos entre informes de FPS por stream
+ESPERA_COLA = 0.5         # Segundos de cada intento de put en la cola de resultados
+
+
+# ============================================
+# FUENTES
+# ============================================
+def es_dispositivo(fuente):
+    """'0', '1'... son índices de cámara; lo demás, rutas de vídeo"""
+    return str(fuente).isdigit()
+
+
+class FuenteStream:
+    """
+    Un stream dentro de un trabajador. siguiente() no bloquea: devuelve el
+    frame nuevo o None si todavía no hay ninguno. Los frames que llegan
+    mientras se analiza otro stream se cuentan como descartados.
+    """
+
+    def __init__(self, indice, fuente, tiempo_real=False):
+        self.indice = indice
+        self.fuente = str(fuente)
+        self.leidos = 0
+        self.descartados = 0
+        self.terminada = False
+
+        if es_dispositivo(fuente):
+            self.cap = cv2.VideoCapture(int(fuente))
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # Cámara: hilo de captura propio, siempre el frame más reciente
+            self.captura = CapturaEnHilo(self.cap, capacidad=2, espejo=False).iniciar()
+            self.secuencia = 0
+        else:
+            self.cap = cv2.VideoCapture(self.fuente)
+            self.captura = None
+
+        if not self.cap.isOpened():
+            print(f"⚠️  No se pudo abrir el stream {indice}: {self.fuente}")
+            self.terminada = True
+
+        # Vídeo en tiempo real: se simula una cámara a los FPS del fichero
+        self.tiempo_real = tiempo_real and self.captura is None
+        self.fps_origen = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.inicio = time.perf_counter()
+
+    def siguiente(self):
+        if self.terminada:
+            return None
+        if self.captura is not None:
+            return self._siguiente_camara()
+        return self._siguiente_video()
+
+    def _siguiente_camara(self):
+        dato = self.captura.ultimo(despues_de=self.secuencia, timeout=0)
+        if dato is None:
+            if self.captura.error:
+                self.terminada = True
+            return None
+        secuencia, _, frame = dato
+        if self.secuencia:
+            self.descartados += secuencia - self.secuencia - 1
+        self.secuencia = secuencia
+        self.leidos += 1
+        return frame
+
+    def _siguiente_video(self):
+        if self.tiempo_real:
+            # Frame que "emitiría" la cámara ahora mismo
+            objetivo = int((time.perf_counter() - self.inicio) * self.fps_origen)
+            if self.leidos + self.descartados > objetivo:
+                return None
+            # Los que ya han pasado sin analizar se saltan (grab no decodifica)
+            while self.leidos + self.descartados < objetivo:
+                if not self.cap.grab():
+                    self.terminada = True
+                    return None
+                self.descartados += 1
+
+        ret, frame = self.cap.read()
+        if not ret:
+            self.terminada = True
+            return None
+        self.leidos += 1
+        return frame
+
+    def cerrar(self):
+        if self.captura is not None:
+            self.captura.detener()
+        self.cap.release()
+
+
+# ============================================
+# TRABAJADOR (UN PROCESO, VARIOS STREAMS)
+# ============================================
+def enviar(cola, mensaje, parar):
+    """
+    cola.put que no se bloquea para siempre: si la cola está llena y ya se ha
+    pedido parar (la salida dejó de leer), el mensaje se descarta. Devuelve
+    si se envió.
+    """
+    while True:
+        try:
+            cola.put(mensaje, timeout=ESPERA_COLA)
+            return True
+        except queue.Full:
+            if parar.is_set():
+                return False
+
+
+def trabajador(fuentes, cola, parar, tiempo_real=False, max_frames=None):
+    """Atiende por turnos los streams [(indice, fuente), ...] y publica cada resultado en la cola"""
+    cv2.setNumThreads(1)
+    obtener_clasificador()
+
+    streams = [FuenteStream(indice, fuente, tiempo_real) for indice, fuente in fuentes]
+    inicio = time.perf_counter()
+
+    while not parar.is_set():
+        activos = [s for s in streams
+                   if not s.terminada and (max_frames is None or s.leidos < max_frames)]
+        if not activos:
+            break
+
+        atendidos = 0
+        for stream in activos:
+            frame = stream.siguiente()
+            if frame is None:
+                continue
+            atendidos += 1
+            caja, expresion, confianza = analizar_frame(frame)
+            if not enviar(cola, ('resultado', stream.indice, stream.leidos - 1, time.time(),
+                                 caja, expresion, confianza, stream.descartados), parar):
+                break
+
+        if atendidos == 0:
+            time.sleep(0.002)   # Ningún stream tenía frame nuevo
+
+    duracion = time.perf_counter() - inicio
+    for stream in streams:
+        enviar(cola, ('fin', stream.indice, stream.leidos, stream.descartados, duracion), parar)
+        stream.cerrar()
+
+
+def repartir(fuentes, procesos):
+    """Streams por proceso, en turnos: [[(0, f0), (3, f3)], [(1, f1)], ...]"""
+    grupos = [[] for _ in range(min(procesos, len(fuentes)))]
+    for indice, fuente in enumerate(fuentes):
+        grupos[indice % len(grupos)].append((indice, fuente))
+    return grupos
+
+
+# ============================================
+# SALIDA MEZCLADA Y ESTADÍSTICAS
+# ============================================
+class EstadisticasStream:
+    def __init__(self, fuente):
+        self.fuente = fuente
+        self.frames = 0
+        self.descartados = 0
+        self.duracion = None
+        self.inicio = time.perf_counter()
+        self.frames_informe = 0
+
+    def fps(self):
+        duracion = self.duracion or (time.perf_counter() - self.inicio)
+        return self.frames / duracion if duracion > 0 else 0.0
+
+
+def ejecutar_streams(fuentes, procesos=None, salida=None, tiempo_real=False,
+                     max_frames=None, intervalo_informe=INTERVALO_INFORME, silencioso=False):
+    """
+    Lanza los trabajadores, escribe los resultados de todos los streams según
+    llegan (JSON por línea; a stdout si no hay fichero) y devuelve las
+    estadísticas de cada stream.
+    """
+    procesos = procesos or min(len(fuentes), os.cpu_count() or 1)
+    grupos = repartir(fuentes, procesos)
+
+    # spawn, como pipeline_procesos: cada trabajador empieza limpio, sin heredar
+    # hilos ni estado de OpenCV del proceso principal
+    contexto = mp.get_context('spawn')
+    cola = contexto.Queue(maxsize=1000)
+    parar = contexto.Event()
+    trabajadores = [
+        contexto.Process(target=trabajador, args=(grupo, cola, parar, tiempo_real, max_frames), daemon=True)
+        for grupo in grupos
+    ]
+
+    estadisticas = [EstadisticasStream(str(f)) for f in fuentes]
+    pendientes = len(fuentes)
+    destino = open(salida, 'w', encoding='utf-8') if salida else None
+    ultimo_informe = time.perf_counter()
+
+    if not silencioso:
+        print(f"📡 {len(fuentes)} streams en {len(grupos)} procesos", file=sys.stderr)
+
+    for proceso in trabajadores:
+        proceso.start()
+
+    try:
+        while pendientes:
+            try:
+                mensaje = cola.get(timeout=0.5)
+            except queue.Empty:
+                if not any(p.is_alive() for p in trabajadores):
+                    break
+                continue
+
+            if mensaje[0] == 'fin':
+                _, indice, frames, descartados, duracion = mensaje
+                e = estadisticas[indice]
+                e.frames, e.descartados, e.duracion = frames, descartados, duracion
+                pendientes -= 1
+                continue
+
+            _, indice, frame, instante, caja, expresion, confianza, descartados = mensaje
+            e = estadisticas[indice]
+            e.frames += 1
+            e.descartados = descartados
+
+            if destino is not None or not silencioso:
+                linea = json.dumps({
+                    'stream': indice, 'fuente': e.fuente, 'frame': frame, 'instante': instante,
+                    'caja': list(caja) if caja is not None else None,
+                    'expresion': expresion, 'confianza': round(confianza, 3),
+                })
+                print(linea, file=destino or sys.stdout)
+
+            if not silencioso and time.perf_counter() - ultimo_informe >= intervalo_informe:
+                ultimo_informe = time.perf_counter()
+                informe(estadisticas)
+
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrumpido por el usuario", file=sys.stderr)
+    finally:
+        parar.set()
+        # Se sigue vaciando la cola mientras terminan: un proceso con mensajes
+        # pendientes de entregar no sale hasta que alguien los lee
+        limite = time.perf_counter() + 2.0
+        while any(p.is_alive() for p in trabajadores) and time.perf_counter() < limite:
+            try:
+                cola.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        for proceso in trabajadores:
+            proceso.join(timeout=0.1)
+        if destino is not None:
+            destino.close()
+
+    if not silencioso:
+        informe(estadisticas)
+    return estadisticas
+
+
+def informe(estadisticas):
+    """FPS y descartados de cada stream (a stderr, para no mezclarse con los resultados)"""
+    for indice, e in enumerate(estadisticas):
+        print(f"   📹 [{indice}] {e.fuente}: {e.frames} frames | {e.fps():.1f} FPS | "
+              f"{e.descartados} descartados", file=sys.stderr)
+
+
+# ============================================
+# BENCHMARK DE ESCALADO
+# ============================================
+def benchmark_escalado(fuente, maximo, procesos=None, tiempo_real=False, max_frames=300):
+    """Repite la misma fuente en 1..maximo streams y mide los FPS totales y por stream"""
+    print(f"📊 Escalado de 1 a {maximo} streams ({fuente}, {max_frames} frames por stream)")
+    print(f"   {'streams':>7} {'procesos':>8} {'FPS total':>10} {'FPS/stream':>11} {'descartados':>12}")
+    filas = []
+    for n in range(1, maximo + 1):
+        n_procesos = min(n, procesos or os.cpu_count() or 1)
+        inicio = time.perf_counter()
+        estadisticas = ejecutar_streams([fuente] * n, n_procesos, tiempo_real=tiempo_real,
+                                        max_frames=max_frames, silencioso=True)
+        duracion = time.perf_counter() - inicio
+        frames = sum(e.frames for e in estadisticas)
+        descartados = sum(e.descartados for e in estadisticas)
+        total = frames / duracion if duracion > 0 else 0.0
+        print(f"   {n:>7} {n_procesos:>8} {total:>10.1f} {total / n:>11.1f} {descartados:>12}")
+        filas.append({'streams': n, 'procesos': n_procesos, 'fps_total': total,
+                      'fps_stream': total / n, 'descartados': descartados})
+    return filas
+
+
+# ============================================
+# PUNTO DE ENTRADA
+# ============================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detector de expresiones para varias cámaras a la vez")
+    parser.add_argument('fuentes', nargs='+', help="Índices de cámara (0, 1...) o vídeos")
+    parser.add_argument('-j', '--procesos', type=int, default=None,
+                        help="Procesos trabajadores (por defecto, uno por stream hasta el nº de núcleos)")
+    parser.add_argument('-o', '--salida', default=None, help="Fichero JSONL de resultados (por defecto, stdout)")
+    parser.add_argument('--tiempo-real', action='store_true',
+                        help="Leer los vídeos al ritmo de sus FPS, como si fueran cámaras")
+    parser.add_argument('--max-frames', type=int, default=None, help="Frames como máximo por stream")
+    parser.add_argument('--benchmark', type=int, default=None, metavar='N',
+                        help="Medir el escalado de 1 a N streams con la primera fuente")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_escalado(args.fuentes[0], args.benchmark, args.procesos, args.tiempo_real,
+                           args.max_frames or 300)
+    else:
+        ejecutar_streams(args.fuentes, args.procesos, args.salida, args.tiempo_real, args.max_frames)
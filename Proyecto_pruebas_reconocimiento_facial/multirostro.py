@@ -0,0 +1,149 @@
+"""
+multirostro.py
+Modo varios rostros (salas de reuniones, aulas): cada rostro detectado recibe
+un ID de pista estable entre frames, con su propia expresión y filtro temporal,
+y el análisis de expresión de todos los rostros se reparte en un pool de hilos.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import analisis_expresiones
+from pipeline_rostros import iou_cajas
+from suavizado import SuavizadorExpresiones
+
+
+# ============================================
+# PISTAS (UNA POR ROSTRO)
+# ============================================
+class Pista:
+    def __init__(self, id_pista, caja, ventana_suavizado=6, histeresis=0.2):
+        self.id = id_pista
+        self.caja = caja
+        self.frames_sin_ver = 0
+        self.frames_vista = 1
+
+        # Estado de expresión propio de cada rostro
+        self.expresion = "neutral"
+        self.confianza = 0.0
+        self.suavizador = SuavizadorExpresiones(ventana_suavizado, histeresis)
+
+    def actualizar_expresion(self, expresion, confianza):
+        """Mismo filtro temporal que el modo de un rostro (evita cambios bruscos)"""
+        self.expresion, self.confianza = self.suavizador.actualizar(expresion, confianza)
+
+
+class SeguidorMultiple:
+    """Asigna IDs estables a los rostros emparejando cajas por solapamiento (IoU)"""
+
+    def __init__(self, iou_minimo=0.3, max_frames_perdida=10, ventana_suavizado=6, histeresis=0.2):
+        self.iou_minimo = iou_minimo
+        self.ventana_suavizado = ventana_suavizado
+        self.histeresis = histeresis
+        self.max_frames_perdida = max_frames_perdida  # Frames sin ver un rostro antes de olvidarlo
+        self.pistas = []
+        self.siguiente_id = 1
+
+    def actualizar(self, rostros):
+        """
+        Empareja los rostros del frame con las pistas existentes y devuelve las
+        pistas vistas en este frame, en el mismo orden que `rostros`.
+        """
+        cajas = [tuple(int(v) for v in r) for r in rostros]
+        asignadas = [None] * len(cajas)
+
+        emparejadas = set()
+        if self.pistas and cajas:
+            iou = iou_cajas([p.caja for p in self.pistas], cajas)
+            # Emparejamiento voraz: primero los pares con más solapamiento
+            for indice in np.argsort(iou, axis=None)[::-1]:
+                i, j = np.unravel_index(indice, iou.shape)
+                if iou[i, j] < self.iou_minimo:
+                    break
+                if i in emparejadas or asignadas[j] is not None:
+                    continue
+                pista = self.pistas[i]
+                pista.caja = cajas[j]
+                pista.frames_vista += 1
+                emparejadas.add(i)
+                asignadas[j] = pista
+
+        # Pistas no vistas: envejecen y se olvidan pasado el límite
+        vivas = []
+        for i, pista in enumerate(self.pistas):
+            pista.frames_sin_ver = 0 if i in emparejadas else pista.frames_sin_ver + 1
+            if pista.frames_sin_ver <= self.max_frames_perdida:
+                vivas.append(pista)
+
+        # Rostros sin pista: pistas nuevas
+        for j, caja in enumerate(cajas):
+            if asignadas[j] is None:
+                asignadas[j] = Pista(self.siguiente_id, caja, self.ventana_suavizado, self.histeresis)
+                self.siguiente_id += 1
+                vivas.append(asignadas[j])
+
+        self.pistas = vivas
+        return asignadas
+
+
+# ============================================
+# ANÁLISIS EN PARALELO
+# ============================================
+class AnalizadorParalelo:
+    """
+    Reparte el análisis de expresión de todos los rostros de un frame entre hilos
+    (Canny y las operaciones de NumPy liberan el GIL). Usa sólo los hilos
+    necesarios para que el análisis del frame quepa en presupuesto_ms, según
+    el coste medio por rostro medido en frames anteriores.
+    """
+
+    def __init__(self, presupuesto_ms=20.0, max_hilos=4, umbrales=None):
+        self.presupuesto_ms = presupuesto_ms
+        self.umbrales = umbrales
+        # Más hilos que núcleos no acorta el frame
+        self.max_hilos = max(1, min(max_hilos, os.cpu_count() or 1))
+        self.pool = ThreadPoolExecutor(max_workers=self.max_hilos, thread_name_prefix="expresion")
+        self._lock = threading.Lock()
+
+        self.coste_rostro_ms = 1.0   # Media móvil del coste por rostro
+        self.hilos_usados = 1
+
+    def hilos_para(self, n_rostros):
+        """Hilos necesarios para analizar n_rostros dentro del presupuesto"""
+        if n_rostros <= 1:
+            return 1
+        necesarios = math.ceil(n_rostros * self.coste_rostro_ms / self.presupuesto_ms)
+        return max(1, min(self.max_hilos, n_rostros, necesarios))
+
+    def _analizar_grupo(self, rostros):
+        resultados = []
+        for rostro in rostros:
+            inicio = time.perf_counter()
+            resultados.append(analisis_expresiones.analizar_con_caracteristicas(rostro, umbrales=self.umbrales))
+            coste = (time.perf_counter() - inicio) * 1000
+            with self._lock:
+                self.coste_rostro_ms += 0.1 * (coste - self.coste_rostro_ms)
+        return resultados
+
+    def analizar(self, rostros_gris):
+        """[(expresion, confianza, caracteristicas), ...] de cada recorte, en el mismo orden"""
+        hilos = self.hilos_para(len(rostros_gris))
+        self.hilos_usados = hilos
+        if hilos == 1:
+            return self._analizar_grupo(rostros_gris)
+
+        # Grupos intercalados para repartir rostros grandes y pequeños
+        grupos = [rostros_gris[i::hilos] for i in range(hilos)]
+        parciales = list(self.pool.map(self._analizar_grupo, grupos))
+
+        resultados = [None] * len(rostros_gris)
+        for i, parcial in enumerate(parciales):
+            resultados[i::hilos] = parcial
+        return resultados
+
+    def cerrar(self):
+        self.pool.shutdown(wait=False)
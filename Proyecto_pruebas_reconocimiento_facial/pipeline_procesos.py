@@ -0,0 +1,688 @@
+"""
+pipeline_procesos.py
+Captura, detección/análisis e interfaz en procesos separados.
+
+Con hilos, el GIL y los hilos internos de OpenCV compiten dentro de un solo
+proceso. Aquí cada etapa tiene su proceso y los frames pasan por un anillo de
+slots de tamaño fijo en memoria compartida (multiprocessing.shared_memory):
+la captura escribe cada frame en el siguiente slot con su número de secuencia
+y los demás procesos leen el más reciente. Los píxeles nunca se serializan;
+entre procesos sólo viajan el nombre del anillo y resultados pequeños
+(caja, expresión, confianza).
+
+Cada slot funciona como un seqlock: la captura marca el slot como "en
+escritura" (-1), copia el frame y después publica la secuencia. Quien lee
+comprueba que la secuencia no ha cambiado después de copiar; si la captura
+le adelantó, vuelve a leer el frame más reciente.
+
+Uso:
+    python detector.py --procesos
+    python pipeline_procesos.py comparar sesion.mp4 --segundos 10
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import analisis_expresiones
+from cache_analisis import CacheAnalisis
+from calidad import PlanificadorCalidad
+from captura import CapturaEnHilo
+from detectores_rostro import obtener_backend
+from instrumentacion import Instrumentacion
+from pipeline_rostros import PARAMETROS_DETECTOR, rostro_principal
+from pool_buffers import PoolBuffers
+from seguimiento import SeguidorRostro
+from suavizado import SuavizadorExpresiones
+
+N_SLOTS = 4   # La captura tendría que dar 3 vueltas al anillo durante una lectura para invalidarla
+
+
+# ============================================
+# ANILLO DE FRAMES EN MEMORIA COMPARTIDA
+# ============================================
+def _conectar_memoria(nombre):
+    """
+    Se conecta a un bloque existente sin hacerse cargo de él. Desde Python 3.13
+    con track=False; antes, conectarse también lo anota en el resource tracker,
+    pero con spawn todos los procesos comparten el del proceso principal, que
+    guarda los nombres en un conjunto: sigue anotado una sola vez y sólo el
+    unlink de quien lo creó lo quita.
+    """
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=nombre)
+
+
+class AnilloFrames:
+    """
+    Anillo de n_slots frames (forma fija, uint8) en un bloque de memoria
+    compartida. Cabecera: [última secuencia, fin] + secuencia e instante de
+    cada slot. Sólo escribe un proceso (la captura); leen todos los demás.
+    El bloque es de quien lo crea (la captura): sólo ese proceso lo borra con
+    liberar(); los demás se conectan con abrir() y sólo lo cierran.
+    """
+
+    def __init__(self, forma, n_slots=N_SLOTS, nombre=None):
+        self.forma = tuple(forma)
+        self.n_slots = n_slots
+        tamano_frame = int(np.prod(self.forma))
+        # Frames alineados a 64 bytes detrás de la cabecera
+        self._inicio_frames = -(-(8 * (2 + 2 * n_slots)) // 64) * 64
+        tamano = self._inicio_frames + tamano_frame * n_slots
+
+        self.propietario = nombre is None
+        if self.propietario:
+            self.shm = shared_memory.SharedMemory(create=True, size=tamano)
+        else:
+            self.shm = _conectar_memoria(nombre)
+        self.nombre = self.shm.name
+
+        buf = self.shm.buf
+        self.control = np.ndarray((2,), dtype=np.int64, buffer=buf)
+        self.secuencias = np.ndarray((n_slots,), dtype=np.int64, buffer=buf, offset=16)
+        self.instantes = np.ndarray((n_slots,), dtype=np.float64, buffer=buf, offset=16 + 8 * n_slots)
+        self.frames = np.ndarray((n_slots, *self.forma), dtype=np.uint8, buffer=buf,
+                                 offset=self._inicio_frames)
+        if self.propietario:
+            self.control[:] = 0
+            self.secuencias[:] = 0
+
+    @classmethod
+    def abrir(cls, descriptor):
+        """Se conecta a un anillo existente a partir de descriptor()"""
+        nombre, forma, n_slots = descriptor
+        return cls(forma, n_slots, nombre=nombre)
+
+    def descriptor(self):
+        """(nombre, forma, n_slots): lo único que hay que pasar a otro proceso"""
+        return self.nombre, self.forma, self.n_slots
+
+    @property
+    def ultima_secuencia(self):
+        return int(self.control[0])
+
+    @property
+    def terminado(self):
+        """La captura ha terminado (fin del vídeo, error de cámara o parada)"""
+        return bool(self.control[1])
+
+    def marcar_fin(self):
+        self.control[1] = 1
+
+    # ============================================
+    # ESCRIBIR (sólo el proceso de captura)
+    # ============================================
+    def escribir(self, frame, instante, espejo=False):
+        """Copia el frame (volteado si espejo) en el siguiente slot y lo publica"""
+        secuencia = int(self.control[0]) + 1
+        indice = secuencia % self.n_slots
+        self.secuencias[indice] = -1          # En escritura: nadie debe darlo por bueno
+        if espejo:
+            cv2.flip(frame, 1, dst=self.frames[indice])
+        else:
+            np.copyto(self.frames[indice], frame)
+        self.instantes[indice] = instante
+        self.secuencias[indice] = secuencia
+        self.control[0] = secuencia
+        return secuencia
+
+    # ============================================
+    # LEER (cualquier otro proceso)
+    # ============================================
+    def leer(self, despues_de, destino, conversion=None):
+        """
+        Copia en destino el frame más reciente con secuencia mayor que
+        despues_de (convertido con cv2.cvtColor si se da conversion, p. ej.
+        COLOR_BGR2GRAY, sin copia intermedia). Devuelve (secuencia, instante)
+        o None si no hay ninguno nuevo.
+        """
+        while True:
+            secuencia = int(self.control[0])
+            if secuencia <= despues_de:
+                return None
+            indice = secuencia % self.n_slots
+            if self.secuencias[indice] != secuencia:
+                continue   # La captura ya está reescribiendo este slot: leer el siguiente
+            instante = float(self.instantes[indice])
+            if conversion is None:
+                np.copyto(destino, self.frames[indice])
+            else:
+                cv2.cvtColor(self.frames[indice], conversion, dst=destino)
+            if self.secuencias[indice] == secuencia:
+                return secuencia, instante
+
+    def cerrar(self):
+        # Las vistas de NumPy retienen el buffer: hay que soltarlas antes de cerrar
+        self.control = self.secuencias = self.instantes = self.frames = None
+        self.shm.close()
+
+    def liberar(self):
+        """Borra el bloque del sistema (una sola vez, al final, desde el proceso que lo creó)"""
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class LectorAnillo:
+    """
+    Lado de la interfaz: misma forma de uso que CapturaEnHilo (ultimo, error,
+    detener), pero leyendo del anillo. El frame devuelto es un buffer propio
+    que se reutiliza en la siguiente llamada.
+    """
+
+    def __init__(self, anillo):
+        self.anillo = anillo
+        self.frame = np.empty(anillo.forma, dtype=np.uint8)
+        self.error = False
+
+    def iniciar(self):
+        return self
+
+    def ultimo(self, despues_de=0, timeout=None):
+        """(secuencia, instante, frame) más reciente tras despues_de, o None"""
+        limite = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            dato = self.anillo.leer(despues_de, self.frame)
+            if dato is not None:
+                return dato[0], dato[1], self.frame
+            if self.anillo.terminado:
+                self.error = True
+                return None
+            if limite is not None and time.perf_counter() >= limite:
+                return None
+            time.sleep(0.001)   # Entre procesos no hay Condition: sondeo corto
+
+    def detener(self):
+        pass
+
+
+# ============================================
+# FUENTES
+# ============================================
+class FuenteVideo:
+    """
+    Vídeo que se lee al ritmo de sus FPS, como una cámara (para pruebas y
+    comparativas). Con bucle=True vuelve al principio al terminar.
+    """
+
+    def __init__(self, ruta, fps=None, bucle=False):
+        self.cap = cv2.VideoCapture(ruta)
+        self.periodo = 1.0 / (fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        self.bucle = bucle
+        self.siguiente = time.perf_counter()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, *args):
+        return False
+
+    def read(self, imagen=None):
+        espera = self.siguiente - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        self.siguiente = max(self.siguiente + self.periodo, time.perf_counter() - self.periodo)
+        ret, imagen = self.cap.read(imagen)
+        if not ret and self.bucle:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, imagen = self.cap.read(imagen)
+        return ret, imagen
+
+    def release(self):
+        self.cap.release()
+
+
+def abrir_fuente(camara, bucle=False):
+    """Índice de cámara (0, '1'...) o ruta de vídeo, que se lee a su ritmo"""
+    if str(camara).isdigit():
+        cap = cv2.VideoCapture(int(camara))
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(int(camara) + 1)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        return cap
+    return FuenteVideo(str(camara), bucle=bucle)
+
+
+# ============================================
+# ANÁLISIS DE UN FRAME (el mismo en el hilo de detector.py y en el proceso de análisis)
+# ============================================
+class AnalisisRostro:
+    """
+    Detección con seguimiento, caché, calidad adaptativa y suavizado del rostro
+    principal. El detector de rostros se carga aparte con cargar() (detector.py
+    lo hace en el hilo de análisis, mientras se abre la cámara).
+    """
+
+    def __init__(self, detector_rostro=None, seguimiento=True, intervalo_deteccion=15, margen_roi=0.5,
+                 escala_completa=1.0, objetivo_frame_ms=33.0, umbrales=None,
+                 ventana_suavizado=6, histeresis=0.2, usar_cache=True, umbral_cache=3.0,
+                 instrumentacion=None):
+        self.detector_rostro = detector_rostro
+        self.backend = None
+        self.ms_carga = None
+
+        # Modo seguimiento: busca en una ROI alrededor del último rostro y sólo
+        # hace escaneo completo cada N frames (sin seguimiento: siempre completo)
+        self.seguidor = SeguidorRostro(
+            None,
+            intervalo_completo=intervalo_deteccion if seguimiento else 0,
+            margen_roi=margen_roi,
+            escala_completa=escala_completa,
+            **PARAMETROS_DETECTOR
+        )
+
+        # Calidad adaptativa: baja resolución / scaleFactor / frecuencia si no se
+        # llega al tiempo objetivo por frame (objetivo_frame_ms=None: siempre nivel 0)
+        self.escala_base = escala_completa
+        self.planificador = PlanificadorCalidad(objetivo_ms=objetivo_frame_ms or 0.0,
+                                                activo=bool(objetivo_frame_ms))
+        self.umbrales = umbrales
+        self.suavizador = SuavizadorExpresiones(ventana_suavizado, histeresis)
+
+        # Reutilizar el análisis si el rostro apenas ha cambiado desde el último frame
+        self.cache = CacheAnalisis(umbral=umbral_cache, activa=usar_cache)
+
+        # Buffers del análisis (gris, integrales, bordes) reutilizados entre frames
+        self.pool = PoolBuffers()
+        self.instrumentacion = instrumentacion or Instrumentacion(activa=False)
+        self.debug = False
+
+        # Resultado del último frame analizado
+        self.rostros = None
+        self.caja = None
+        self.expresion = "neutral"
+        self.confianza = 0.0
+        self.caracteristicas = None   # (intensidad_boca, brillo_boca, brillo_ojos) o None
+
+    def cargar(self):
+        """Carga el detector de rostros (lanza la excepción si no se puede) y devuelve self"""
+        inicio = time.perf_counter()
+        self.backend = self.seguidor.face_cascade = obtener_backend(self.detector_rostro)
+        self.ms_carga = (time.perf_counter() - inicio) * 1000
+        return self
+
+    def analizar_rostro(self, rostro_gris):
+        """(expresion, confianza, características o None) de un recorte"""
+        return analisis_expresiones.analizar_con_caracteristicas(
+            rostro_gris, debug=self.debug, umbrales=self.umbrales, pool=self.pool
+        )
+
+    def analizar(self, gris, analizar_rostros=None):
+        """
+        Procesa un frame en gris; devuelve True si se ha analizado (no sólo detectado).
+        analizar_rostros(gris, rostros) sustituye al análisis del rostro principal
+        (modo varios rostros de detector.py) y deja caja, expresion, confianza y caracteristicas
+        """
+        inicio = time.perf_counter()
+        plan = self.planificador
+
+        # Detectar (con poca calidad, no en todos los frames)
+        with self.instrumentacion.etapa('2_deteccion'):
+            if self.rostros is None or plan.toca_detectar():
+                self.rostros = self.seguidor.detectar(gris)
+
+        # Analizar (con poca calidad, no en todos los frames)
+        analizado = plan.toca_analizar()
+        if analizado:
+            (analizar_rostros or self.analizar_principal)(gris, self.rostros)
+
+        # Ajustar la calidad al tiempo que ha costado el frame
+        if plan.registrar((time.perf_counter() - inicio) * 1000):
+            self.aplicar_calidad()
+        return analizado
+
+    def analizar_principal(self, gris, rostros):
+        """Analiza el rostro más grande con filtro temporal"""
+        caja = rostro_principal(rostros)
+        if caja is not None:
+            # Caja quieta mientras el rostro no se mueva (si no, la caché nunca acierta)
+            caja = self.cache.estabilizar('principal', caja)
+            x, y, w, h = caja
+            with self.instrumentacion.etapa('4_analisis'):
+                expresion, confianza, self.caracteristicas = self.cache.analizar(
+                    'principal', gris[y:y+h, x:x+w], self.analizar_rostro
+                )
+            # Filtro temporal (evita cambios bruscos sin descartar frames)
+            self.expresion, self.confianza = self.suavizador.actualizar(expresion, confianza)
+        else:
+            self.expresion, self.confianza = "neutral", 0.0
+            self.suavizador.reiniciar()
+            self.cache.olvidar()
+            self.caracteristicas = None
+        self.caja = caja
+
+    def aplicar_calidad(self):
+        """Pasa los parámetros del nivel de calidad actual al detector"""
+        parametros = self.planificador.parametros
+        self.seguidor.escala_completa = self.escala_base * parametros['escala']
+        self.seguidor.scaleFactor = parametros['scaleFactor']
+
+    def resultado(self):
+        """(caja, expresion, confianza, caracteristicas): lo que viaja a la interfaz"""
+        caja = None if self.caja is None else tuple(int(v) for v in self.caja)
+        caracteristicas = None if self.caracteristicas is None else tuple(float(v) for v in self.caracteristicas)
+        return caja, self.expresion, float(self.confianza), caracteristicas
+
+    def resumenes(self):
+        return [f"🎯 {self.seguidor.resumen()}",
+                f"⚙️  {self.planificador.resumen()} | {self.planificador.cambios} cambios de nivel",
+                f"♻️  {self.cache.resumen()}"]
+
+
+# ============================================
+# PROCESOS
+# ============================================
+def proceso_captura(camara, espejo, n_slots, conexion, parar, bucle=False):
+    """Lee la fuente y escribe cada frame en el anillo (que crea con la forma del primer frame)"""
+    cap = abrir_fuente(camara, bucle)
+    ret, crudo = cap.read()
+    if not ret:
+        conexion.send(None)
+        cap.release()
+        return
+
+    anillo = AnilloFrames(crudo.shape, n_slots)
+    conexion.send(anillo.descriptor())
+    try:
+        while not parar.is_set():
+            anillo.escribir(crudo, time.perf_counter(), espejo)
+            ret, crudo = cap.read(crudo)
+            if not ret:
+                break
+    finally:
+        anillo.marcar_fin()
+        cap.release()
+        # El bloque es de este proceso: se borra cuando el coordinador para
+        # (hasta entonces los demás aún pueden conectarse o estar leyendo)
+        parar.wait()
+        anillo.cerrar()
+        anillo.liberar()
+
+
+def proceso_analisis(descriptor, opciones, resultados, parar):
+    """Analiza el frame más reciente del anillo y envía sólo el resultado (sin píxeles)"""
+    anillo = AnilloFrames.abrir(descriptor)
+    try:
+        analisis = AnalisisRostro(**opciones).cargar()
+    except Exception as e:
+        resultados.put(('error', f"No se pudo cargar el detector de rostros: {e}"))
+        anillo.cerrar()
+        return
+    resultados.put(('listo', analisis.backend.nombre, analisis.ms_carga))
+    gris = np.empty(anillo.forma[:2], dtype=np.uint8)
+    secuencia = 0
+    try:
+        while not parar.is_set():
+            dato = anillo.leer(secuencia, gris, cv2.COLOR_BGR2GRAY)
+            if dato is None:
+                if anillo.terminado:
+                    break
+                time.sleep(0.001)
+                continue
+            secuencia, instante = dato
+            inicio = time.perf_counter()
+            if analisis.analizar(gris):
+                ms = (time.perf_counter() - inicio) * 1000
+                resultados.put(('resultado', secuencia, instante, *analisis.resultado(), ms))
+    finally:
+        resultados.put(('fin', analisis.resumenes()))
+        anillo.cerrar()
+
+
+class PipelineProcesos:
+    """
+    Coordina los procesos de captura y análisis desde el proceso de la
+    interfaz. self.captura se usa como un CapturaEnHilo y
+    siguiente_resultado() entrega lo que produce el análisis.
+    """
+
+    def __init__(self, camara=0, espejo=True, n_slots=N_SLOTS, bucle=False, **opciones_analisis):
+        self.camara = camara
+        self.espejo = espejo
+        self.n_slots = n_slots
+        self.bucle = bucle
+        self.opciones = opciones_analisis
+        # spawn: los procesos no heredan pygame ni los hilos de la interfaz
+        self.contexto = mp.get_context('spawn')
+        self.parar = self.contexto.Event()
+        self.resultados = self.contexto.Queue()
+        self.procesos = []
+        self.anillo = None
+        self.captura = None
+        self.nombre_detector = None
+        self.ms_carga_detector = None
+        self.error = None
+        self.resumenes = []
+        self.terminado = False
+
+    def iniciar(self, timeout=15.0):
+        """Arranca la captura, se conecta al anillo y arranca el análisis"""
+        recibir, enviar = self.contexto.Pipe(duplex=False)
+        captura = self.contexto.Process(
+            target=proceso_captura, name="captura", daemon=True,
+            args=(self.camara, self.espejo, self.n_slots, enviar, self.parar, self.bucle)
+        )
+        captura.start()
+        self.procesos.append(captura)
+        descriptor = recibir.recv() if recibir.poll(timeout) else None
+        if descriptor is None:
+            self.detener()
+            raise RuntimeError(f"No se pudo abrir la fuente {self.camara}")
+        self.anillo = AnilloFrames.abrir(descriptor)
+        self.captura = LectorAnillo(self.anillo)
+
+        analisis = self.contexto.Process(
+            target=proceso_analisis, name="analisis", daemon=True,
+            args=(descriptor, self.opciones, self.resultados, self.parar)
+        )
+        analisis.start()
+        self.procesos.append(analisis)
+        return self
+
+    def esperar_listo(self, timeout=15.0):
+        """Espera a que el análisis haya cargado el detector; devuelve su nombre"""
+        while self.nombre_detector is None and not self.terminado:
+            if self.siguiente_resultado(timeout) is None and self.nombre_detector is None:
+                break
+        return self.nombre_detector
+
+    def siguiente_resultado(self, timeout=0.1):
+        """(secuencia, instante, caja, expresion, confianza, caracteristicas, ms) o None"""
+        try:
+            mensaje = self.resultados.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if mensaje[0] == 'resultado':
+            return mensaje[1:]
+        if mensaje[0] == 'listo':
+            self.nombre_detector, self.ms_carga_detector = mensaje[1:]
+        elif mensaje[0] == 'error':
+            self.error = mensaje[1]
+            self.terminado = True
+        elif mensaje[0] == 'fin':
+            self.resumenes = mensaje[1]
+            self.terminado = True
+        return None
+
+    def detener(self):
+        self.parar.set()
+        # Vaciar la cola mientras terminan (un proceso con datos sin enviar no acaba)
+        limite = time.perf_counter() + 3.0
+        while any(p.is_alive() for p in self.procesos) and time.perf_counter() < limite:
+            self.siguiente_resultado(timeout=0.05)
+        # Lo que quede en la cola, hasta el 'fin' con los resúmenes (o hasta que no llegue nada más)
+        while not self.terminado:
+            if self.siguiente_resultado(timeout=0.2) is None and self.resultados.empty():
+                break
+        for proceso in self.procesos:
+            proceso.join(timeout=1.0)
+            if proceso.is_alive():
+                proceso.terminate()
+        if self.anillo is not None:
+            # Sólo cerrar: lo borra el proceso de captura, que lo creó
+            self.anillo.cerrar()
+            self.anillo = None
+
+
+# ============================================
+# COMPARATIVA: UN PROCESO (HILOS) FRENTE A VARIOS PROCESOS
+# ============================================
+def _bucle_interfaz(captura, recoger, segundos, coste_interfaz_ms):
+    """
+    Interfaz sin ventana: convierte el frame a RGB, dibuja el último resultado
+    y simula el resto del render. Devuelve las métricas de la ejecución.
+    """
+    rgb = None
+    ultima_secuencia = 0
+    ultimo_resultado = None
+    mostrados = 0
+    resultados = 0
+    latencias_pantalla = []
+    latencias_resultado = []
+    analizadas = []
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        for secuencia, instante, caja, *_ in recoger():
+            latencias_resultado.append((time.perf_counter() - instante) * 1000)
+            analizadas.append(secuencia)
+            resultados += 1
+            ultimo_resultado = caja
+
+        dato = captura.ultimo(despues_de=ultima_secuencia, timeout=0.03)
+        if dato is None:
+            if captura.error:
+                break
+            continue
+        ultima_secuencia, instante, frame = dato
+        if rgb is None:
+            rgb = np.empty(frame.shape, dtype=np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        if ultimo_resultado is not None:
+            x, y, w, h = ultimo_resultado
+            cv2.rectangle(rgb, (x, y), (x + w, y + h), (0, 255, 0), 3)
+        # El resto de la interfaz (paneles, blit, flip) ocupa la CPU sin soltar el GIL
+        fin_render = time.perf_counter() + coste_interfaz_ms / 1000
+        while time.perf_counter() < fin_render:
+            pass
+        latencias_pantalla.append((time.perf_counter() - instante) * 1000)
+        mostrados += 1
+
+    duracion = time.perf_counter() - inicio
+    saltados = int(np.sum(np.diff(analizadas) - 1)) if len(analizadas) > 1 else 0
+    return {
+        'fps_interfaz': mostrados / duracion,
+        'fps_analisis': resultados / duracion,
+        'frames_sin_analizar': saltados,
+        'latencia_pantalla_ms': _percentiles(latencias_pantalla),
+        'latencia_resultado_ms': _percentiles(latencias_resultado),
+    }
+
+
+def _percentiles(valores):
+    if not valores:
+        return {'media': float('nan'), 'p95': float('nan')}
+    return {'media': float(np.mean(valores)), 'p95': float(np.percentile(valores, 95))}
+
+
+def medir_hilos(video, segundos, coste_interfaz_ms, opciones):
+    """Disposición actual: captura y análisis en hilos del mismo proceso"""
+    captura = CapturaEnHilo(FuenteVideo(video, bucle=True)).iniciar()
+    analisis = AnalisisRostro(**opciones).cargar()
+    cola = deque()
+    parar = threading.Event()
+
+    def bucle_analisis():
+        secuencia = 0
+        gris = None
+        while not parar.is_set():
+            dato = captura.ultimo(despues_de=secuencia, timeout=0.1)
+            if dato is None:
+                if captura.error:
+                    break
+                continue
+            secuencia, instante, frame = dato
+            if gris is None:
+                gris = np.empty(frame.shape[:2], dtype=np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gris)
+            inicio = time.perf_counter()
+            if analisis.analizar(gris):
+                cola.append((secuencia, instante, *analisis.resultado(), (time.perf_counter() - inicio) * 1000))
+
+    def recoger():
+        while cola:
+            yield cola.popleft()
+
+    hilo = threading.Thread(target=bucle_analisis, name="analisis", daemon=True)
+    hilo.start()
+    try:
+        return _bucle_interfaz(captura, recoger, segundos, coste_interfaz_ms)
+    finally:
+        parar.set()
+        hilo.join(timeout=1.0)
+        captura.detener()
+        captura.cap.release()
+
+
+def medir_procesos(video, segundos, coste_interfaz_ms, opciones):
+    """Captura, análisis e interfaz en tres procesos unidos por el anillo"""
+    pipeline = PipelineProcesos(camara=video, bucle=True, **opciones).iniciar()
+    pipeline.esperar_listo()
+
+    def recoger():
+        while True:
+            resultado = pipeline.siguiente_resultado(timeout=0)
+            if resultado is None:
+                if pipeline.resultados.empty():
+                    return
+                continue
+            yield resultado
+
+    try:
+        return _bucle_interfaz(pipeline.captura, recoger, segundos, coste_interfaz_ms)
+    finally:
+        pipeline.detener()
+
+
+def comparar(video, segundos=10.0, coste_interfaz_ms=8.0, opciones=None):
+    """Mide las dos disposiciones con el mismo vídeo (leído a su ritmo, en bucle)"""
+    opciones = opciones or {}
+    print(f"📊 Un proceso frente a procesos separados ({video}, {segundos:.0f} s cada uno, "
+          f"{mp.cpu_count()} CPUs)")
+    resultados = {}
+    for modo, medir in (('hilos', medir_hilos), ('procesos', medir_procesos)):
+        r = medir(video, segundos, coste_interfaz_ms, opciones)
+        resultados[modo] = r
+        print(f"   {modo:9s} interfaz {r['fps_interfaz']:5.1f} FPS | análisis {r['fps_analisis']:5.1f} FPS "
+              f"({r['frames_sin_analizar']} sin analizar) | "
+              f"captura->pantalla {r['latencia_pantalla_ms']['media']:5.1f} ms "
+              f"(p95 {r['latencia_pantalla_ms']['p95']:5.1f}) | "
+              f"captura->resultado {r['latencia_resultado_ms']['media']:5.1f} ms "
+              f"(p95 {r['latencia_resultado_ms']['p95']:5.1f})")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline en procesos separados con memoria compartida")
+    sub = parser.add_subparsers(dest='orden', required=True)
+    p = sub.add_parser('comparar', help="Rendimiento y latencia frente al bucle de un solo proceso")
+    p.add_argument('video', help="Vídeo que hace de cámara (se lee a sus FPS, en bucle)")
+    p.add_argument('--segundos', type=float, default=10.0)
+    p.add_argument('--coste-interfaz', type=float, default=8.0,
+                   help="ms de CPU que se simulan por frame para el render de la interfaz")
+    p.add_argument('--detector', default=None, help="Backend de detectores_rostro.py")
+    p.add_argument('--sin-seguimiento', action='store_true',
+                   help="Escaneo completo en cada frame (análisis más caro)")
+    args = parser.parse_args()
+
+    comparar(args.video, args.segundos, args.coste_interfaz,
+             {'detector_rostro': args.detector, 'seguimiento': not args.sin_seguimiento})
@@ -0,0 +1,114 @@
+"""
+pipeline_rostros.py
+Piezas comunes del pipeline de rostros: preprocesado del frame, detectores
+cargados una sola vez por proceso y geometría de las regiones (ojos, boca)
+y de las cajas (IoU).
+Lo usan detector.py, prueba_deteccion.py y el procesamiento por lotes.
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# ============================================
+# DETECTORES (UNO POR MODELO Y PROCESO)
+# ============================================
+CASCADA_ROSTRO = 'haarcascade_frontalface_default.xml'
+
+# Parámetros de detección que usan los scripts
+PARAMETROS_DETECTOR = {'scaleFactor': 1.1, 'minNeighbors': 6, 'minSize': (100, 100)}
+
+_clasificadores = {}
+_lock_clasificadores = threading.Lock()
+
+
+def obtener_clasificador(nombre=CASCADA_ROSTRO):
+    """
+    Devuelve el CascadeClassifier del modelo indicado, cargándolo del disco
+    sólo la primera vez. Acepta un nombre de cv2.data.haarcascades o una ruta.
+    """
+    clasificador = _clasificadores.get(nombre)
+    if clasificador is not None:
+        return clasificador
+
+    with _lock_clasificadores:
+        # Otro hilo pudo cargarlo mientras esperábamos
+        if nombre not in _clasificadores:
+            ruta = nombre if os.path.isfile(nombre) else cv2.data.haarcascades + nombre
+            clasificador = cv2.CascadeClassifier(ruta)
+            if clasificador.empty():
+                raise RuntimeError(f"No se pudo cargar el detector: {ruta}")
+            _clasificadores[nombre] = clasificador
+        return _clasificadores[nombre]
+
+
+def detectar_rostros(gris, clasificador=None, **parametros):
+    """detectMultiScale con los parámetros por defecto del proyecto"""
+    clasificador = clasificador or obtener_clasificador()
+    return clasificador.detectMultiScale(gris, **{**PARAMETROS_DETECTOR, **parametros})
+
+
+def rostro_principal(rostros):
+    """El rostro más grande (x, y, w, h) o None si no hay ninguno"""
+    if len(rostros) == 0:
+        return None
+    x, y, w, h = max(rostros, key=lambda r: r[2] * r[3])
+    return int(x), int(y), int(w), int(h)
+
+
+# ============================================
+# PREPROCESADO DEL FRAME
+# ============================================
+def preprocesar_frame(frame, espejo=True, pool=None):
+    """
+    Voltea el frame (como espejo) y devuelve (frame, gris).
+    Con pool (PoolBuffers) ambos se escriben en buffers reutilizados: valen hasta el siguiente frame
+    """
+    if espejo:
+        frame = cv2.flip(frame, 1, dst=None if pool is None else pool.como(frame, "espejo"))
+    gris = None if pool is None else pool.obtener(frame.shape[:2], nombre="gris")
+    gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gris)
+    return frame, gris
+
+
+# ============================================
+# GEOMETRÍA DE LAS REGIONES
+# ============================================
+# Fracciones del rostro: (y1, y2, x1, x2)
+BANDA_BOCA = (0.65, 0.90, 0.25, 0.75)
+BANDA_OJOS = (0.20, 0.50, 0.15, 0.85)      # Ojos + cejas (análisis de expresión)
+BANDA_PUPILA = (0.30, 0.50, 0.20, 0.80)    # Más centrada en los ojos (medición de pupila)
+
+
+def caja_banda(w, h, banda):
+    """Convierte una banda en píxeles (x1, y1, x2, y2) dentro de un rostro de w x h"""
+    y1, y2, x1, x2 = banda
+    return int(w * x1), int(h * y1), int(w * x2), int(h * y2)
+
+
+def recortar_banda(rostro_gris, banda):
+    """Vista (sin copia) de la banda dentro del recorte del rostro; None si queda vacía"""
+    h, w = rostro_gris.shape[:2]
+    x1, y1, x2, y2 = caja_banda(w, h, banda)
+    if y2 <= y1 or x2 <= x1:
+        return None
+    return rostro_gris[y1:y2, x1:x2]
+
+
+def iou_cajas(a, b):
+    """Matriz de IoU (intersección / unión) entre cajas (N, 4) y (M, 4) en formato x, y, w, h"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+
+    ancho = np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, 0, None], b[None, :, 0])
+    alto = np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, 1, None], b[None, :, 1])
+    interseccion = np.clip(ancho, 0, None) * np.clip(alto, 0, None)
+
+    areas_a = a[:, 2] * a[:, 3]
+    areas_b = b[:, 2] * b[:, 3]
+    union = areas_a[:, None] + areas_b[None, :] - interseccion
+    return np.divide(interseccion, union, out=np.zeros_like(interseccion), where=union > 0)
@@ -0,0 +1,126 @@
+"""
+pool_buffers.py
+Buffers reservados una vez y reutilizados en cada frame (dst= de OpenCV),
+y medición de la memoria que se pide por frame con tracemalloc.
+
+Cada buffer se identifica por nombre y tipo. El buffer crece hasta la forma
+más grande que se le haya pedido y se devuelve una vista de la forma exacta:
+los recortes del rostro cambian de tamaño entre frames y así no hace falta
+reservar uno nuevo por tamaño (ni acumular uno por cada tamaño visto).
+OpenCV escribe en esas vistas sin copias.
+
+Un pool no es seguro entre hilos: cada hilo usa el suyo (o nombres distintos).
+"""
+import tracemalloc
+
+import numpy as np
+
+
+class PoolBuffers:
+    def __init__(self):
+        self.buffers = {}
+        self.reservas = 0          # Veces que se ha tenido que reservar memoria
+        self.bytes_reservados = 0
+
+    def obtener(self, forma, dtype=np.uint8, nombre=""):
+        """Vista de forma exacta sobre el buffer `nombre` (se amplía si no cabe)"""
+        forma = tuple(forma)
+        clave = (nombre, dtype, len(forma))
+        buffer = self.buffers.get(clave)
+        if buffer is not None and buffer.shape == forma:
+            return buffer
+
+        # Sin generadores: esto se llama varias veces por frame
+        cabe = buffer is not None
+        if cabe:
+            for n, c in zip(forma, buffer.shape):
+                if n > c:
+                    cabe = False
+                    break
+        if not cabe:
+            capacidad = forma if buffer is None else tuple(map(max, forma, buffer.shape))
+            buffer = np.empty(capacidad, dtype=dtype)
+            self.buffers[clave] = buffer
+            self.reservas += 1
+            self.bytes_reservados += buffer.nbytes
+        return buffer[tuple(map(slice, forma))]
+
+    def como(self, array, nombre=""):
+        """Buffer con la forma y el tipo de array"""
+        return self.obtener(array.shape, array.dtype, nombre)
+
+    def resumen(self):
+        return (f"Pool: {len(self.buffers)} buffers | {self.bytes_reservados / 1024:.0f} KB reservados "
+                f"en {self.reservas} reservas")
+
+
+# ============================================
+# MEDICIÓN DE ASIGNACIONES
+# ============================================
+class MedidorMemoria:
+    """
+    Memoria pedida por frame con tracemalloc (incluye los arrays de NumPy y
+    OpenCV). En cada frame() se anota el pico por encima de lo que había al
+    empezar el frame: con un bucle sin asignaciones es casi cero. Cada
+    `muestreo` frames se cuentan además los bloques vivos, para ver cuántas
+    asignaciones por frame se quedan sin liberar.
+    tracemalloc frena el programa: sólo para medir.
+    """
+
+    def __init__(self, activo=True, calentamiento=10, muestreo=50):
+        self.activo = activo
+        self.calentamiento = calentamiento
+        self.muestreo = muestreo
+        self.picos = []
+        self.muestras = []       # (frame, bytes vivos, bloques vivos)
+        self.frames = 0
+        self._base = 0
+        self._iniciado_aqui = False
+        if activo and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciado_aqui = True
+        if activo:
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+
+    def frame(self):
+        """Cierra el frame actual y empieza el siguiente"""
+        if not self.activo:
+            return
+        actual, pico = tracemalloc.get_traced_memory()
+        self.frames += 1
+        if self.frames > self.calentamiento:
+            self.picos.append(pico - self._base)
+            if (self.frames - self.calentamiento) % self.muestreo == 1:
+                self.muestras.append((self.frames, actual, len(tracemalloc.take_snapshot().traces)))
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+
+    def estadisticas(self):
+        if not self.picos:
+            return None
+        picos = np.array(self.picos)
+        e = {
+            'frames': len(picos),
+            'kb_por_frame_media': float(picos.mean()) / 1024,
+            'kb_por_frame_p95': float(np.percentile(picos, 95)) / 1024,
+            'bytes_retenidos_por_frame': 0.0,
+            'bloques_retenidos_por_frame': 0.0,
+        }
+        if len(self.muestras) >= 2:
+            (f0, b0, n0), (f1, b1, n1) = self.muestras[0], self.muestras[-1]
+            e['bytes_retenidos_por_frame'] = (b1 - b0) / (f1 - f0)
+            e['bloques_retenidos_por_frame'] = (n1 - n0) / (f1 - f0)
+        return e
+
+    def resumen(self):
+        e = self.estadisticas()
+        if e is None:
+            return "Memoria: sin frames suficientes"
+        return (f"Memoria por frame ({e['frames']} frames): pico media {e['kb_por_frame_media']:.1f} KB | "
+                f"p95 {e['kb_por_frame_p95']:.1f} KB | retenido {e['bytes_retenidos_por_frame']:.0f} B "
+                f"en {e['bloques_retenidos_por_frame']:.1f} bloques")
+
+    def detener(self):
+        if self._iniciado_aqui:
+            tracemalloc.stop()
@@ -0,0 +1,44 @@
+"""
+presentador.py
+Paso de frame de cámara (BGR) a Surface de pygame sin crear arrays ni
+Surfaces nuevos en cada frame: los buffers se reservan una vez y la Surface
+comparte memoria con el último de ellos (pygame.image.frombuffer).
+"""
+import cv2
+import numpy as np
+import pygame
+
+
+class PresentadorFrames:
+    def __init__(self, espejo=True):
+        # La ruta antigua (rot90 + make_surface) mostraba el frame volteado
+        # horizontalmente respecto al array; espejo=True conserva esa imagen
+        self.espejo = espejo
+
+        self.forma = None
+        self.rgb = None         # Frame en RGB, aquí se dibujan los resultados
+        self.pantalla = None    # Memoria compartida con la Surface
+        self.superficie = None
+
+    def preparar(self, alto, ancho):
+        """Reserva los buffers y la Surface para frames de alto x ancho"""
+        self.forma = (alto, ancho, 3)
+        self.rgb = np.empty(self.forma, dtype=np.uint8)
+        self.pantalla = np.empty(self.forma, dtype=np.uint8) if self.espejo else self.rgb
+        self.superficie = pygame.image.frombuffer(self.pantalla, (ancho, alto), 'RGB')
+
+    def convertir(self, frame_bgr):
+        """
+        Copia el frame BGR a self.rgb (en su sitio) y lo devuelve para dibujar
+        encima. El frame original no se modifica.
+        """
+        if frame_bgr.shape != self.forma:
+            self.preparar(*frame_bgr.shape[:2])
+        cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        return self.rgb
+
+    def presentar(self):
+        """Vuelca self.rgb en la memoria de la Surface y devuelve la Surface (siempre la misma)"""
+        if self.espejo:
+            cv2.flip(self.rgb, 1, dst=self.pantalla)
+        return self.superficie
@@ -0,0 +1,191 @@
+"""
+procesamiento_lotes.py
+Procesa vídeos grabados y carpetas de imágenes SIN ventana ni cámara, usando todos los núcleos.
+
+Uso:
+    python procesamiento_lotes.py sesion1.mp4 carpeta_fotos/ -o resultados.csv -j 8
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+
+import analisis_expresiones
+from pipeline_rostros import detectar_rostros, obtener_clasificador, rostro_principal
+
+EXTENSIONES_VIDEO = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.mpg', '.mpeg'}
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+COLUMNAS = ['fuente', 'frame', 'x', 'y', 'w', 'h', 'expresion', 'confianza']
+
+# ============================================
+# REPARTO DEL TRABAJO
+# ============================================
+def contar_frames(ruta_video):
+    """Número de frames que declara el vídeo (0 si el contenedor no lo sabe)"""
+    cap = cv2.VideoCapture(str(ruta_video))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    cap.release()
+    return max(0, total)
+
+
+def listar_trabajos(entradas, frames_por_bloque=300, imagenes_por_bloque=50):
+    """
+    Divide las entradas en trabajos independientes:
+    - ('video', ruta, inicio, fin): rango de frames de un vídeo
+    - ('imagenes', [rutas]): grupo de imágenes sueltas
+    """
+    trabajos = []
+    imagenes = []
+
+    for entrada in entradas:
+        ruta = Path(entrada)
+
+        if ruta.is_dir():
+            imagenes.extend(sorted(
+                p for p in ruta.iterdir() if p.suffix.lower() in EXTENSIONES_IMAGEN
+            ))
+        elif ruta.suffix.lower() in EXTENSIONES_IMAGEN:
+            imagenes.append(ruta)
+        elif ruta.suffix.lower() in EXTENSIONES_VIDEO:
+            total = contar_frames(ruta)
+            if total == 0:
+                # Sin recuento fiable: todo el vídeo en un único trabajo
+                trabajos.append(('video', str(ruta), 0, None))
+            else:
+                for inicio in range(0, total, frames_por_bloque):
+                    fin = min(inicio + frames_por_bloque, total)
+                    trabajos.append(('video', str(ruta), inicio, fin))
+        else:
+            print(f"⚠️  Entrada ignorada (formato no reconocido): {ruta}")
+
+    for i in range(0, len(imagenes), imagenes_por_bloque):
+        grupo = [str(p) for p in imagenes[i:i + imagenes_por_bloque]]
+        trabajos.append(('imagenes', grupo))
+
+    return trabajos
+
+
+# ============================================
+# TRABAJADOR
+# ============================================
+def iniciar_trabajador():
+    """Se ejecuta una vez por proceso: carga el detector y limita hilos internos"""
+    # Un hilo de OpenCV por proceso: el paralelismo lo da el pool, no OpenCV
+    cv2.setNumThreads(1)
+    obtener_clasificador()
+
+
+def analizar_frame(frame):
+    """Detecta el rostro más grande y devuelve (caja, expresion, confianza)"""
+    gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    caja = rostro_principal(detectar_rostros(gris))
+
+    if caja is None:
+        return None, "neutral", 0.0
+
+    x, y, w, h = caja
+    expresion, confianza = analisis_expresiones.analizar_expresion(gris[y:y+h, x:x+w])
+    return caja, expresion, float(confianza)
+
+
+def fila_resultado(fuente, indice, caja, expresion, confianza):
+    """Fila del CSV de resultados (caja vacía si no hay rostro)"""
+    x, y, w, h = caja if caja is not None else ('', '', '', '')
+    return [fuente, indice, x, y, w, h, expresion, f"{confianza:.3f}"]
+
+
+def procesar_trabajo(trabajo):
+    """Procesa un trabajo completo y devuelve sus filas de resultados"""
+    filas = []
+
+    if trabajo[0] == 'video':
+        _, ruta, inicio, fin = trabajo
+        cap = cv2.VideoCapture(ruta)
+        if inicio > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, inicio)
+
+        indice = inicio
+        while fin is None or indice < fin:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            caja, expresion, confianza = analizar_frame(frame)
+            filas.append(fila_resultado(ruta, indice, caja, expresion, confianza))
+            indice += 1
+        cap.release()
+
+    else:
+        _, rutas = trabajo
+        for ruta in rutas:
+            frame = cv2.imread(ruta)
+            if frame is None:
+                print(f"⚠️  No se pudo leer: {ruta}")
+                continue
+            caja, expresion, confianza = analizar_frame(frame)
+            filas.append(fila_resultado(ruta, 0, caja, expresion, confianza))
+
+    return filas
+
+
+# ============================================
+# EJECUCIÓN EN PARALELO
+# ============================================
+def procesar_lotes(entradas, salida, procesos=None, frames_por_bloque=300):
+    """Reparte los trabajos en un pool de procesos y escribe el CSV en orden"""
+    procesos = procesos or os.cpu_count() or 1
+    trabajos = listar_trabajos(entradas, frames_por_bloque)
+
+    if not trabajos:
+        print("❌ No hay nada que procesar")
+        return 0, 0.0
+
+    print(f"🧩 {len(trabajos)} trabajos repartidos en {procesos} procesos")
+
+    total_frames = 0
+    inicio = time.perf_counter()
+
+    with open(salida, 'w', newline='', encoding='utf-8') as f, \
+            ProcessPoolExecutor(max_workers=procesos, initializer=iniciar_trabajador) as pool:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS)
+
+        # map conserva el orden de los trabajos, así el CSV sale ordenado por fuente y frame
+        for filas in pool.map(procesar_trabajo, trabajos):
+            escritor.writerows(filas)
+            total_frames += len(filas)
+
+            transcurrido = time.perf_counter() - inicio
+            print(f"\r⏱️  {total_frames} frames | {total_frames / transcurrido:.1f} FPS", end='')
+
+    duracion = time.perf_counter() - inicio
+    fps = total_frames / duracion if duracion > 0 else 0.0
+    print(f"\n✅ {total_frames} frames en {duracion:.1f}s -> {fps:.1f} FPS "
+          f"({fps / procesos:.1f} FPS por proceso)")
+    print(f"📄 Resultados en: {salida}")
+    return total_frames, fps
+
+
+# ============================================
+# PUNTO DE ENTRADA
+# ============================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detector de expresiones por lotes (sin ventana)")
+    parser.add_argument('entradas', nargs='+', help="Vídeos, imágenes o carpetas de imágenes")
+    parser.add_argument('-o', '--salida', default='resultados.csv', help="CSV de salida")
+    parser.add_argument('-j', '--procesos', type=int, default=None,
+                        help="Procesos en paralelo (por defecto, todos los núcleos)")
+    parser.add_argument('--bloque', type=int, default=300,
+                        help="Frames de vídeo por trabajo")
+    args = parser.parse_args()
+
+    try:
+        procesar_lotes(args.entradas, args.salida, args.procesos, args.bloque)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrumpido por el usuario")
+        sys.exit(1)
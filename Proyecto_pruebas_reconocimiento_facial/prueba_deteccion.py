@@ -2,29 +2,57 @@
 medicion_pupila_exacta.py
 Mide EXACTAMENTE cuánta pupila se ve: 0% (cerrado) a 100% (pupila completa visible)
 """
+import time
+
 import cv2
 import numpy as np
 
-# Iniciar cámara
-cap = cv2.VideoCapture(0)
-
-print("🔍 MEDICIÓN EXACTA DE PUPILA - 0% a 100%")
-print("=" * 60)
-print("OBJETIVO: Medir cuánta pupila se ve")
-print("  - 0%: Ojos cerrados (NO se ve pupila)")
-print("  - 50%: Se ve media pupila")
-print("  - 100%: Se ve pupila COMPLETA")
-print("=" * 60)
-print("\nINSTRUCCIONES:")
-print("1. Cierra COMPLETAMENTE los ojos -> debe dar 0%")
-print("2. Abre los ojos NORMALMENTE -> anota el %")
-print("3. Abre AL MÁXIMO los ojos -> debe dar 100%")
-print("4. Presiona ESPACIO para capturar valor")
-print("5. ESC para salir")
-print("=" * 60)
+from cache_analisis import CacheAnalisis
+from capas_overlay import CapaEstatica
+from detectores_rostro import obtener_backend
+from estadisticas_regiones import EstadisticasRegiones
+from calibracion import cargar_perfil
+from instrumentacion import Instrumentacion
+from pipeline_rostros import (BANDA_BOCA, BANDA_OJOS, BANDA_PUPILA, caja_banda, preprocesar_frame,
+                              rostro_principal)
+from pool_buffers import MedidorMemoria, PoolBuffers
+from pupila import medir_pupila_lote
+from registro import RegistroResultados, nueva_sesion
+from servidor_resultados import ServidorResultados
+from seguimiento import SeguidorRostro
+
+# Detector de rostros: None = el elegido en este equipo (detectores_rostro.py) o haar_default
+DETECTOR_ROSTRO = None
+
+# Modo seguimiento (buscar sólo alrededor del último rostro)
+USAR_SEGUIMIENTO = True
+INTERVALO_DETECCION = 15   # Frames entre escaneos completos
+MARGEN_ROI = 0.5           # Margen de la ROI (fracción del tamaño del rostro)
+ESCALA_COMPLETA = 1.0      # <1.0 reduce el frame en los escaneos completos
+
+# Reutilizar pupila y boca si la región apenas ha cambiado (quieto frente a la cámara)
+USAR_CACHE = True
+UMBRAL_CACHE = 3.0         # Cambio medio (niveles de gris) a partir del cual se recalcula
+
+# Tiempos por etapa (FPS y p50/p95/p99 en pantalla y al salir)
+INSTRUMENTAR = False
+VOLCADO_ESTADISTICAS = None  # Fichero JSONL para volcar las estadísticas cada 10 s
+
+# Guardar pupila, boca y ojos de cada frame en sesiones/<fecha> (ver registro.py)
+REGISTRAR = False
+
+# Publicar pupila y caja de cada frame en http://127.0.0.1:PUERTO (ver servidor_resultados.py)
+SERVIDOR_PUERTO = None
+
+# Memoria pedida por frame (tracemalloc, más lento): debería ser casi cero con los buffers del pool
+MEDIR_MEMORIA = False
+
+# Panel, leyenda y escala pre-renderizados (capas_overlay.py); False: todas las llamadas cada frame
+USAR_CAPA_ESTATICA = True
 
 def medir_pupila_exacta(region_ojos_gris):
-    """Mide porcentaje de pupila visible (0-100%)"""
+    """Mide porcentaje de pupila visible (0-100%)
+    Versión de referencia píxel a píxel; el bucle usa pupila.medir_pupila_lote"""
     if region_ojos_gris.size == 0:
         return 0
     
@@ -112,8 +140,8 @@ def medir_pupila_exacta(region_ojos_gris):
     
     return 0
 
-def dibujar_analisis_pupila(frame, x_offset, y_offset, region_ojos_gris, pupila_x, pupila_y):
-    """Dibuja análisis visual de la pupila"""
+def dibujar_analisis_pupila(frame, x_offset, y_offset, region_ojos_gris, pupila_x, pupila_y, pool=None):
+    """Dibuja análisis visual de la pupila (con pool, sin arrays intermedios nuevos)"""
     if region_ojos_gris.size == 0:
         return frame
     
@@ -122,12 +150,12 @@ def dibujar_analisis_pupila(frame, x_offset, y_offset, region_ojos_gris, pupila_
     if h == 0 or w == 0:
         return frame
     
-    # 1. Mostrar región de ojos
-    ojos_color = cv2.cvtColor(region_ojos_gris, cv2.COLOR_GRAY2BGR)
-    ojos_resized = cv2.resize(ojos_color, (w*2, h*2))  # Ampliar para ver mejor
-    
-    # Pegar en frame
-    frame[y_offset:y_offset+h*2, x_offset:x_offset+w*2] = ojos_resized
+    # 1. Mostrar región de ojos: ampliar en gris y convertir a color directamente sobre el frame
+    ampliada = None if pool is None else pool.obtener((h*2, w*2), nombre="ojos_ampliados")
+    ampliada = cv2.resize(region_ojos_gris, (w*2, h*2), dst=ampliada)  # Ampliar para ver mejor
+    destino = frame[y_offset:y_offset+h*2, x_offset:x_offset+w*2]
+    alto, ancho = destino.shape[:2]
+    cv2.cvtColor(ampliada[:alto, :ancho], cv2.COLOR_GRAY2BGR, dst=destino)
     
     # 2. Dibujar cruz en el punto más oscuro (pupila)
     if pupila_x is not None and pupila_y is not None:
@@ -146,231 +174,321 @@ def dibujar_analisis_pupila(frame, x_offset, y_offset, region_ojos_gris, pupila_
     
     return frame
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-    
-    frame = cv2.flip(frame, 1)
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # Detector de rostros
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+# ============================================
+# PANEL DE RESULTADOS
+# ============================================
+# Barra de progreso de la pupila: x, y, ancho, alto
+BARRA_X, BARRA_Y, BARRA_ANCHO, BARRA_ALTO = 420, 60, 200, 30
+
+def estado_pupila(porcentaje_pupila):
+    """(color, estado) del porcentaje de pupila"""
+    if porcentaje_pupila < 10:
+        return (0, 0, 255), "CERRADO"         # Rojo
+    elif porcentaje_pupila < 40:
+        return (0, 165, 255), "SEMI-CERRADO"  # Naranja
+    elif porcentaje_pupila < 70:
+        return (0, 255, 255), "PARCIAL"       # Amarillo
+    elif porcentaje_pupila < 90:
+        return (0, 255, 0), "ABIERTO"         # Verde
+    else:
+        return (255, 255, 0), "COMPLETO"      # Cian
+
+def dibujar_panel_estatico(frame):
+    """Lo que no cambia entre frames: panel, explicaciones, escala de la barra y leyenda"""
+    # Panel principal
+    cv2.rectangle(frame, (10, 10), (400, 240), (20, 20, 40), -1)
+    cv2.rectangle(frame, (10, 10), (400, 240), (100, 100, 150), 2)
+
+    # Título
+    cv2.putText(frame, "MEDICION EXACTA DE PUPILA", (20, 35),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 255, 255), 2)
+
+    # EXPLICACIÓN
+    cv2.putText(frame, "0% = Ojos cerrados", (20, 125),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+    cv2.putText(frame, "50% = Media pupila visible", (20, 145),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+    cv2.putText(frame, "100% = Pupila completa", (20, 165),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+
+    # Instrucciones
+    cv2.putText(frame, "ESPACIO: Capturar valor", (20, 215),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 255), 1)
+    cv2.putText(frame, "ESC: Salir", (20, 235),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 255, 200), 1)
+
+    # Marcas de la barra
+    for marca in [0, 25, 50, 75, 100]:
+        x_marca = BARRA_X + int((marca / 100) * BARRA_ANCHO)
+        cv2.line(frame, (x_marca, BARRA_Y),
+                (x_marca, BARRA_Y - 5), (150, 150, 150), 1)
+        cv2.putText(frame, f"{marca}%", (x_marca-10, BARRA_Y-10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+
+    # Borde de la barra
+    cv2.rectangle(frame, (BARRA_X, BARRA_Y),
+                 (BARRA_X + BARRA_ANCHO, BARRA_Y + BARRA_ALTO),
+                 (150, 150, 150), 2)
+
+    # Texto barra
+    cv2.putText(frame, "PUPILA VISIBLE", (BARRA_X, BARRA_Y - 25),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 200), 1)
+
+    # LEYENDA VISUAL
+    cv2.putText(frame, "LEYENDA VISUAL:", (420, 120),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 200), 1)
+    cv2.putText(frame, "AMARILLO: Region ojos", (420, 145),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+    cv2.putText(frame, "AZUL: Region boca", (420, 165),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+    cv2.putText(frame, "ROJO: Pupila detectada", (420, 185),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+    cv2.putText(frame, "VERDE: Area analizada", (420, 205),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+def dibujar_resultados(frame, porcentaje_pupila, intensidad_boca, capa=None):
+    """
+    Panel de resultados. Con capa (CapaEstatica de dibujar_panel_estatico) lo
+    estático se pega de una vez y sólo se dibujan los campos que cambian;
+    sin capa se hacen todas las llamadas de dibujo (versión de referencia)
+    """
+    color_pupila, estado = estado_pupila(porcentaje_pupila)
+
+    # Relleno de la barra: debajo de la escala y del borde
+    cv2.rectangle(frame, (BARRA_X, BARRA_Y),
+                 (BARRA_X + BARRA_ANCHO, BARRA_Y + BARRA_ALTO),
+                 (50, 50, 50), -1)
+    progreso = int((porcentaje_pupila / 100) * BARRA_ANCHO)
+    cv2.rectangle(frame, (BARRA_X, BARRA_Y),
+                 (BARRA_X + progreso, BARRA_Y + BARRA_ALTO),
+                 color_pupila, -1)
+
+    if capa is None:
+        dibujar_panel_estatico(frame)
+    else:
+        capa.componer(frame)
+
+    # PORCENTAJE PUPILA
+    cv2.putText(frame, f"PUPILA VISIBLE: {porcentaje_pupila:.0f}%", (20, 65),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.8, color_pupila, 2)
+    cv2.putText(frame, f"Estado: {estado}", (20, 95),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, color_pupila, 1)
+
+    # BOCA (referencia)
+    cv2.putText(frame, f"BOCA (ref): {intensidad_boca:.1f}", (20, 195),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 100, 100), 1)
+    return frame
+
+def dibujar_estadisticas(frame, instr):
+    """FPS y percentiles por etapa en la esquina inferior izquierda"""
+    lineas = instr.lineas()
+    alto, _ = frame.shape[:2]
+    y0 = alto - 10 - 16 * len(lineas)
+    cv2.rectangle(frame, (5, y0 - 14), (330, alto - 5), (0, 0, 0), -1)
+    for i, linea in enumerate(lineas):
+        cv2.putText(frame, linea, (10, y0 + 16 * i),
+                    cv2.FONT_HERSHEY_PLAIN, 1.0, (120, 220, 255), 1)
+
+def main():
+    # Iniciar cámara
+    cap = cv2.VideoCapture(0)
+
+    # Detector de rostros (cargado una sola vez)
+    backend = obtener_backend(DETECTOR_ROSTRO)
+    print(f"🧩 Detector de rostros: {backend.nombre}")
+    seguidor = SeguidorRostro(
+        backend,
+        intervalo_completo=INTERVALO_DETECCION if USAR_SEGUIMIENTO else 0,
+        margen_roi=MARGEN_ROI,
+        escala_completa=ESCALA_COMPLETA,
+        scaleFactor=1.1,
+        minNeighbors=5,
+        minSize=(100, 100)
     )
+
+    print("🔍 MEDICIÓN EXACTA DE PUPILA - 0% a 100%")
+    print("=" * 60)
+    print("OBJETIVO: Medir cuánta pupila se ve")
+    print("  - 0%: Ojos cerrados (NO se ve pupila)")
+    print("  - 50%: Se ve media pupila")
+    print("  - 100%: Se ve pupila COMPLETA")
+    print("=" * 60)
+    print("\nINSTRUCCIONES:")
+    print("1. Cierra COMPLETAMENTE los ojos -> debe dar 0%")
+    print("2. Abre los ojos NORMALMENTE -> anota el %")
+    print("3. Abre AL MÁXIMO los ojos -> debe dar 100%")
+    print("4. Presiona ESPACIO para capturar valor")
+    print("5. ESC para salir")
+    print("=" * 60)
+
+    # Perfil activo: la pupila se reescala a los extremos medidos para el usuario
+    perfil = cargar_perfil()
+    if perfil is not None:
+        print(f"👤 Perfil: {perfil.nombre} (pupila {perfil.pupila_cerrado:.0f}%-{perfil.pupila_abierto:.0f}%)")
+    else:
+        print("👤 Sin perfil: ejecuta calibracion.py para ajustar 0% y 100% a tus ojos")
+    capturas = []
+    cache = CacheAnalisis(umbral=UMBRAL_CACHE, activa=USAR_CACHE)
+
+    instr = Instrumentacion(activa=INSTRUMENTAR or bool(VOLCADO_ESTADISTICAS),
+                            ruta_volcado=VOLCADO_ESTADISTICAS)
+    registro = RegistroResultados(nueva_sesion()) if REGISTRAR else None
+    pool = PoolBuffers()                # Buffers por frame (espejo, gris, bordes...) reutilizados
+    regiones = EstadisticasRegiones(pool=pool)   # Integrales del rostro
+    memoria = MedidorMemoria(activo=MEDIR_MEMORIA)
+    capa_panel = CapaEstatica(dibujar_panel_estatico) if USAR_CAPA_ESTATICA else None
+    crudo = None
+    servidor = ServidorResultados(puerto=SERVIDOR_PUERTO).iniciar() if SERVIDOR_PUERTO is not None else None
+    if servidor is not None:
+        print(f"📡 Publicando resultados en http://127.0.0.1:{servidor.puerto}/eventos")
+
+    while True:
+        t = time.perf_counter()
+        ret, crudo = cap.read(crudo)
+        if not ret:
+            break
+        t = instr.desde('1_captura', t)
     
-    faces = face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(100, 100))
+        frame, gray = preprocesar_frame(crudo, pool=pool)
     
-    if len(faces) > 0:
-        x, y, w, h = max(faces, key=lambda r: r[2] * r[3])
-        
-        # ============================================
-        # REGIÓN DE OJOS (para pupila)
-        # ============================================
-        # Ajustar región para centrarse mejor en los ojos
-        ojos_y1, ojos_y2 = int(h * 0.30), int(h * 0.50)  # Más centrado
-        ojos_x1, ojos_x2 = int(w * 0.20), int(w * 0.80)
-        
-        if ojos_y2 > ojos_y1 and ojos_x2 > ojos_x1:
-            region_ojos = gray[y+ojos_y1:y+ojos_y2, x+ojos_x1:x+ojos_x2]
+        caja = rostro_principal(seguidor.detectar(gray))
+        t = instr.desde('2_deteccion', t)
+    
+        if caja is not None:
+            caja = cache.estabilizar('rostro', caja)
+            x, y, w, h = caja
+        
+            # ============================================
+            # REGIÓN DE OJOS (para pupila)
+            # ============================================
+            # Región centrada en los ojos (más estrecha que la del análisis de expresión)
+            ojos_x1, ojos_y1, ojos_x2, ojos_y2 = caja_banda(w, h, BANDA_PUPILA)
+        
+            if ojos_y2 > ojos_y1 and ojos_x2 > ojos_x1:
+                region_ojos = gray[y+ojos_y1:y+ojos_y2, x+ojos_x1:x+ojos_x2]
             
-            # Encontrar punto más oscuro para visualización
-            if region_ojos.size > 0:
-                min_val = np.min(region_ojos)
-                min_loc = np.where(region_ojos == min_val)
+                if region_ojos.size > 0:
+                    # Medir pupila (versión vectorizada) y punto más oscuro para visualización
+                    porcentaje_pupila, pupila_y, pupila_x = cache.analizar(
+                        'pupila', region_ojos, lambda r: medir_pupila_lote(r, con_centro=True)
+                    )
+                    if perfil is not None:
+                        porcentaje_pupila = perfil.pupila_calibrada(porcentaje_pupila)
                 
-                if len(min_loc[0]) > 0 and len(min_loc[1]) > 0:
-                    pupila_y = min_loc[0][0]
-                    pupila_x = min_loc[1][0]
-                else:
-                    pupila_x = pupila_y = None
-                
-                # Medir pupila exacta
-                porcentaje_pupila = medir_pupila_exacta(region_ojos)
-                
-                # Dibujar análisis visual
-                frame = dibujar_analisis_pupila(frame, 10, 250, region_ojos, pupila_x, pupila_y)
+                    # Dibujar análisis visual
+                    frame = dibujar_analisis_pupila(frame, 10, 250, region_ojos, pupila_x, pupila_y, pool)
                 
-                # Dibujar región ocular en el rostro
-                cv2.rectangle(frame, (x+ojos_x1, y+ojos_y1), 
-                            (x+ojos_x2, y+ojos_y2), (0, 255, 255), 2)
+                    # Dibujar región ocular en el rostro
+                    cv2.rectangle(frame, (x+ojos_x1, y+ojos_y1), 
+                                (x+ojos_x2, y+ojos_y2), (0, 255, 255), 2)
+                else:
+                    porcentaje_pupila = 0
             else:
                 porcentaje_pupila = 0
-        else:
-            porcentaje_pupila = 0
+            t = instr.desde('3_pupila', t)
         
-        # ============================================
-        # REGIÓN DE BOCA (para referencia)
-        # ============================================
-        boca_y1, boca_y2 = int(h * 0.65), int(h * 0.90)
-        boca_x1, boca_x2 = int(w * 0.25), int(w * 0.75)
+            # ============================================
+            # REGIÓN DE BOCA (para referencia)
+            # ============================================
+            boca_x1, boca_y1, boca_x2, boca_y2 = caja_banda(w, h, BANDA_BOCA)
         
-        if boca_y2 > boca_y1 and boca_x2 > boca_x1:
-            region_boca = gray[y+boca_y1:y+boca_y2, x+boca_x1:x+boca_x2]
+            if boca_y2 > boca_y1 and boca_x2 > boca_x1:
+                region_boca = gray[y+boca_y1:y+boca_y2, x+boca_x1:x+boca_x2]
             
-            if region_boca.size > 0:
-                bordes_boca = cv2.Canny(region_boca, 50, 150)
-                intensidad_boca = np.mean(bordes_boca)
+                if region_boca.size > 0:
+                    intensidad_boca = cache.analizar(
+                        'boca', region_boca,
+                        lambda r: np.mean(cv2.Canny(r, 50, 150, edges=pool.obtener(r.shape, nombre="bordes_boca")))
+                    )
                 
-                # Dibujar región de boca
-                cv2.rectangle(frame, (x+boca_x1, y+boca_y1), 
-                            (x+boca_x2, y+boca_y2), (255, 0, 0), 2)
-        else:
-            intensidad_boca = 0
-        
-        # ============================================
-        # MOSTRAR RESULTADOS
-        # ============================================
-        
-        # Panel principal
-        cv2.rectangle(frame, (10, 10), (400, 240), (20, 20, 40), -1)
-        cv2.rectangle(frame, (10, 10), (400, 240), (100, 100, 150), 2)
-        
-        # Título
-        cv2.putText(frame, "MEDICION EXACTA DE PUPILA", (20, 35), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 255, 255), 2)
-        
-        y_pos = 65
-        
-        # PORCENTAJE PUPILA
-        if porcentaje_pupila < 10:
-            color_pupila = (0, 0, 255)  # Rojo
-            estado = "CERRADO"
-        elif porcentaje_pupila < 40:
-            color_pupila = (0, 165, 255)  # Naranja
-            estado = "SEMI-CERRADO"
-        elif porcentaje_pupila < 70:
-            color_pupila = (0, 255, 255)  # Amarillo
-            estado = "PARCIAL"
-        elif porcentaje_pupila < 90:
-            color_pupila = (0, 255, 0)  # Verde
-            estado = "ABIERTO"
+                    # Dibujar región de boca
+                    cv2.rectangle(frame, (x+boca_x1, y+boca_y1), 
+                                (x+boca_x2, y+boca_y2), (255, 0, 0), 2)
+            else:
+                intensidad_boca = 0
+            t = instr.desde('4_boca', t)
+        
+            if registro is not None:
+                brillo_ojos = regiones.cargar(gray[y:y+h, x:x+w]).media_banda(BANDA_OJOS)
+                registro.agregar(time.time(), caja, pupila=porcentaje_pupila,
+                                 intensidad_boca=intensidad_boca, brillo_ojos=brillo_ojos)
+            if servidor is not None:
+                servidor.publicar({'instante': time.time(), 'rostro': [int(v) for v in caja],
+                                   'pupila': round(float(porcentaje_pupila), 1),
+                                   'intensidad_boca': round(float(intensidad_boca), 2)})
+        
+            # ============================================
+            # MOSTRAR RESULTADOS
+            # ============================================
+            dibujar_resultados(frame, porcentaje_pupila, intensidad_boca, capa_panel)
+            t = instr.desde('5_overlay', t)
         else:
-            color_pupila = (255, 255, 0)  # Cian
-            estado = "COMPLETO"
-        
-        cv2.putText(frame, f"PUPILA VISIBLE: {porcentaje_pupila:.0f}%", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, color_pupila, 2)
-        y_pos += 30
-        
-        cv2.putText(frame, f"Estado: {estado}", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color_pupila, 1)
-        y_pos += 30
-        
-        # EXPLICACIÓN
-        cv2.putText(frame, "0% = Ojos cerrados", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-        y_pos += 20
-        
-        cv2.putText(frame, "50% = Media pupila visible", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-        y_pos += 20
-        
-        cv2.putText(frame, "100% = Pupila completa", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-        y_pos += 30
-        
-        # BOCA (referencia)
-        cv2.putText(frame, f"BOCA (ref): {intensidad_boca:.1f}", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 100, 100), 1)
-        y_pos += 20
-        
-        # Instrucciones
-        cv2.putText(frame, "ESPACIO: Capturar valor", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 255), 1)
-        y_pos += 20
-        
-        cv2.putText(frame, "ESC: Salir", (20, y_pos), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 255, 200), 1)
-        
-        # ============================================
-        # BARRA DE PROGRESO PUPILA
-        # ============================================
-        
-        barra_x = 420
-        barra_y = 60
-        barra_ancho = 200
-        barra_alto = 30
-        
-        # Fondo barra
-        cv2.rectangle(frame, (barra_x, barra_y), 
-                     (barra_x + barra_ancho, barra_y + barra_alto), 
-                     (50, 50, 50), -1)
-        
-        # Progreso
-        progreso = int((porcentaje_pupila / 100) * barra_ancho)
-        cv2.rectangle(frame, (barra_x, barra_y), 
-                     (barra_x + progreso, barra_y + barra_alto), 
-                     color_pupila, -1)
-        
-        # Marcas
-        for marca in [0, 25, 50, 75, 100]:
-            x_marca = barra_x + int((marca / 100) * barra_ancho)
-            cv2.line(frame, (x_marca, barra_y), 
-                    (x_marca, barra_y - 5), (150, 150, 150), 1)
-            cv2.putText(frame, f"{marca}%", (x_marca-10, barra_y-10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
-        
-        # Borde
-        cv2.rectangle(frame, (barra_x, barra_y), 
-                     (barra_x + barra_ancho, barra_y + barra_alto), 
-                     (150, 150, 150), 2)
-        
-        # Texto barra
-        cv2.putText(frame, "PUPILA VISIBLE", (barra_x, barra_y - 25), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 200), 1)
-        
-        # ============================================
-        # LEYENDA VISUAL
-        # ============================================
-        cv2.putText(frame, "LEYENDA VISUAL:", (420, 120), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 200), 1)
-        
-        cv2.putText(frame, "AMARILLO: Region ojos", (420, 145), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
-        cv2.putText(frame, "AZUL: Region boca", (420, 165), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
-        cv2.putText(frame, "ROJO: Pupila detectada", (420, 185), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-        cv2.putText(frame, "VERDE: Area analizada", (420, 205), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            # Sin rostro: un rostro que reaparezca no debe reutilizar pupila/boca anteriores
+            cache.olvidar()
+            if registro is not None:
+                registro.agregar(time.time(), None)
+            if servidor is not None:
+                servidor.publicar({'instante': time.time(), 'rostro': None, 'pupila': None})
     
-    # Mostrar frame
-    cv2.imshow("MEDICION EXACTA - Pupila 0% a 100%", frame)
+        if instr.activa:
+            dibujar_estadisticas(frame, instr)
     
-    # Controles
-    key = cv2.waitKey(1) & 0xFF
+        # Mostrar frame
+        cv2.imshow("MEDICION EXACTA - Pupila 0% a 100%", frame)
     
-    if key == 27:  # ESC
-        break
-    elif key == 32:  # ESPACIO
-        print(f"\n📊 VALOR CAPTURADO: {porcentaje_pupila:.0f}%")
-        
-        if porcentaje_pupila < 10:
-            print("  Estado: Ojos CERRADOS")
-        elif porcentaje_pupila < 40:
-            print("  Estado: Pupila PARCIAL (ojos entrecerrados)")
-        elif porcentaje_pupila < 70:
-            print("  Estado: Pupila VISIBLE (ojos normales)")
-        elif porcentaje_pupila < 90:
-            print("  Estado: Pupila BIEN VISIBLE (ojos abiertos)")
-        else:
-            print("  Estado: Pupila COMPLETA (ojos muy abiertos)")
-
-cap.release()
-cv2.destroyAllWindows()
-
-print("\n" + "=" * 60)
-print("🎯 RESUMEN DE MEDICIÓN")
-print("=" * 60)
-print("\nVALORES QUE DEBES PROBAR:")
-print("1. Ojos CERRADOS completamente: ______% (debe ser ~0%)")
-print("2. Ojos entrecerrados (triste): ______%")
-print("3. Ojos normales (neutral): ______%")
-print("4. Ojos bien abiertos: ______%")
-print("5. Ojos MUY abiertos (sorpresa): ______% (debe ser ~100%)")
-print("=" * 60)
-print("\n⚠️  Si no obtienes 0% o 100%, DIME:")
-print("   - Qué valor obtienes con ojos CERRADOS")
-print("   - Qué valor obtienes con ojos MUY ABIERTOS")
-print("   - Ajustaremos la fórmula para que funcione")
\ No newline at end of file
+        # Controles
+        key = cv2.waitKey(1) & 0xFF
+        instr.desde('6_mostrar', t)
+        instr.frame('bucle')
+        memoria.frame()
+    
+        if key == 27:  # ESC
+            break
+        elif key == 32:  # ESPACIO
+            print(f"\n📊 VALOR CAPTURADO: {porcentaje_pupila:.0f}%")
+            capturas.append(porcentaje_pupila)
+        
+            if porcentaje_pupila < 10:
+                print("  Estado: Ojos CERRADOS")
+            elif porcentaje_pupila < 40:
+                print("  Estado: Pupila PARCIAL (ojos entrecerrados)")
+            elif porcentaje_pupila < 70:
+                print("  Estado: Pupila VISIBLE (ojos normales)")
+            elif porcentaje_pupila < 90:
+                print("  Estado: Pupila BIEN VISIBLE (ojos abiertos)")
+            else:
+                print("  Estado: Pupila COMPLETA (ojos muy abiertos)")
+
+    cap.release()
+    cv2.destroyAllWindows()
+
+    print(f"\n🎯 {seguidor.resumen()}")
+    print(f"♻️  {cache.resumen()}")
+    if memoria.activo:
+        print(f"🧠 {memoria.resumen()}")
+        print(f"   {pool.resumen()}")
+        memoria.detener()
+    if registro is not None:
+        registro.cerrar()
+        print(f"📄 Registro: {registro.filas} frames en {registro.carpeta}")
+    if servidor is not None:
+        print(f"📡 {servidor.resumen()}")
+        servidor.detener()
+    if instr.activa:
+        print("📈 Tiempos por etapa:")
+        for linea in instr.lineas():
+            print(f"   {linea}")
+        instr.volcar()
+
+    print("\n" + "=" * 60)
+    print("🎯 RESUMEN DE MEDICIÓN")
+    print("=" * 60)
+    if capturas:
+        print("\nVALORES CAPTURADOS: " + ", ".join(f"{v:.0f}%" for v in capturas))
+    if perfil is None:
+        print("\n⚠️  Sin calibrar: ejecuta 'python calibracion.py --usuario TU_NOMBRE'")
+        print("   para que ojos cerrados den 0% y muy abiertos 100%")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
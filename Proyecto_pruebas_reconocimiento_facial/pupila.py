@@ -0,0 +1,150 @@
+"""
+pupila.py
+Versión vectorizada (NumPy) de medir_pupila_exacta.
+Acepta una región de ojos (H, W) o una pila de regiones del mismo tamaño (N, H, W)
+y calcula todo de una vez, sin bucles de Python píxel a píxel.
+"""
+import numpy as np
+
+UMBRAL_BORDE = 40   # Cuánto más claro que el mínimo tiene que ser el borde de la pupila
+MARGEN_BORDE = 3    # Mínimo pegado al borde de la región -> probablemente no es pupila
+
+
+def punto_mas_oscuro(regiones):
+    """(y, x) del primer píxel más oscuro (orden fila a fila) de cada región"""
+    regiones = np.asarray(regiones)
+    h, w = regiones.shape[-2:]
+    planas = regiones.reshape(-1, h * w)
+    y, x = np.divmod(planas.argmin(axis=1), w)
+    if regiones.ndim == 2:
+        return int(y[0]), int(x[0])
+    return y, x
+
+
+def _primer_cruce(claros, centro, hacia_atras):
+    """
+    Distancia desde el centro hasta el primer píxel claro en cada fila de
+    `claros` (N, L). Devuelve (distancias, encontrado).
+    """
+    largo = claros.shape[1]
+    posiciones = np.arange(largo)
+    centro = centro[:, None]
+
+    if hacia_atras:
+        candidatos = np.where(claros & (posiciones < centro), posiciones, -1)
+        cruce = candidatos.max(axis=1)
+        encontrado = cruce >= 0
+        distancia = centro[:, 0] - cruce
+    else:
+        candidatos = np.where(claros & (posiciones > centro), posiciones, largo)
+        cruce = candidatos.min(axis=1)
+        encontrado = cruce < largo
+        distancia = cruce - centro[:, 0]
+
+    return distancia, encontrado
+
+
+def _distancia_a_borde(claros):
+    """Pasos hasta el primer píxel claro de un tramo 1D (None si no hay borde)"""
+    if not claros.any():
+        return None
+    return int(claros.argmax()) + 1
+
+
+def _medir_una(region):
+    """Camino rápido para una sola región: evita el coste fijo de trabajar en lote"""
+    h, w = region.shape
+    y, x = divmod(int(region.argmin()), w)
+    umbral = int(region[y, x]) + UMBRAL_BORDE
+
+    fila = region[y] > umbral
+    columna = region[:, x] > umbral
+
+    # (tramo desde el centro hacia fuera, máximo posible)
+    tramos = (
+        (columna[y - 1::-1] if y > 0 else columna[:0], h // 2),  # Arriba
+        (columna[y + 1:], h // 2),                               # Abajo
+        (fila[x - 1::-1] if x > 0 else fila[:0], w // 2),        # Izquierda
+        (fila[x + 1:], w // 2),                                  # Derecha
+    )
+
+    porcentajes = []
+    for tramo, max_posible in tramos:
+        distancia = _distancia_a_borde(tramo)
+        if distancia is not None:
+            porcentajes.append(min(100, distancia / max_posible * 100))
+
+    if not porcentajes:
+        return 0.0, y, x
+
+    porcentaje = sum(porcentajes) / len(porcentajes)
+    if (y < MARGEN_BORDE or y > h - MARGEN_BORDE or
+            x < MARGEN_BORDE or x > w - MARGEN_BORDE):
+        porcentaje *= 0.5
+    return min(100.0, max(0.0, porcentaje)), y, x
+
+
+def medir_pupila_lote(regiones, con_centro=False):
+    """
+    Mide el porcentaje de pupila visible (0-100%) de una o varias regiones de ojos.
+
+    Misma lógica que medir_pupila_exacta: desde el punto más oscuro se mide
+    cuánto se avanza arriba/abajo/izquierda/derecha hasta el primer píxel
+    UMBRAL_BORDE más claro, relativo a media altura/anchura de la región.
+
+    Con una región (H, W) devuelve un float; con una pila (N, H, W), un array (N,).
+    Con con_centro=True devuelve además las coordenadas (y, x) del punto más oscuro.
+    """
+    regiones = np.asarray(regiones)
+    una_sola = regiones.ndim == 2
+    if una_sola:
+        h, w = regiones.shape
+        if h < 5 or w < 10:
+            resultado, y, x = 0.0, 0, 0
+        else:
+            resultado, y, x = _medir_una(regiones)
+        return (resultado, y, x) if con_centro else resultado
+
+    n, h, w = regiones.shape
+
+    # Región vacía o muy pequeña: asumir ojos cerrados
+    if n == 0 or h < 5 or w < 10:
+        porcentajes = np.zeros(n)
+        ys = np.zeros(n, dtype=int)
+        xs = np.zeros(n, dtype=int)
+    else:
+        # 1. Punto más oscuro de cada región (argmin = primer mínimo, como np.where)
+        ys, xs = punto_mas_oscuro(regiones)
+        indices = np.arange(n)
+        minimos = regiones[indices, ys, xs].astype(np.int32)
+        umbral = (minimos + UMBRAL_BORDE)[:, None]
+
+        # 2. Sólo hacen falta la fila y la columna que pasan por el centro, umbralizadas
+        fila_clara = regiones[indices, ys, :] > umbral        # (N, W)
+        columna_clara = regiones[indices, :, xs] > umbral     # (N, H)
+
+        arriba, hay_arriba = _primer_cruce(columna_clara, ys, hacia_atras=True)
+        abajo, hay_abajo = _primer_cruce(columna_clara, ys, hacia_atras=False)
+        izquierda, hay_izquierda = _primer_cruce(fila_clara, xs, hacia_atras=True)
+        derecha, hay_derecha = _primer_cruce(fila_clara, xs, hacia_atras=False)
+
+        distancias = np.stack([arriba, abajo, izquierda, derecha], axis=1)
+        encontrados = np.stack([hay_arriba, hay_abajo, hay_izquierda, hay_derecha], axis=1)
+        maximos = np.array([h // 2, h // 2, w // 2, w // 2])
+
+        por_direccion = np.minimum(100, distancias / maximos * 100)
+
+        # 3. Promedio sólo de las direcciones donde se encontró borde
+        cuenta = encontrados.sum(axis=1)
+        suma = np.where(encontrados, por_direccion, 0).sum(axis=1)
+        porcentajes = np.divide(suma, cuenta, out=np.zeros(n), where=cuenta > 0)
+
+        # Mínimo muy cerca del borde: probablemente no es pupila
+        cerca_borde = ((ys < MARGEN_BORDE) | (ys > h - MARGEN_BORDE) |
+                       (xs < MARGEN_BORDE) | (xs > w - MARGEN_BORDE))
+        porcentajes = np.where(cerca_borde, porcentajes * 0.5, porcentajes)
+        porcentajes = np.clip(porcentajes, 0, 100)
+
+    if con_centro:
+        return porcentajes, ys, xs
+    return porcentajes
@@ -0,0 +1,172 @@
+"""
+registro.py
+Registro de resultados por frame en formato columnar, sólo de añadir.
+
+Cada sesión es una carpeta con un fichero binario por columna (instante, caja,
+expresión, confianza, pupila, boca, ojos). El escritor rellena bloques de
+arrays reservados de antemano y los vuelca enteros, así que añadir una fila
+no crea objetos de Python. El lector abre cada columna con np.memmap: una
+sesión de horas (millones de filas) se consulta con NumPy sin cargarla en RAM.
+
+Uso:
+    python registro.py sesiones/2024-05-01_1030     # resumen de una sesión
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from analisis_expresiones import EXPRESIONES
+
+# Columnas y tipos (little-endian, tamaño fijo por fila)
+COLUMNAS = {
+    'instante': '<f8',          # time.time() del frame
+    'x': '<i2', 'y': '<i2', 'w': '<i2', 'h': '<i2',   # Caja del rostro (-1 sin rostro)
+    'expresion': '<i1',         # Índice en EXPRESIONES (-1 sin rostro o sin clasificar)
+    'confianza': '<f4',         # NaN si no se clasifica
+    'pupila': '<f4',            # % de pupila visible (NaN si no se mide)
+    'intensidad_boca': '<f4',
+    'brillo_ojos': '<f4',
+}
+ESQUEMA = "esquema.json"
+CARPETA_SESIONES = Path(__file__).parent / "sesiones"
+
+
+# ============================================
+# ESCRITURA
+# ============================================
+class RegistroResultados:
+    def __init__(self, carpeta, filas_bloque=1024, intervalo_volcado=5.0):
+        self.carpeta = Path(carpeta)
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        (self.carpeta / ESQUEMA).write_text(
+            json.dumps({'columnas': COLUMNAS, 'expresiones': EXPRESIONES}, indent=2), encoding='utf-8'
+        )
+
+        # Un bloque en memoria por columna; se vuelca al llenarse o cada intervalo_volcado
+        self.bloques = {nombre: np.empty(filas_bloque, dtype=tipo) for nombre, tipo in COLUMNAS.items()}
+        self.ficheros = {nombre: open(self.carpeta / f"{nombre}.bin", 'ab') for nombre in COLUMNAS}
+        self.n = 0
+        self.filas = 0
+        self.intervalo_volcado = intervalo_volcado
+        self._ultimo_volcado = time.time()
+
+    def agregar(self, instante, caja, expresion=None, confianza=np.nan,
+                pupila=np.nan, intensidad_boca=np.nan, brillo_ojos=np.nan):
+        """Añade una fila. caja=None sin rostro; expresion=None si no se ha clasificado"""
+        b = self.bloques
+        i = self.n
+        b['instante'][i] = instante
+        if caja is None:
+            b['x'][i] = b['y'][i] = b['w'][i] = b['h'][i] = -1
+        else:
+            b['x'][i], b['y'][i], b['w'][i], b['h'][i] = caja
+        b['expresion'][i] = -1 if expresion is None else EXPRESIONES.index(expresion)
+        b['confianza'][i] = confianza
+        b['pupila'][i] = pupila
+        b['intensidad_boca'][i] = intensidad_boca
+        b['brillo_ojos'][i] = brillo_ojos
+
+        self.n += 1
+        self.filas += 1
+        if self.n == len(b['instante']) or instante - self._ultimo_volcado >= self.intervalo_volcado:
+            self.volcar()
+
+    def volcar(self):
+        """Escribe al final de cada columna las filas pendientes"""
+        if self.n:
+            for nombre, bloque in self.bloques.items():
+                bloque[:self.n].tofile(self.ficheros[nombre])
+                self.ficheros[nombre].flush()
+            self.n = 0
+        self._ultimo_volcado = time.time()
+
+    def cerrar(self):
+        self.volcar()
+        for f in self.ficheros.values():
+            f.close()
+
+
+# ============================================
+# LECTURA (MEMORY-MAPPED)
+# ============================================
+class LectorRegistro:
+    def __init__(self, carpeta):
+        self.carpeta = Path(carpeta)
+        esquema = json.loads((self.carpeta / ESQUEMA).read_text(encoding='utf-8'))
+        self.tipos = {nombre: np.dtype(tipo) for nombre, tipo in esquema['columnas'].items()}
+        self.expresiones = esquema['expresiones']
+
+        # Filas completas: la columna más corta manda (por si se cortó a mitad de un volcado)
+        tamanos = [(self.carpeta / f"{n}.bin").stat().st_size // t.itemsize for n, t in self.tipos.items()]
+        self.filas = min(tamanos) if tamanos else 0
+        self._columnas = {}
+
+    def __getitem__(self, nombre):
+        """Columna como np.memmap de sólo lectura (no se lee del disco hasta usarla)"""
+        if nombre not in self._columnas:
+            if self.filas == 0:
+                self._columnas[nombre] = np.zeros(0, dtype=self.tipos[nombre])
+            else:
+                self._columnas[nombre] = np.memmap(self.carpeta / f"{nombre}.bin", dtype=self.tipos[nombre],
+                                                   mode='r', shape=(self.filas,))
+        return self._columnas[nombre]
+
+    def __len__(self):
+        return self.filas
+
+    def resumen(self):
+        """Agregados de la sesión calculados sobre las columnas mapeadas"""
+        expresion = self['expresion']
+        con_rostro = self['w'] >= 0
+        clasificados = expresion >= 0
+        cuentas = np.bincount(expresion[clasificados], minlength=len(self.expresiones))
+        instantes = self['instante']
+        duracion = float(instantes[-1] - instantes[0]) if self.filas > 1 else 0.0
+
+        por_expresion = {}
+        for i, nombre in enumerate(self.expresiones):
+            mascara = expresion == i
+            if cuentas[i]:
+                por_expresion[nombre] = {
+                    'frames': int(cuentas[i]),
+                    'porcentaje': 100.0 * cuentas[i] / max(1, clasificados.sum()),
+                    'confianza_media': float(self['confianza'][mascara].mean()),
+                    'pupila_media': float(np.nanmean(self['pupila'][mascara]))
+                    if np.isfinite(self['pupila'][mascara]).any() else None,
+                }
+        return {
+            'filas': self.filas,
+            'duracion_s': duracion,
+            'fps': (self.filas - 1) / duracion if duracion > 0 else 0.0,
+            'porcentaje_con_rostro': 100.0 * con_rostro.mean() if self.filas else 0.0,
+            'pupila_media': float(np.nanmean(self['pupila'])) if np.isfinite(self['pupila']).any() else None,
+            'expresiones': por_expresion,
+        }
+
+
+def nueva_sesion(carpeta_base=CARPETA_SESIONES):
+    """Carpeta para una sesión nueva: sesiones/AAAA-MM-DD_HHMMSS"""
+    return Path(carpeta_base) / time.strftime('%Y-%m-%d_%H%M%S')
+
+
+# ============================================
+# PUNTO DE ENTRADA
+# ============================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumen de una sesión registrada")
+    parser.add_argument('sesion', help="Carpeta de la sesión")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    r = LectorRegistro(args.sesion).resumen()
+    print(f"📄 {r['filas']} frames | {r['duracion_s']:.0f} s | {r['fps']:.1f} FPS | "
+          f"rostro en el {r['porcentaje_con_rostro']:.0f}%")
+    if r['pupila_media'] is not None:
+        print(f"   pupila media {r['pupila_media']:.0f}%")
+    for nombre, e in r['expresiones'].items():
+        pupila = f" | pupila {e['pupila_media']:.0f}%" if e['pupila_media'] is not None else ""
+        print(f"   {nombre:9s} {e['porcentaje']:5.1f}% | confianza {e['confianza_media']:.2f}{pupila}")
+    print(f"⏱️  Resumen en {(time.perf_counter() - inicio) * 1000:.0f} ms")
@@ -0,0 +1,130 @@
+"""
+seguimiento.py
+Modo seguimiento: en vez de buscar el rostro en todo el frame, se busca en una
+región pequeña (ROI) alrededor del último rostro encontrado. Cada N frames, o si
+se pierde el rostro, se vuelve a hacer un escaneo completo (opcionalmente reducido).
+"""
+import cv2
+import numpy as np
+
+
+class SeguidorRostro:
+    def __init__(self, face_cascade, intervalo_completo=15, margen_roi=0.5,
+                 escala_completa=1.0, variacion_tamano=0.3,
+                 scaleFactor=1.1, minNeighbors=6, minSize=(100, 100)):
+        self.face_cascade = face_cascade
+
+        # Configuración
+        self.intervalo_completo = intervalo_completo  # Escaneo completo cada N frames
+        self.margen_roi = margen_roi                  # Margen alrededor del rostro (fracción del tamaño)
+        self.escala_completa = escala_completa        # <1.0 reduce el frame en los escaneos completos
+        self.variacion_tamano = variacion_tamano      # Cuánto puede crecer/encoger el rostro entre frames
+        self.scaleFactor = scaleFactor
+        self.minNeighbors = minNeighbors
+        self.minSize = minSize
+
+        # Estado
+        self.ultimo_rostro = None
+        self.frames_desde_completo = 0
+
+        # Estadísticas
+        self.escaneos_completos = 0
+        self.escaneos_roi = 0
+        self.escaneos_evitados = 0  # Frames resueltos sólo con la ROI
+        self.pixeles_roi = 0
+
+    def detectar(self, gris):
+        """Devuelve los rostros del frame (x, y, w, h) en coordenadas del frame completo"""
+        if self.ultimo_rostro is not None and self.frames_desde_completo < self.intervalo_completo:
+            rostro = self.buscar_en_roi(gris)
+            if rostro is not None:
+                self.ultimo_rostro = rostro
+                self.frames_desde_completo += 1
+                self.escaneos_evitados += 1
+                return np.array([rostro])
+
+        # Rostro perdido o toca refrescar: escaneo completo
+        rostros = self.buscar_completo(gris)
+        self.frames_desde_completo = 0
+        if len(rostros) > 0:
+            self.ultimo_rostro = tuple(int(v) for v in max(rostros, key=lambda r: r[2] * r[3]))
+        else:
+            self.ultimo_rostro = None
+        return rostros
+
+    def buscar_completo(self, gris):
+        """Escaneo de todo el frame, reducido si escala_completa < 1"""
+        self.escaneos_completos += 1
+        escala = self.escala_completa
+
+        if escala < 1.0:
+            pequeno = cv2.resize(gris, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+            min_size = (max(1, int(self.minSize[0] * escala)), max(1, int(self.minSize[1] * escala)))
+            rostros = self.face_cascade.detectMultiScale(
+                pequeno,
+                scaleFactor=self.scaleFactor,
+                minNeighbors=self.minNeighbors,
+                minSize=min_size
+            )
+            if len(rostros) == 0:
+                return rostros
+            return (np.asarray(rostros) / escala).astype(int)
+
+        return self.face_cascade.detectMultiScale(
+            gris,
+            scaleFactor=self.scaleFactor,
+            minNeighbors=self.minNeighbors,
+            minSize=self.minSize
+        )
+
+    def buscar_en_roi(self, gris):
+        """Busca sólo en la ROI ampliada alrededor del último rostro, con tamaño acotado"""
+        alto, ancho = gris.shape[:2]
+        x, y, w, h = self.ultimo_rostro
+
+        # ROI: caja anterior + margen, recortada a los límites del frame
+        mx, my = int(w * self.margen_roi), int(h * self.margen_roi)
+        x1, y1 = max(0, x - mx), max(0, y - my)
+        x2, y2 = min(ancho, x + w + mx), min(alto, y + h + my)
+        roi = gris[y1:y2, x1:x2]
+
+        # Tamaño acotado a partir del rostro anterior
+        lado = max(w, h)
+        minimo = max(self.minSize[0], int(lado * (1 - self.variacion_tamano)))
+        maximo = min(x2 - x1, y2 - y1, int(lado * (1 + self.variacion_tamano)))
+        if maximo < minimo:
+            return None
+
+        self.escaneos_roi += 1
+        self.pixeles_roi += roi.size
+
+        rostros = self.face_cascade.detectMultiScale(
+            roi,
+            scaleFactor=self.scaleFactor,
+            minNeighbors=self.minNeighbors,
+            minSize=(minimo, minimo),
+            maxSize=(maximo, maximo)
+        )
+        if len(rostros) == 0:
+            return None
+
+        rx, ry, rw, rh = max(rostros, key=lambda r: r[2] * r[3])
+        return (int(rx) + x1, int(ry) + y1, int(rw), int(rh))
+
+    def estadisticas(self):
+        """Resumen del trabajo ahorrado"""
+        total = self.escaneos_completos + self.escaneos_evitados
+        roi_media = self.pixeles_roi / self.escaneos_roi if self.escaneos_roi else 0
+        return {
+            'frames': total,
+            'escaneos_completos': self.escaneos_completos,
+            'escaneos_evitados': self.escaneos_evitados,
+            'porcentaje_evitado': 100.0 * self.escaneos_evitados / total if total else 0.0,
+            'pixeles_roi_medios': roi_media,
+        }
+
+    def resumen(self):
+        """Texto corto para consola o pantalla de debug"""
+        e = self.estadisticas()
+        return (f"Escaneos completos evitados: {e['escaneos_evitados']}/{e['frames']} "
+                f"({e['porcentaje_evitado']:.0f}%)")
@@ -0,0 +1,207 @@
+"""
+servidor_resultados.py
+Servidor local (asyncio, sólo loopback) que publica los resultados de cada
+frame (expresión, confianza, pupila, caja) para otros programas del equipo.
+
+El hilo de análisis sólo llama a publicar(), que no espera nunca: deja el
+resultado en el bucle de asyncio, que corre en su propio hilo. Cada cliente
+tiene una cola acotada; si un cliente lee despacio se descartan sus resultados
+más viejos (y se cuentan), pero ni la captura ni el análisis se frenan.
+
+Rutas (HTTP/1.1, sin dependencias):
+    GET /eventos               Server-Sent Events: un evento por resultado
+    GET /lineas?intervalo=100  JSON lines por lotes: cada 100 ms, todo lo pendiente de una vez
+    GET /ultimo                El último resultado (JSON)
+    GET /estado                Clientes, publicados y descartados
+
+Uso:
+    python detector.py --servidor              # http://127.0.0.1:8765
+    curl -N http://127.0.0.1:8765/eventos
+    curl -N "http://127.0.0.1:8765/lineas?intervalo=250"
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+PUERTO = 8765
+
+
+class _Cliente:
+    """Cola acotada de un suscriptor: al llenarse se pierden los resultados más viejos"""
+    __slots__ = ('cola', 'aviso', 'descartados')
+
+    def __init__(self, tamano):
+        self.cola = deque(maxlen=tamano)
+        self.aviso = asyncio.Event()
+        self.descartados = 0
+
+    def poner(self, linea):
+        if len(self.cola) == self.cola.maxlen:
+            self.descartados += 1
+        self.cola.append(linea)
+        self.aviso.set()
+
+    async def sacar_todo(self):
+        """Espera a que haya algo y devuelve todo lo pendiente"""
+        await self.aviso.wait()
+        self.aviso.clear()
+        lineas = list(self.cola)
+        self.cola.clear()
+        return lineas
+
+
+class ServidorResultados:
+    def __init__(self, host="127.0.0.1", puerto=PUERTO, tamano_cola=64):
+        self.host = host
+        self.puerto = puerto
+        self.tamano_cola = tamano_cola
+        self.clientes = set()
+        self.ultimo = None
+        self.publicados = 0
+        self.descartados = 0     # De clientes ya desconectados (los activos llevan su cuenta)
+
+        self._loop = None
+        self._servidor = None
+        self._hilo = None
+        self._listo = threading.Event()
+        self._detenido = False
+
+    # ============================================
+    # HILO DEL SERVIDOR
+    # ============================================
+    def iniciar(self):
+        """Arranca el bucle de asyncio en un hilo propio y espera a que escuche"""
+        self._hilo = threading.Thread(target=self._ejecutar, name="servidor", daemon=True)
+        self._hilo.start()
+        self._listo.wait(timeout=5.0)
+        if self._servidor is None:
+            raise RuntimeError(f"No se pudo abrir el servidor en {self.host}:{self.puerto}")
+        # Puerto real (con puerto=0 lo elige el sistema)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    def _ejecutar(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._servidor = self._loop.run_until_complete(
+                asyncio.start_server(self._atender, self.host, self.puerto)
+            )
+        except OSError:
+            self._listo.set()
+            return
+        self._listo.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            # Cerrar las conexiones abiertas (clientes en /eventos o /lineas)
+            pendientes = asyncio.all_tasks(self._loop)
+            for tarea in pendientes:
+                tarea.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pendientes, return_exceptions=True))
+            self._servidor.close()
+            self._loop.run_until_complete(self._servidor.wait_closed())
+            self._loop.close()
+
+    def detener(self):
+        self._detenido = True    # publicar() deja de encolar aunque el hilo tarde en salir
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._hilo.join(timeout=1.0)
+
+    # ============================================
+    # PUBLICAR (desde cualquier hilo, sin esperar)
+    # ============================================
+    def publicar(self, resultado):
+        """Encola un resultado (dict serializable) para todos los clientes; sin servidor, no hace nada"""
+        if self._loop is None or self._detenido or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._repartir, resultado)
+        except RuntimeError:
+            return   # El bucle se cerró entre la comprobación y la llamada
+        self.publicados += 1
+
+    def _repartir(self, resultado):
+        # Se serializa una sola vez, en el hilo del servidor, sea cual sea el número de clientes
+        linea = json.dumps(resultado, separators=(',', ':'))
+        self.ultimo = linea
+        for cliente in self.clientes:
+            cliente.poner(linea)
+
+    # ============================================
+    # HTTP
+    # ============================================
+    async def _atender(self, lector, escritor):
+        try:
+            peticion = await asyncio.wait_for(lector.readline(), timeout=5.0)
+            while (await lector.readline()).strip():   # Cabeceras: no se usan
+                pass
+            partes = peticion.decode('latin-1').split()
+            if len(partes) < 2 or partes[0] != 'GET':
+                await self._responder(escritor, "405 Method Not Allowed", "text/plain", b"Solo GET\n")
+                return
+
+            url = urlsplit(partes[1])
+            parametros = parse_qs(url.query)
+            if url.path == '/eventos':
+                await self._emitir(escritor, sse=True)
+            elif url.path == '/lineas':
+                intervalo = float(parametros.get('intervalo', ['0'])[0]) / 1000
+                await self._emitir(escritor, sse=False, intervalo=intervalo)
+            elif url.path == '/ultimo':
+                cuerpo = (self.ultimo or 'null') + '\n'
+                await self._responder(escritor, "200 OK", "application/json", cuerpo.encode())
+            elif url.path == '/estado':
+                cuerpo = json.dumps(self.estado()) + '\n'
+                await self._responder(escritor, "200 OK", "application/json", cuerpo.encode())
+            else:
+                await self._responder(escritor, "404 Not Found", "text/plain", b"Rutas: /eventos /lineas /ultimo /estado\n")
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass   # Servidor detenido con el cliente conectado
+        finally:
+            escritor.close()
+
+    async def _responder(self, escritor, estado, tipo, cuerpo):
+        escritor.write(f"HTTP/1.1 {estado}\r\nContent-Type: {tipo}\r\n"
+                       f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode() + cuerpo)
+        await escritor.drain()
+
+    async def _emitir(self, escritor, sse, intervalo=0.0):
+        """Envía resultados hasta que el cliente se desconecte"""
+        tipo = "text/event-stream" if sse else "application/x-ndjson"
+        escritor.write(f"HTTP/1.1 200 OK\r\nContent-Type: {tipo}\r\n"
+                       f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode())
+        cliente = _Cliente(self.tamano_cola)
+        self.clientes.add(cliente)
+        try:
+            while True:
+                lineas = await cliente.sacar_todo()
+                if sse:
+                    datos = "".join(f"data: {linea}\n\n" for linea in lineas)
+                else:
+                    datos = "\n".join(lineas) + "\n"
+                # Una escritura por lote; drain espera sólo a este cliente
+                escritor.write(datos.encode())
+                await escritor.drain()
+                if intervalo > 0:
+                    await asyncio.sleep(intervalo)
+        finally:
+            self.clientes.discard(cliente)
+            self.descartados += cliente.descartados
+
+    def estado(self):
+        return {
+            'clientes': len(self.clientes),
+            'publicados': self.publicados,
+            'descartados': self.descartados + sum(c.descartados for c in list(self.clientes)),
+        }
+
+    def resumen(self):
+        e = self.estado()
+        return (f"Servidor http://{self.host}:{self.puerto}: {e['publicados']} resultados | "
+                f"{e['clientes']} clientes | {e['descartados']} descartados")
@@ -0,0 +1,80 @@
+"""
+suavizado.py
+Filtro temporal de expresiones en tiempo constante por frame.
+
+Cada resultado del análisis entra en un buffer circular de tamaño fijo
+(ventana) y se mantienen sumas por clase, así que actualizar cuesta lo mismo
+sea cual sea la ventana. La expresión mostrada sólo cambia cuando otra clase
+supera a la actual por un margen (histéresis): estable sin descartar frames.
+"""
+import numpy as np
+
+from analisis_expresiones import EXPRESIONES
+
+
+class SuavizadorExpresiones:
+    def __init__(self, ventana=6, histeresis=0.2, clases=EXPRESIONES, inicial="neutral"):
+        self.ventana = max(1, ventana)
+        self.histeresis = histeresis    # Ventaja mínima (fracción de la ventana) para cambiar
+        self.clases = list(clases)
+        self._indices = {clase: i for i, clase in enumerate(self.clases)}
+        self._inicial = self._indices[inicial]
+
+        # Buffer circular: clase y confianza de los últimos `ventana` frames
+        self._buffer_clase = np.full(self.ventana, -1, dtype=np.int8)
+        self._buffer_confianza = np.zeros(self.ventana)
+        # Sumas corrientes por clase: votos y confianza acumulada
+        self.votos = np.zeros(len(self.clases), dtype=np.int32)
+        self._suma_confianza = np.zeros(len(self.clases))
+        self._posicion = 0
+        self.llenos = 0
+
+        self.actual = self._inicial
+        self.cambios = 0
+
+    def actualizar(self, expresion, confianza):
+        """Añade el resultado de un frame y devuelve (expresion, confianza) suavizadas"""
+        clase = self._indices[expresion]
+        i = self._posicion
+
+        # Sale el frame más antiguo (si la ventana ya está llena)...
+        saliente = self._buffer_clase[i]
+        if saliente >= 0:
+            self.votos[saliente] -= 1
+            self._suma_confianza[saliente] -= self._buffer_confianza[i]
+            if self.votos[saliente] == 0:
+                self._suma_confianza[saliente] = 0.0   # Sin arrastrar error de redondeo
+        else:
+            self.llenos += 1
+
+        # ...y entra el nuevo
+        self._buffer_clase[i] = clase
+        self._buffer_confianza[i] = confianza
+        self.votos[clase] += 1
+        self._suma_confianza[clase] += confianza
+        self._posicion = (i + 1) % self.ventana
+
+        # Cambiar sólo si la mejor clase aventaja a la actual por el margen
+        mejor = int(self.votos.argmax())
+        if mejor != self.actual:
+            ventaja = (self.votos[mejor] - self.votos[self.actual]) / self.ventana
+            if ventaja > self.histeresis:
+                self.actual = mejor
+                self.cambios += 1
+
+        return self.clases[self.actual], self.confianza()
+
+    def confianza(self):
+        """Confianza media de la expresión actual dentro de la ventana"""
+        votos = self.votos[self.actual]
+        return float(self._suma_confianza[self.actual] / votos) if votos else 0.0
+
+    def reiniciar(self):
+        """Olvida la historia (p. ej. al perder el rostro)"""
+        self._buffer_clase[:] = -1
+        self._buffer_confianza[:] = 0.0
+        self.votos[:] = 0
+        self._suma_confianza[:] = 0.0
+        self._posicion = 0
+        self.llenos = 0
+        self.actual = self._inicial